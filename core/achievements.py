@@ -0,0 +1,108 @@
+"""
+Achievement rules and unlock evaluation.
+
+Every rule is a threshold on one denormalized counter on User. Writers call
+increment() (or check_achievements() after setting a counter themselves);
+only rules on that counter whose target was crossed are unlocked, so the
+read side is a single UserAchievement lookup and adding a badge costs no
+extra queries anywhere.
+"""
+from collections import namedtuple
+
+from django.contrib.auth import get_user_model
+from django.db.models import F
+
+from .bulk import update_from_values
+from .models import UserAchievement
+
+User = get_user_model()
+
+Achievement = namedtuple("Achievement", "id name description icon counter target")
+
+# id -> Achievement, in display order
+RULES = {}
+
+
+def register(id, name, description, icon, counter, target):
+    RULES[id] = Achievement(id, name, description, icon, counter, target)
+
+
+# -------------------------------------
+# RULES
+# -------------------------------------
+register("earner_1000", "💰 First Thousand", "Earned 1,000 coins", "💰", "coins_earned_total", 1000)
+register("earner_5000", "💵 Big Earner", "Earned 5,000 coins", "💵", "coins_earned_total", 5000)
+register("earner_10000", "💎 Coin Master", "Earned 10,000 coins", "💎", "coins_earned_total", 10000)
+
+register("tasker_10", "🎯 Task Starter", "Completed 10 tasks", "🎯", "tasks_completed_count", 10)
+register("tasker_50", "⭐ Task Master", "Completed 50 tasks", "⭐", "tasks_completed_count", 50)
+register("tasker_100", "🏆 Task Legend", "Completed 100 tasks", "🏆", "tasks_completed_count", 100)
+
+register("streak_7", "🔥 Week Warrior", "7 day login streak", "🔥", "longest_streak", 7)
+register("streak_30", "💪 Month Master", "30 day login streak", "💪", "longest_streak", 30)
+
+register("referrer_5", "👥 Social Butterfly", "Referred 5 friends", "👥", "referrals_count", 5)
+register("referrer_20", "🌟 Influencer", "Referred 20 friends", "🌟", "referrals_count", 20)
+
+register("withdrawer_1", "💸 First Withdrawal", "Made your first withdrawal", "💸", "withdrawals_completed_count", 1)
+register("withdrawer_10", "💳 Regular Earner", "Made 10 withdrawals", "💳", "withdrawals_completed_count", 10)
+
+
+# -------------------------------------
+# EVALUATION
+# -------------------------------------
+def _reached(counter, previous, current):
+    return [
+        rule for rule in RULES.values()
+        if rule.counter == counter and previous < rule.target <= current
+    ]
+
+
+def check_achievements(user, counter, previous):
+    """
+    Unlock the rules on `counter` whose target lies in (previous, current].
+    Returns the newly reached rules.
+    """
+    reached = _reached(counter, previous, getattr(user, counter))
+    if reached:
+        UserAchievement.objects.bulk_create(
+            [UserAchievement(user=user, achievement_id=rule.id) for rule in reached],
+            ignore_conflicts=True,
+        )
+    return reached
+
+
+def increment(user, counter, n=1):
+    """Atomically add `n` to a User counter, then check the rules on it."""
+    User.objects.filter(pk=user.pk).update(**{counter: F(counter) + n})
+    user.refresh_from_db(fields=[counter])
+    return check_achievements(user, counter, getattr(user, counter) - n)
+
+
+def increment_many(counter, counts):
+    """
+    Set-based increment() for bulk actions: `counts` maps user_id -> n.
+    One UPDATE ... FROM VALUES, one read-back and one insert of unlocks.
+    """
+    update_from_values(User, [counter], list(counts.items()), add=[counter])
+    unlocked = [
+        UserAchievement(user=user, achievement_id=rule.id)
+        for user in User.objects.filter(pk__in=list(counts)).only("pk", counter)
+        for rule in _reached(counter, getattr(user, counter) - counts[user.pk], getattr(user, counter))
+    ]
+    UserAchievement.objects.bulk_create(unlocked, ignore_conflicts=True)
+
+
+def sync_achievements(users):
+    """
+    Unlock every rule the given users already satisfy (backfill / repair).
+    Returns the number of rows inserted or already present.
+    """
+    rows = [
+        UserAchievement(user=user, achievement_id=rule.id)
+        for user in users
+        for rule in RULES.values()
+        if getattr(user, rule.counter) >= rule.target
+    ]
+    UserAchievement.objects.bulk_create(rows, ignore_conflicts=True, batch_size=1000)
+    return len(rows)
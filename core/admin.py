@@ -13,12 +13,32 @@ from .models import (
     CPXTransaction,
     TapjoyTransaction,
     DailyChallengeClaim,
+    UserDailyStats,
+    DailyEarningRollup,
+    UserAchievement,
+    PostbackInbox,
 )
+from .achievements import increment
+from .fraud_score import filter_by_score
+from .withdrawals import approve_withdrawals, reject_withdrawals
 
 
 # -----------------------------------------
 # USER ADMIN
 # -----------------------------------------
+class CurrentFraudScoreFilter(admin.SimpleListFilter):
+    title = "current fraud score"
+    parameter_name = "fraud_score_min"
+
+    def lookups(self, request, model_admin):
+        return [("10", "≥ 10"), ("25", "≥ 25"), ("50", "≥ 50")]
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return filter_by_score(queryset, float(self.value()))
+        return queryset
+
+
 @admin.register(User)
 class UserAdmin(DjangoUserAdmin):
     fieldsets = DjangoUserAdmin.fieldsets + (
@@ -31,6 +51,9 @@ class UserAdmin(DjangoUserAdmin):
                     "referred_by",
                     "device_id",
                     "fraud_score",
+                    "fraud_score_at",
+                    "account_cluster",
+                    "account_cluster_size",
                     "coins_balance",
                     "last_earn_time",
                     "daily_earn_count",
@@ -46,13 +69,20 @@ class UserAdmin(DjangoUserAdmin):
         "email",
         "phone",
         "coins_balance",
-        "fraud_score",
+        "current_fraud_score",
+        "account_cluster_size",
         "daily_earn_count",
     )
+    list_filter = DjangoUserAdmin.list_filter + (CurrentFraudScoreFilter,)
 
     search_fields = ("username", "email", "phone")
     raw_id_fields = ("referred_by",)  # prevents huge dropdowns
 
+    def current_fraud_score(self, obj):
+        return obj.current_fraud_score
+    current_fraud_score.short_description = "Fraud score"
+    current_fraud_score.admin_order_field = "fraud_score"
+
 
 # -----------------------------------------
 # SETTINGS ADMIN
@@ -144,35 +174,25 @@ class WithdrawRequestAdmin(admin.ModelAdmin):
     
     def approve_requests(self, request, queryset):
         """Approve selected withdrawal requests"""
-        from django.utils import timezone
-        updated = queryset.filter(status=WithdrawRequest.STATUS_PENDING).update(
-            status=WithdrawRequest.STATUS_APPROVED,
-            processed_at=timezone.now()
-        )
-        self.message_user(request, f"{updated} withdrawal request(s) approved.")
+        approved = approve_withdrawals(queryset)
+        self.message_user(request, f"{len(approved)} withdrawal request(s) approved.")
     approve_requests.short_description = "Approve selected requests"
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        # Approving from the change form counts the same as the bulk action
+        if (
+            change
+            and "status" in form.changed_data
+            and form.initial.get("status") == WithdrawRequest.STATUS_PENDING
+            and obj.status in (WithdrawRequest.STATUS_APPROVED, WithdrawRequest.STATUS_PAID)
+        ):
+            increment(obj.user, "withdrawals_completed_count")
     
     def reject_requests(self, request, queryset):
         """Reject selected withdrawal requests"""
-        from django.utils import timezone
-        from django.db import transaction
-        
-        updated = 0
-        with transaction.atomic():
-            for withdraw in queryset.filter(status=WithdrawRequest.STATUS_PENDING):
-                # Refund coins to user
-                rate = float(Settings.get_value("COIN_TO_RS_RATE", "0.025"))
-                coins_to_refund = int(float(withdraw.amount_rs) / rate)
-                withdraw.user.coins_balance += coins_to_refund
-                withdraw.user.save(update_fields=["coins_balance"])
-                
-                # Update withdrawal status
-                withdraw.status = WithdrawRequest.STATUS_REJECTED
-                withdraw.processed_at = timezone.now()
-                withdraw.save()
-                updated += 1
-        
-        self.message_user(request, f"{updated} withdrawal request(s) rejected and coins refunded.")
+        rejected, _ = reject_withdrawals(queryset)
+        self.message_user(request, f"{len(rejected)} withdrawal request(s) rejected and coins refunded.")
     reject_requests.short_description = "Reject selected requests (refund coins)"
     
     def mark_as_paid(self, request, queryset):
@@ -231,3 +251,57 @@ class DailyChallengeClaimAdmin(admin.ModelAdmin):
     search_fields = ("user__username", "challenge_id")
     list_select_related = ("user",)
     readonly_fields = ("created_at",)
+
+
+# -----------------------------------------
+# USER DAILY STATS ADMIN
+# -----------------------------------------
+@admin.register(UserDailyStats)
+class UserDailyStatsAdmin(admin.ModelAdmin):
+    list_display = ("user", "date", "tasks_started", "tasks_completed", "earn_coins", "bonus_coins")
+    list_filter = ("date",)
+    search_fields = ("user__username",)
+    list_select_related = ("user",)
+    raw_id_fields = ("user",)
+
+
+# -----------------------------------------
+# DAILY EARNING ROLLUP ADMIN
+# -----------------------------------------
+@admin.register(DailyEarningRollup)
+class DailyEarningRollupAdmin(admin.ModelAdmin):
+    list_display = ("user", "day", "type", "coins_sum", "tx_count")
+    list_filter = ("type", "day")
+    search_fields = ("user__username",)
+    list_select_related = ("user",)
+    raw_id_fields = ("user",)
+
+
+# -----------------------------------------
+# USER ACHIEVEMENT ADMIN
+# -----------------------------------------
+@admin.register(UserAchievement)
+class UserAchievementAdmin(admin.ModelAdmin):
+    list_display = ("user", "achievement_id", "unlocked_at")
+    list_filter = ("achievement_id",)
+    search_fields = ("user__username",)
+    list_select_related = ("user",)
+    raw_id_fields = ("user",)
+
+
+# -----------------------------------------
+# POSTBACK INBOX ADMIN
+# -----------------------------------------
+@admin.register(PostbackInbox)
+class PostbackInboxAdmin(admin.ModelAdmin):
+    list_display = ("provider", "external_id", "user_ref", "action", "coins", "received_at", "processed_at", "result")
+    list_filter = ("provider", "action", "result")
+    search_fields = ("external_id", "user_ref")
+    readonly_fields = ("received_at",)
+    actions = ["requeue"]
+
+    def requeue(self, request, queryset):
+        """Send failed rows back to the worker"""
+        updated = queryset.filter(result="failed").update(processed_at=None, result="", error="")
+        self.message_user(request, f"{updated} postback(s) requeued.")
+    requeue.short_description = "Requeue failed postbacks"
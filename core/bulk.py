@@ -0,0 +1,98 @@
+"""
+Set-based write helpers for batch jobs and admin bulk actions.
+
+Both statements run on PostgreSQL and on SQLite >= 3.33 (local dev), and
+send one statement per BATCH_SIZE rows instead of one query per row.
+"""
+from django.db import connection
+
+BATCH_SIZE = 1000
+
+
+def _chunks(rows, size=BATCH_SIZE):
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+def update_from_values(model, fields, rows, add=()):
+    """
+    UPDATE many rows of `model` with per-row values in one statement:
+
+        WITH v(pk, f1, ...) AS (VALUES (...), ...)
+        UPDATE table SET f1 = v.f1 [or table.f1 + v.f1 for fields in `add`]
+        FROM v WHERE table.pk = v.pk
+
+    `rows` are tuples (pk, value for each of `fields`). Returns rows updated.
+    """
+    meta = model._meta
+    qn = connection.ops.quote_name
+    table = qn(meta.db_table)
+    model_fields = [meta.pk] + [meta.get_field(name) for name in fields]
+    names = ["pk"] + [f"v_{name}" for name in fields]
+
+    placeholder = "({})".format(", ".join(
+        f"CAST(%s AS {field.cast_db_type(connection)})" for field in model_fields
+    ))
+    assignments = ", ".join(
+        "{col} = {current}v.{value}".format(
+            col=qn(field.column),
+            current=f"{table}.{qn(field.column)} + " if field.name in add else "",
+            value=name,
+        )
+        for field, name in zip(model_fields[1:], names[1:])
+    )
+
+    updated = 0
+    with connection.cursor() as cursor:
+        for chunk in _chunks(list(rows)):
+            sql = "WITH v({names}) AS (VALUES {values}) UPDATE {table} SET {assignments} FROM v WHERE {table}.{pk} = v.pk".format(
+                names=", ".join(names),
+                values=", ".join([placeholder] * len(chunk)),
+                table=table,
+                assignments=assignments,
+                pk=qn(meta.pk.column),
+            )
+            params = [
+                field.get_db_prep_value(value, connection)
+                for row in chunk
+                for field, value in zip(model_fields, row)
+            ]
+            cursor.execute(sql, params)
+            updated += cursor.rowcount
+    return updated
+
+
+def upsert_add(model, instances, conflict_fields, add_fields):
+    """
+    Insert unsaved `instances`, or add their `add_fields` to the existing row
+    on a `conflict_fields` conflict:
+
+        INSERT ... ON CONFLICT (...) DO UPDATE SET f = table.f + EXCLUDED.f
+
+    The batch must not contain two instances for the same conflict key.
+    """
+    meta = model._meta
+    qn = connection.ops.quote_name
+    table = qn(meta.db_table)
+    fields = [f for f in meta.concrete_fields if not f.primary_key]
+    row = "({})".format(", ".join(["%s"] * len(fields)))
+    assignments = ", ".join(
+        "{col} = {table}.{col} + EXCLUDED.{col}".format(col=qn(meta.get_field(name).column), table=table)
+        for name in add_fields
+    )
+
+    with connection.cursor() as cursor:
+        for chunk in _chunks(list(instances)):
+            sql = "INSERT INTO {table} ({columns}) VALUES {values} ON CONFLICT ({conflict}) DO UPDATE SET {assignments}".format(
+                table=table,
+                columns=", ".join(qn(f.column) for f in fields),
+                values=", ".join([row] * len(chunk)),
+                conflict=", ".join(qn(meta.get_field(name).column) for name in conflict_fields),
+                assignments=assignments,
+            )
+            params = [
+                f.get_db_prep_save(f.pre_save(instance, True), connection)
+                for instance in chunk
+                for f in fields
+            ]
+            cursor.execute(sql, params)
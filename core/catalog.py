@@ -0,0 +1,74 @@
+"""
+Versioned task catalog cache for TaskListView.
+
+The active task list is rendered to JSON once per catalog version and kept
+both in the shared cache and in-process, together with a strong ETag.
+Task post_save/post_delete (see core/signals.py) bump the version once the
+transaction commits, so a hit costs no database query and no serializer
+work.
+
+The version only reaches every worker if the cache is shared. Without
+settings.SHARED_CACHE each worker keeps its own copy for at most
+TASK_CATALOG_LOCAL_TTL seconds, so other workers' edits show up after that.
+"""
+import hashlib
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.renderers import JSONRenderer
+
+from .models import Task
+from .serializers import TaskSerializer
+
+CATALOG_VERSION_KEY = "core:tasks:catalog:version"
+CATALOG_ENTRY_KEY = "core:tasks:catalog:{version}"
+CATALOG_ENTRY_TIMEOUT = 24 * 60 * 60
+
+# (version, body, etag, loaded_at) of the last catalog this worker served
+_local = (None, b"", "", 0.0)
+
+
+def invalidate_task_catalog():
+    """
+    Start a new catalog version. Call after bulk Task update()s too, once
+    they are committed (transaction.on_commit).
+    """
+    global _local
+    cache.set(CATALOG_VERSION_KEY, uuid.uuid4().hex, None)
+    _local = (None, b"", "", 0.0)
+
+
+def _render():
+    tasks = Task.objects.filter(is_active=True).order_by("id")
+    body = JSONRenderer().render(TaskSerializer(tasks, many=True).data)
+    return body, '"%s"' % hashlib.sha256(body).hexdigest()[:32]
+
+
+def get_task_catalog():
+    """Return (json_bytes, etag) for the active task list."""
+    global _local
+
+    if not getattr(settings, "SHARED_CACHE", False):
+        now = time.monotonic()
+        if now - _local[3] >= getattr(settings, "TASK_CATALOG_LOCAL_TTL", 5):
+            _local = (None, *_render(), now)
+        return _local[1], _local[2]
+
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        cache.add(CATALOG_VERSION_KEY, uuid.uuid4().hex, None)
+        version = cache.get(CATALOG_VERSION_KEY)
+
+    if _local[0] == version:
+        return _local[1], _local[2]
+
+    key = CATALOG_ENTRY_KEY.format(version=version)
+    entry = cache.get(key)
+    if entry is None:
+        entry = _render()
+        cache.set(key, entry, CATALOG_ENTRY_TIMEOUT)
+
+    _local = (version, entry[0], entry[1], time.monotonic())
+    return entry
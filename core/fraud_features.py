@@ -0,0 +1,158 @@
+"""
+Sliding-window fraud features kept in the shared cache.
+
+Hot paths call record_start() / record_completion(); each is a handful of
+O(1) cache writes. risk() reads every feature for a (user, device, IP) with
+one get_many() and no database queries:
+
+  - completions per minute for the user, the device and the IP: one counter
+    per 10-second bucket (cache.add + cache.incr), summed over the last
+    minute on read;
+  - distinct accounts per device and per IP over FRAUD_ACCOUNT_WINDOW: one
+    small {user_id: last_seen} map per device/IP, rewritten only when a new
+    account shows up or its entry is older than ACCOUNT_REFRESH.
+
+Counts are approximate by design (bucket edges; two concurrent map writes
+can drop an account until its next request). They feed a risk score, not an
+audit trail, and cache failures never fail the request.
+"""
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.exceptions import PermissionDenied
+
+logger = logging.getLogger(__name__)
+
+BUCKET_SECONDS = 10
+RATE_WINDOW = 60
+ACCOUNT_REFRESH = 300
+MAX_ACCOUNTS_TRACKED = 50
+
+# (feature, free allowance, points per unit above it)
+WEIGHTS = [
+    ("user_rate", 6, 5.0),
+    ("device_rate", 10, 3.0),
+    ("ip_rate", 30, 1.0),
+    ("device_accounts", 2, 15.0),
+    ("ip_accounts", 5, 5.0),
+]
+MAX_SCORE = 100.0
+
+
+def _account_window():
+    return getattr(settings, "FRAUD_ACCOUNT_WINDOW", 24 * 60 * 60)
+
+
+def _bucket(now):
+    return int(now // BUCKET_SECONDS)
+
+
+def _rate_key(kind, value, bucket):
+    return f"core:ff:{kind}:{value}:rate:{bucket}"
+
+
+def _accounts_key(kind, value):
+    return f"core:ff:{kind}:{value}:accounts"
+
+
+def _sources(user_id, device_id, ip):
+    return [(kind, value) for kind, value in (("user", user_id), ("device", device_id), ("ip", ip)) if value]
+
+
+# -------------------------------------
+# UPDATES
+# -------------------------------------
+def _touch_accounts(user_id, device_id, ip, now):
+    window = _account_window()
+    for kind, value in (("device", device_id), ("ip", ip)):
+        if not value:
+            continue
+        key = _accounts_key(kind, value)
+        seen = cache.get(key) or {}
+        last = seen.get(user_id)
+        if last is not None and now - last < ACCOUNT_REFRESH:
+            continue
+
+        seen = {uid: ts for uid, ts in seen.items() if now - ts < window}
+        seen[user_id] = now
+        if len(seen) > MAX_ACCOUNTS_TRACKED:
+            seen = dict(sorted(seen.items(), key=lambda item: item[1])[-MAX_ACCOUNTS_TRACKED:])
+        cache.set(key, seen, window)
+
+
+def record_start(user_id, device_id=None, ip=None):
+    """A task was started from this device / IP."""
+    try:
+        _touch_accounts(user_id, device_id, ip, time.time())
+    except Exception:
+        logger.exception("Failed to record fraud features")
+
+
+def record_completion(user_id, device_id=None, ip=None):
+    """A task, game or offer was completed."""
+    try:
+        now = time.time()
+        bucket = _bucket(now)
+        for kind, value in _sources(user_id, device_id, ip):
+            key = _rate_key(kind, value, bucket)
+            cache.add(key, 0, RATE_WINDOW + BUCKET_SECONDS)
+            cache.incr(key)
+        _touch_accounts(user_id, device_id, ip, now)
+    except Exception:
+        logger.exception("Failed to record fraud features")
+
+
+# -------------------------------------
+# READS
+# -------------------------------------
+def features(user_id, device_id=None, ip=None):
+    """Current feature values, read with a single cache round trip."""
+    now = time.time()
+    current = _bucket(now)
+    buckets = range(current - RATE_WINDOW // BUCKET_SECONDS + 1, current + 1)
+
+    sources = _sources(user_id, device_id, ip)
+    rate_keys = {kind: [_rate_key(kind, value, b) for b in buckets] for kind, value in sources}
+    account_keys = {kind: _accounts_key(kind, value) for kind, value in sources if kind != "user"}
+    values = cache.get_many([key for keys in rate_keys.values() for key in keys] + list(account_keys.values()))
+
+    window = _account_window()
+    result = {}
+    for kind in ("user", "device", "ip"):
+        result[f"{kind}_rate"] = sum(values.get(key, 0) for key in rate_keys.get(kind, ()))
+    for kind in ("device", "ip"):
+        seen = values.get(account_keys.get(kind), {}) if kind in account_keys else {}
+        result[f"{kind}_accounts"] = sum(1 for ts in seen.values() if now - ts < window)
+    return result
+
+
+def risk(user_id, device_id=None, ip=None, ip_info=None):
+    """
+    Return (score 0..100, features). Never raises. `ip_info` (request.ip_info)
+    adds settings.FRAUD_NETWORK_SCORE for IPs in a listed datacenter/VPN range.
+    """
+    try:
+        values = features(user_id, device_id, ip)
+    except Exception:
+        logger.exception("Failed to read fraud features")
+        values = {}
+    score = sum(max(0, values.get(name, 0) - allowance) * points for name, allowance, points in WEIGHTS)
+    if ip_info is not None and ip_info.network:
+        values["network"] = ip_info.network
+        score += getattr(settings, "FRAUD_NETWORK_SCORE", 20.0)
+    return min(score, MAX_SCORE), values
+
+
+def check_risk(user_id, device_id=None, ip=None, ip_info=None):
+    """
+    Block the request when the risk score reaches
+    settings.FRAUD_RISK_BLOCK_SCORE (0 = only measure, never block).
+    """
+    threshold = getattr(settings, "FRAUD_RISK_BLOCK_SCORE", 0)
+    if not threshold:
+        return
+    score, _ = risk(user_id, device_id, ip, ip_info)
+    if score >= threshold:
+        raise PermissionDenied("Too much activity from this account or device. Try again later.")
@@ -0,0 +1,97 @@
+"""
+Time-decayed fraud score.
+
+User.fraud_score holds the score as of User.fraud_score_at; the current score
+halves every FRAUD_SCORE_HALF_LIFE_DAYS:
+
+    current = fraud_score * 2 ** (-(now - fraud_score_at) / half_life)
+
+Nothing rewrites rows on a schedule:
+
+  - reads decay on the fly (current_score() in Python, or
+    decayed_score_expression() / filter_by_score() inside SQL);
+  - writes go through add_scores(), which folds the decay into the stored
+    value and restarts the clock in one set-based UPDATE, then adds the new
+    deltas with one UPDATE ... FROM VALUES.
+
+A null fraud_score_at means "never scored" and does not decay.
+"""
+import math
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Case, F, FloatField, Func, Value, When
+from django.db.models.functions import Exp
+from django.utils import timezone
+
+from .bulk import update_from_values
+
+User = get_user_model()
+
+
+def _decay_rate():
+    """Per-second decay constant for the configured half-life."""
+    return math.log(2) / (getattr(settings, "FRAUD_SCORE_HALF_LIFE_DAYS", 14) * 24 * 60 * 60)
+
+
+def current_score(value, scored_at, now=None):
+    """The decayed score for a stored (value, timestamp) pair."""
+    if scored_at is None or not value:
+        return value
+    elapsed = ((now or timezone.now()) - scored_at).total_seconds()
+    return value * math.exp(-_decay_rate() * max(elapsed, 0.0))
+
+
+# -------------------------------------
+# SQL
+# -------------------------------------
+class EpochSeconds(Func):
+    """Seconds since 1970-01-01 UTC of a datetime column."""
+    output_field = FloatField()
+
+    def as_sql(self, compiler, connection, **extra_context):
+        return super().as_sql(compiler, connection, template="EXTRACT(EPOCH FROM %(expressions)s)", **extra_context)
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return super().as_sql(
+            compiler, connection, template="((julianday(%(expressions)s) - 2440587.5) * 86400.0)", **extra_context
+        )
+
+
+def decayed_score_expression(now=None):
+    """Expression for the current fraud score, for annotate()/alias()/update()."""
+    now = (now or timezone.now()).timestamp()
+    return Case(
+        When(fraud_score_at__isnull=True, then=F("fraud_score")),
+        default=F("fraud_score") * Exp((EpochSeconds("fraud_score_at") - Value(now)) * Value(_decay_rate())),
+        output_field=FloatField(),
+    )
+
+
+def filter_by_score(queryset, min_score, now=None):
+    """
+    Users whose current (decayed) score is at least `min_score`. The stored
+    score is an upper bound, so the plain column comparison prunes first.
+    """
+    return (
+        queryset.filter(fraud_score__gte=min_score)
+        .alias(current_fraud_score=decayed_score_expression(now))
+        .filter(current_fraud_score__gte=min_score)
+    )
+
+
+def add_scores(deltas, now=None):
+    """
+    Add per-user fraud score deltas ({user_id: delta}) in two statements:
+    decay the stored scores to `now` and restart their clocks, then add.
+    """
+    if not deltas:
+        return
+    now = now or timezone.now()
+    with transaction.atomic(savepoint=False):
+        User.objects.filter(pk__in=list(deltas)).update(
+            fraud_score=decayed_score_expression(now),
+            fraud_score_at=now,
+        )
+        update_from_values(User, ["fraud_score"], list(deltas.items()), add=["fraud_score"])
@@ -0,0 +1,131 @@
+"""
+Buffered FraudEvent sink.
+
+record_fraud_event() used to save the User and insert a FraudEvent inline,
+so an abusive client hammering an over-limit endpoint added two writes per
+request exactly when the database was busiest. Now:
+
+  - each user gets at most FRAUD_EVENT_USER_CAP events per
+    FRAUD_EVENT_CAP_WINDOW seconds (one shared-cache counter); the rest are
+    dropped before touching the buffer;
+  - accepted events are buffered per process and flushed when the buffer
+    holds FRAUD_EVENT_BUFFER_SIZE events or its oldest event is
+    FRAUD_EVENT_BUFFER_AGE seconds old (checked on every event and at the
+    end of every request);
+  - a flush is one bulk_create of the events plus fraud_score.add_scores()
+    with the per-user sum (decay to now, then one UPDATE ... FROM VALUES).
+
+FRAUD_EVENT_BUFFER_SIZE = 1 writes every accepted event at once. Buffered
+events are lost if the process dies before the next flush; they are risk
+signals, not ledger entries.
+"""
+import atexit
+import logging
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.signals import request_finished
+from django.db import IntegrityError, transaction
+
+from .fraud_score import add_scores
+from .models import FraudEvent
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+_buffer = []
+_oldest = None
+_lock = threading.Lock()
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _within_cap(user_id):
+    window = _setting("FRAUD_EVENT_CAP_WINDOW", 60)
+    key = f"core:fraud-sink:{user_id}:{int(time.time() // window)}"
+    try:
+        cache.add(key, 0, window * 2)
+        return cache.incr(key) <= _setting("FRAUD_EVENT_USER_CAP", 5)
+    except Exception:
+        logger.exception("Fraud event cap check failed")
+        return True
+
+
+def record(user_id, ip_address, device_id, event_type, score, reason):
+    """Queue one FraudEvent. Returns False if the user's cap dropped it."""
+    global _oldest
+    if not _within_cap(user_id):
+        return False
+
+    event = FraudEvent(
+        user_id=user_id,
+        event_type=event_type,
+        score=score,
+        reason=reason,
+        ip_address=ip_address,
+        device_id=device_id,
+    )
+    with _lock:
+        _buffer.append(event)
+        if _oldest is None:
+            _oldest = time.monotonic()
+        due = _due()
+    if due:
+        flush()
+    return True
+
+
+def _due():
+    return _buffer and (
+        len(_buffer) >= _setting("FRAUD_EVENT_BUFFER_SIZE", 100)
+        or time.monotonic() - _oldest >= _setting("FRAUD_EVENT_BUFFER_AGE", 5)
+    )
+
+
+def _write(events):
+    deltas = defaultdict(float)
+    for event in events:
+        deltas[event.user_id] += event.score
+    with transaction.atomic():
+        FraudEvent.objects.bulk_create(events, batch_size=1000)
+        add_scores(deltas)
+
+
+def flush():
+    """Write the buffered events. Returns how many were written."""
+    global _buffer, _oldest
+    with _lock:
+        events, _buffer, _oldest = _buffer, [], None
+    if not events:
+        return 0
+
+    try:
+        try:
+            _write(events)
+        except IntegrityError:
+            # A user was deleted while its events were buffered
+            existing = set(User.objects.filter(pk__in={e.user_id for e in events}).values_list("pk", flat=True))
+            events = [e for e in events if e.user_id in existing]
+            _write(events)
+    except Exception:
+        logger.exception("Failed to flush %s fraud events", len(events))
+        return 0
+    return len(events)
+
+
+def _flush_if_due(**kwargs):
+    with _lock:
+        due = _due()
+    if due:
+        flush()
+
+
+request_finished.connect(_flush_if_due, dispatch_uid="core.fraud_sink")
+atexit.register(flush)
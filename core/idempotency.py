@@ -0,0 +1,97 @@
+"""
+Idempotency-Key support for client POST endpoints.
+
+Decorate an APIView method with @idempotent. When the request carries an
+`Idempotency-Key` header, the first response for (user, key, path) is
+stored in the cache for IDEMPOTENCY_KEY_TTL seconds and replayed on retries
+(with `Idempotent-Replayed: true`) without running the view again.
+
+Concurrent requests with the same key are collapsed with a cache.add()
+lock: one executes, the others wait up to IDEMPOTENCY_WAIT seconds for its
+response and replay it, or get 409 if it is still running. Reusing a key
+with a different body is rejected with 422. Requests without the header
+behave as before.
+
+Like the other shared-cache features this needs REDIS_URL in production;
+with the in-memory cache keys only collapse within one worker.
+"""
+import functools
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.response import Response
+
+HEADER = "Idempotency-Key"
+MAX_KEY_LENGTH = 255
+LOCK_TIMEOUT = 60
+
+
+def _cache_key(request, key):
+    digest = hashlib.sha256(f"{request.method}:{request.path}:{key}".encode("utf-8")).hexdigest()
+    return f"core:idem:{request.user.pk}:{digest}"
+
+
+def _fingerprint(request):
+    body = json.dumps(request.data, sort_keys=True, default=str) if hasattr(request.data, "items") else ""
+    return hashlib.sha256(body.encode("utf-8")).hexdigest()
+
+
+def _replay(entry, fingerprint):
+    if entry["fingerprint"] != fingerprint:
+        return Response(
+            {"detail": f"{HEADER} was already used with a different request body."},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+        )
+    return Response(entry["data"], status=entry["status"], headers={"Idempotent-Replayed": "true"})
+
+
+def idempotent(method):
+    """Make an authenticated APIView handler honour the Idempotency-Key header."""
+
+    @functools.wraps(method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key or not request.user.is_authenticated:
+            return method(self, request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return Response({"detail": f"{HEADER} is too long."}, status=status.HTTP_400_BAD_REQUEST)
+
+        cache_key = _cache_key(request, key)
+        fingerprint = _fingerprint(request)
+
+        entry = cache.get(cache_key)
+        if entry is not None:
+            return _replay(entry, fingerprint)
+
+        lock_key = f"{cache_key}:lock"
+        if not cache.add(lock_key, 1, LOCK_TIMEOUT):
+            # Another request with this key is running: wait for its response
+            deadline = time.monotonic() + getattr(settings, "IDEMPOTENCY_WAIT", 5)
+            while time.monotonic() < deadline:
+                time.sleep(0.05)
+                entry = cache.get(cache_key)
+                if entry is not None:
+                    return _replay(entry, fingerprint)
+            return Response(
+                {"detail": f"A request with this {HEADER} is still in progress."},
+                status=status.HTTP_409_CONFLICT,
+            )
+
+        try:
+            response = method(self, request, *args, **kwargs)
+            # Server errors are not final: let the client retry them
+            if response.status_code < 500:
+                cache.set(
+                    cache_key,
+                    {"fingerprint": fingerprint, "status": response.status_code, "data": response.data},
+                    getattr(settings, "IDEMPOTENCY_KEY_TTL", 24 * 60 * 60),
+                )
+        finally:
+            cache.delete(lock_key)
+        return response
+
+    return wrapper
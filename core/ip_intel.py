@@ -0,0 +1,203 @@
+"""
+In-process IP intelligence: network reputation and country by IP range.
+
+Range files are local CSVs (no network calls at request time):
+
+  - IP_INTEL_NETWORK_FILES: datacenter / VPN / proxy ranges, one of
+        cidr,label                 e.g. 34.64.0.0/10,datacenter
+        start_ip,end_ip,label      e.g. 185.159.156.0,185.159.159.255,vpn
+  - IP_INTEL_COUNTRY_FILES: country ranges in the same two shapes with an
+    ISO country code as the label (the usual DB-IP / IP2Location layout).
+
+Each file set is loaded into sorted, non-overlapping intervals: starts and
+ends in typed arrays (IPv4) or int lists (IPv6) plus a label per interval.
+A lookup is one bisect per table, O(log n) with no allocation beyond the
+result. Header, comment and malformed lines are skipped.
+
+The loaded index is swapped in with a single reference assignment, so a
+request always sees one complete index. Every IP_INTEL_CHECK_INTERVAL
+seconds the first lookup stats the files; if any changed, the index is
+rebuilt and swapped without restarting workers. Replace files with a
+rename (write to a temp file, then mv) so a reload never reads half a file.
+"""
+import csv
+import ipaddress
+import logging
+import os
+import threading
+import time
+from array import array
+from bisect import bisect_right
+from collections import namedtuple
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+IpInfo = namedtuple("IpInfo", ["ip", "network", "country"])
+IpInfo.__doc__ = "Lookup result: network label (None = not listed) and country code (None = unknown)."
+
+UNKNOWN = IpInfo(None, None, None)
+
+
+# -------------------------------------
+# RANGE TABLES
+# -------------------------------------
+class RangeTable:
+    """Sorted, non-overlapping [start, end] integer intervals with a label each."""
+
+    def __init__(self, ranges):
+        self.v4 = self._build(((s, e, l) for v, s, e, l in ranges if v == 4), "L")
+        self.v6 = self._build(((s, e, l) for v, s, e, l in ranges if v == 6), None)
+
+    @staticmethod
+    def _build(ranges, typecode):
+        starts, ends, labels = [], [], []
+        for start, end, label in sorted(ranges, key=lambda r: (r[0], -r[1])):
+            # Overlaps: the range starting first keeps the shared addresses
+            if ends and start <= ends[-1]:
+                start = ends[-1] + 1
+                if start > end:
+                    continue
+            starts.append(start)
+            ends.append(end)
+            labels.append(label)
+        if typecode:
+            starts, ends = array(typecode, starts), array(typecode, ends)
+        return starts, ends, labels
+
+    def __len__(self):
+        return len(self.v4[0]) + len(self.v6[0])
+
+    def get(self, address):
+        starts, ends, labels = self.v4 if address.version == 4 else self.v6
+        value = int(address)
+        i = bisect_right(starts, value) - 1
+        if i >= 0 and value <= ends[i]:
+            return labels[i]
+        return None
+
+
+def parse_row(row):
+    """(version, start, end, label) for one CSV row, or None if it is not a range."""
+    cells = [c.strip() for c in row]
+    if not cells or not cells[0] or cells[0].startswith("#"):
+        return None
+    try:
+        if len(cells) >= 3:
+            start, end = ipaddress.ip_address(cells[0]), ipaddress.ip_address(cells[1])
+            label = cells[2]
+            if start.version != end.version or start > end:
+                return None
+        elif len(cells) == 2:
+            network = ipaddress.ip_network(cells[0], strict=False)
+            start, end = network.network_address, network.broadcast_address
+            label = cells[1]
+        else:
+            return None
+    except ValueError:
+        return None
+    return start.version, int(start), int(end), label or None
+
+
+def load_table(paths):
+    ranges, skipped = [], 0
+    for path in paths:
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.reader(f):
+                parsed = parse_row(row)
+                if parsed:
+                    ranges.append(parsed)
+                elif row:
+                    skipped += 1
+    table = RangeTable(ranges)
+    if skipped:
+        logger.debug("IP intel: skipped %s non-range line(s) in %s", skipped, ", ".join(paths))
+    return table
+
+
+# -------------------------------------
+# INDEX
+# -------------------------------------
+class IpIntelIndex:
+    def __init__(self, network_files=(), country_files=()):
+        self.networks = load_table(network_files)
+        self.countries = load_table(country_files)
+
+    def lookup(self, ip):
+        try:
+            address = ipaddress.ip_address(ip)
+        except ValueError:
+            return UNKNOWN
+        if address.version == 6 and address.ipv4_mapped:
+            address = address.ipv4_mapped
+        return IpInfo(str(address), self.networks.get(address), self.countries.get(address))
+
+
+def _files():
+    return (
+        tuple(getattr(settings, "IP_INTEL_NETWORK_FILES", ())),
+        tuple(getattr(settings, "IP_INTEL_COUNTRY_FILES", ())),
+    )
+
+
+def _signature(files):
+    signature = []
+    for path in files[0] + files[1]:
+        try:
+            stat = os.stat(path)
+            signature.append((path, stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            signature.append((path, None, None))
+    return tuple(signature)
+
+
+_index = None
+_signature_loaded = None
+_next_check = 0.0
+_reload_lock = threading.Lock()
+
+
+def get_index():
+    """The current index, reloaded when a range file changed."""
+    global _index, _signature_loaded, _next_check
+    if _index is not None and time.monotonic() < _next_check:
+        return _index
+
+    # One thread stats/rebuilds; the others keep using the current index
+    if not _reload_lock.acquire(blocking=_index is None):
+        return _index
+    try:
+        files = _files()
+        signature = _signature(files)
+        if _index is None or signature != _signature_loaded:
+            try:
+                existing = [tuple(p for p in group if os.path.exists(p)) for group in files]
+                index = IpIntelIndex(*existing)
+            except (OSError, UnicodeDecodeError):
+                logger.exception("Failed to load IP intel range files")
+                index = _index or IpIntelIndex()
+            _index, _signature_loaded = index, signature
+            if signature:
+                logger.info(
+                    "IP intel loaded: %s network range(s), %s country range(s)",
+                    len(index.networks), len(index.countries),
+                )
+        _next_check = time.monotonic() + getattr(settings, "IP_INTEL_CHECK_INTERVAL", 30)
+        return _index
+    finally:
+        _reload_lock.release()
+
+
+def lookup(ip):
+    """IpInfo for an IP string (UNKNOWN for missing or invalid input)."""
+    if not ip:
+        return UNKNOWN
+    return get_index().lookup(ip.strip())
+
+
+def reset_index():
+    """Drop the loaded index (tests, or to force an immediate reload)."""
+    global _index, _signature_loaded, _next_check
+    with _reload_lock:
+        _index, _signature_loaded, _next_check = None, None, 0.0
@@ -0,0 +1,239 @@
+"""
+Earnings leaderboards: daily, weekly (ISO week) and all-time.
+
+Each worker keeps the current boards in memory as a SortedList of
+(-score, user_id) keys, so top-N and a user's rank are O(log n). The shared
+cache carries, per board window:
+
+  - a sequence counter and a short-lived log of (user_id, coins) deltas
+    published by the wallet service after each earning credit commits;
+  - a snapshot of the whole board, built from the database by the first
+    worker that needs it (or by `python manage.py rebuild_leaderboards`).
+
+Workers replay new deltas on read. If the log has a gap (evicted keys, a
+worker that fell far behind) they reload the snapshot, and if that is gone
+too they rebuild it from DailyEarningRollup / User.coins_earned_total.
+Windows are part of the cache key, so rollover simply starts a new board.
+Scores are eventually consistent: a delta that commits while a snapshot is
+being built can be counted twice until the next rebuild.
+
+The log only reaches every worker if the cache is shared. Without
+settings.SHARED_CACHE nothing is published; each worker rebuilds its boards
+from the database every LEADERBOARD_LOCAL_TTL seconds instead.
+"""
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import Sum
+from django.utils import timezone
+from sortedcontainers import SortedList
+
+from .models import DailyEarningRollup
+from .stats import EARNING_TYPES
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+BOARDS = ("daily", "weekly", "alltime")
+
+LEADERBOARD_KEY = "core:lb:{window}"
+LEADERBOARD_LOG_TIMEOUT = 60 * 60
+LEADERBOARD_MAX_REPLAY = 5000
+LEADERBOARD_WINDOW_TIMEOUT = {
+    "daily": 2 * 24 * 60 * 60,
+    "weekly": 8 * 24 * 60 * 60,
+    "alltime": None,
+}
+
+
+# -------------------------------------
+# SORTED BOARD
+# -------------------------------------
+class SortedBoard:
+    """Scores by user id, kept in rank order (highest first, then lowest id)."""
+
+    def __init__(self, scores=None):
+        self.scores = dict(scores or {})
+        self._keys = SortedList((-score, user_id) for user_id, score in self.scores.items())
+
+    def __len__(self):
+        return len(self._keys)
+
+    def add(self, user_id, coins):
+        old = self.scores.get(user_id)
+        if old is not None:
+            self._keys.remove((-old, user_id))
+        score = (old or 0) + coins
+        self.scores[user_id] = score
+        self._keys.add((-score, user_id))
+
+    def rank(self, user_id):
+        """1-based rank, or None if the user is not on the board."""
+        score = self.scores.get(user_id)
+        if score is None:
+            return None
+        return self._keys.bisect_left((-score, user_id)) + 1
+
+    def top(self, n):
+        """[(user_id, score), ...] for the first n ranks."""
+        return [(user_id, -neg) for neg, user_id in self._keys.islice(0, n)]
+
+
+# -------------------------------------
+# WINDOWS
+# -------------------------------------
+def board_window(board, day=None):
+    """Cache-key suffix of the board's current window."""
+    day = day or timezone.now().date()
+    if board == "daily":
+        return f"daily:{day.isoformat()}"
+    if board == "weekly":
+        year, week, _ = day.isocalendar()
+        return f"weekly:{year}-W{week:02d}"
+    if board == "alltime":
+        return "alltime"
+    raise ValueError(f"Unknown leaderboard: {board}")
+
+
+def build_scores(board, day=None):
+    """Board scores from the database: {user_id: coins}."""
+    day = day or timezone.now().date()
+    if board == "alltime":
+        return dict(
+            User.objects.filter(coins_earned_total__gt=0).values_list("id", "coins_earned_total")
+        )
+
+    if board == "daily":
+        start = end = day
+    else:
+        start = day - timedelta(days=day.weekday())
+        end = start + timedelta(days=6)
+    rows = (
+        DailyEarningRollup.objects.filter(day__gte=start, day__lte=end, type__in=EARNING_TYPES)
+        .values("user_id")
+        .annotate(total=Sum("coins_sum"))
+        .values_list("user_id", "total")
+    )
+    return {user_id: total for user_id, total in rows if total}
+
+
+# -------------------------------------
+# SHARED STORE
+# -------------------------------------
+def _key(window, part):
+    return f"{LEADERBOARD_KEY.format(window=window)}:{part}"
+
+
+def _board_timeout(window):
+    return LEADERBOARD_WINDOW_TIMEOUT[window.split(":", 1)[0]]
+
+
+def _current_seq(window):
+    return cache.get(_key(window, "seq")) or 0
+
+
+def publish_earning(user_id, coins):
+    """
+    Append a delta to every current board's log. Called by the wallet
+    service on commit; cache failures never fail the credit.
+    """
+    if not coins or not getattr(settings, "SHARED_CACHE", False):
+        return
+    try:
+        entries = {}
+        for board in BOARDS:
+            window = board_window(board)
+            seq_key = _key(window, "seq")
+            cache.add(seq_key, 0, _board_timeout(window))
+            seq = cache.incr(seq_key)
+            entries[_key(window, f"d:{seq}")] = (user_id, coins)
+        cache.set_many(entries, LEADERBOARD_LOG_TIMEOUT)
+    except Exception:
+        logger.exception("Failed to publish leaderboard delta")
+
+
+def rebuild_snapshot(board, day=None):
+    """Rebuild the board window from the database and store it in the cache."""
+    window = board_window(board, day)
+    seq = _current_seq(window)
+    scores = build_scores(board, day)
+    cache.set(_key(window, "snapshot"), (seq, scores), LEADERBOARD_LOG_TIMEOUT)
+    return seq, scores
+
+
+# -------------------------------------
+# IN-PROCESS BOARDS
+# -------------------------------------
+# window -> [SortedBoard, applied_seq, checked_at] for the current windows only
+_local = {}
+_lock = threading.Lock()
+
+
+def _replay(window, board, from_seq, to_seq):
+    """Apply deltas (from_seq, to_seq]; False if any of them is gone."""
+    if to_seq - from_seq > LEADERBOARD_MAX_REPLAY:
+        return False
+    keys = [_key(window, f"d:{seq}") for seq in range(from_seq + 1, to_seq + 1)]
+    deltas = cache.get_many(keys)
+    if len(deltas) != len(keys):
+        return False
+    for key in keys:
+        board.add(*deltas[key])
+    return True
+
+
+def _load(board_name, window, seq):
+    snapshot = cache.get(_key(window, "snapshot"))
+    if snapshot is not None:
+        board = SortedBoard(snapshot[1])
+        if snapshot[0] <= seq and _replay(window, board, snapshot[0], seq):
+            return board, seq
+    snap_seq, scores = rebuild_snapshot(board_name)
+    board = SortedBoard(scores)
+    if seq > snap_seq and _replay(window, board, snap_seq, seq):
+        return board, seq
+    return board, snap_seq
+
+
+def _store(board_name, window, state):
+    # Drop boards from windows that have rolled over
+    for old in [w for w in _local if w.split(":", 1)[0] == board_name]:
+        del _local[old]
+    _local[window] = state
+
+
+def get_board(board_name):
+    """The current window of the board, synced with the shared log."""
+    window = board_window(board_name)
+    shared = getattr(settings, "SHARED_CACHE", False)
+    if shared:
+        interval = getattr(settings, "LEADERBOARD_SYNC_INTERVAL", 2)
+    else:
+        interval = getattr(settings, "LEADERBOARD_LOCAL_TTL", 30)
+
+    with _lock:
+        now = time.monotonic()
+        state = _local.get(window)
+        if state and now - state[2] < interval:
+            return state[0]
+
+        if not shared:
+            state = [SortedBoard(build_scores(board_name)), 0, now]
+            _store(board_name, window, state)
+            return state[0]
+
+        seq = _current_seq(window)
+        if state is None or seq < state[1] or not _replay(window, state[0], state[1], seq):
+            board, applied = _load(board_name, window, seq)
+            state = [board, applied, now]
+            _store(board_name, window, state)
+        else:
+            state[1] = seq
+        state[2] = now
+        return state[0]
@@ -0,0 +1,201 @@
+"""
+Group accounts that share a device, an IP or a referral link.
+Run: python manage.py cluster_accounts --days 90
+
+Streams (user, device) and (user, IP) pairs from User, UserTask and
+FraudEvent plus the referred_by edges, and joins linked users with a
+union-find:
+
+  - the parent array is indexed by user id (8 bytes per user);
+  - devices and IPs are linked one kind at a time. The database interns
+    each value to a dense integer (DENSE_RANK over the UNION of the source
+    tables) and streams the pairs in key order, so only the current key's
+    first user is held: no value strings, and no map that grows with them;
+  - devices/IPs shared by more than --max-key-users accounts across all
+    source tables combined (carrier NAT, public Wi-Fi, placeholder device
+    ids) are skipped so they do not merge unrelated users.
+
+The cluster id is the smallest user id in the cluster. Only users whose
+cluster changed are written back, with one UPDATE ... FROM VALUES per batch.
+"""
+from array import array
+from collections import Counter
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import F, Max
+from django.utils import timezone
+
+from core.bulk import update_from_values
+from core.models import FraudEvent, UserTask
+
+User = get_user_model()
+
+# kind -> (model, value field, time field for --days)
+KEY_SOURCES = {
+    'device': [
+        (User, 'device_id', None),
+        (UserTask, 'device_id', 'started_at'),
+        (FraudEvent, 'device_id', 'created_at'),
+    ],
+    'ip': [
+        (UserTask, 'ip_address', 'started_at'),
+        (FraudEvent, 'ip_address', 'created_at'),
+    ],
+}
+
+
+class UnionFind:
+    """Disjoint sets over 0..size-1; the root is always the smallest member."""
+
+    def __init__(self, size):
+        self.parent = array("q", range(size))
+
+    def find(self, x):
+        parent = self.parent
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]  # path halving
+            x = parent[x]
+        return x
+
+    def union(self, a, b):
+        a, b = self.find(a), self.find(b)
+        if a == b:
+            return False
+        if b < a:
+            a, b = b, a
+        self.parent[b] = a
+        return True
+
+
+class Command(BaseCommand):
+    help = 'Clusters accounts linked by shared devices, IPs and referrals'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=90, help='UserTask/FraudEvent history to scan (0 = all)')
+        parser.add_argument('--max-key-users', type=int, default=20, help='Ignore devices/IPs shared by more accounts')
+        parser.add_argument('--chunk-size', type=int, default=10000, help='Rows fetched per round trip')
+        parser.add_argument('--dry-run', action='store_true', help='Report clusters without writing them')
+
+    def handle(self, *args, **options):
+        self.chunk_size = options['chunk_size']
+        max_id = User.objects.aggregate(m=Max('id'))['m'] or 0
+        self.sets = UnionFind(max_id + 1)
+        self.max_id = max_id
+        self.links = Counter()
+
+        since = timezone.now() - timedelta(days=options['days']) if options['days'] else None
+        cap = options['max_key_users']
+
+        # Referral edges
+        self.union_pairs('referral', User.objects.filter(referred_by__isnull=False).values_list('id', 'referred_by_id'))
+
+        # Shared devices and IPs, one kind at a time
+        for kind, sources in KEY_SOURCES.items():
+            pairs = [self.key_pairs(kind, model, field, time_field, since) for model, field, time_field in sources]
+            keys, skipped = self.union_keys(kind, self.key_rows(pairs), cap)
+            self.stdout.write(f"   {kind}: {keys} distinct values, {skipped} skipped as shared")
+
+        clusters = self.write_back(options['dry_run'])
+        self.stdout.write(
+            f"   links: {dict(self.links)}\n"
+            f"   clusters of 2+ accounts: {len(clusters)}, accounts in them: {sum(clusters.values())}"
+        )
+        for root, size in clusters.most_common(10):
+            self.stdout.write(f"   cluster {root}: {size} accounts")
+        self.stdout.write(self.style.SUCCESS("\n✅ Account clustering done" + (" (dry run)" if options['dry_run'] else "")))
+
+    # -------------------------------------
+    # LINKING
+    # -------------------------------------
+    def key_pairs(self, kind, model, field, time_field, since):
+        """Distinct (user id, value) pairs of one source table."""
+        queryset = model.objects.exclude(**{f'{field}__isnull': True})
+        if kind == 'device':
+            queryset = queryset.exclude(**{field: ''})
+        if since and time_field:
+            queryset = queryset.filter(**{f'{time_field}__gte': since})
+        user_field = 'id' if model is User else 'user_id'
+        return (
+            queryset.annotate(cluster_user=F(user_field), cluster_key=F(field))
+            .values_list('cluster_user', 'cluster_key')
+            .distinct()
+            .order_by()
+        )
+
+    def key_rows(self, pairs):
+        """
+        (user id, key id, accounts sharing the key) over the UNION of the
+        sources' distinct pairs, ordered by key id. The key id is the value
+        interned to a dense integer by the database.
+        """
+        parts, params = [], []
+        for queryset in pairs:
+            sql, part_params = queryset.query.sql_with_params()
+            parts.append(sql)
+            params.extend(part_params)
+        sql = (
+            "SELECT cluster_user, key_id, key_users FROM ("
+            "SELECT cluster_user, DENSE_RANK() OVER (ORDER BY cluster_key) AS key_id, "
+            "COUNT(*) OVER (PARTITION BY cluster_key) AS key_users "
+            f"FROM ({' UNION '.join(parts)}) pairs"
+            ") ranked ORDER BY key_id"
+        )
+        # Server-side cursor on PostgreSQL, so rows arrive in chunks
+        with connection.chunked_cursor() as cursor:
+            cursor.execute(sql, params)
+            while rows := cursor.fetchmany(self.chunk_size):
+                yield from rows
+
+    def union_pairs(self, kind, pairs):
+        for a, b in pairs.iterator(chunk_size=self.chunk_size):
+            if a <= self.max_id and b <= self.max_id and self.sets.union(a, b):
+                self.links[kind] += 1
+
+    def union_keys(self, kind, rows, cap):
+        """Link each key's users to its first user. Returns (keys, keys skipped as shared)."""
+        keys = skipped = 0
+        current = first = None
+        for user_id, key_id, key_users in rows:
+            if key_id != current:
+                current, first = key_id, None
+                keys += 1
+                skipped += key_users > cap
+            if key_users > cap or user_id > self.max_id:
+                continue
+            if first is None:
+                first = user_id
+            elif self.sets.union(user_id, first):
+                self.links[kind] += 1
+        return keys, skipped
+
+    # -------------------------------------
+    # WRITE BACK
+    # -------------------------------------
+    def write_back(self, dry_run):
+        find = self.sets.find
+        roots = array("q", (find(x) for x in range(self.max_id + 1)))
+        sizes = array("q", [0]) * len(roots)
+        for root in roots:
+            sizes[root] += 1
+        clusters = Counter({x: sizes[x] for x, root in enumerate(roots) if root == x and sizes[x] > 1})
+
+        # Only users whose cluster changed, including formerly clustered ones to reset
+        previous = {
+            pk: (cluster, size)
+            for pk, cluster, size in User.objects.filter(account_cluster__isnull=False)
+            .values_list('id', 'account_cluster', 'account_cluster_size')
+            .iterator(chunk_size=self.chunk_size)
+        }
+        changes = []
+        for x, root in enumerate(roots):
+            current = (root, sizes[root]) if sizes[root] > 1 else (None, 1)
+            if previous.get(x, (None, 1)) != current:
+                changes.append((x, *current))
+
+        if not dry_run:
+            update_from_values(User, ['account_cluster', 'account_cluster_size'], changes)
+        self.stdout.write(f"   {len(changes)} user(s) {'would change' if dry_run else 'updated'}")
+        return clusters
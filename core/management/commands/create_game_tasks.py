@@ -3,6 +3,7 @@ Django management command to create sample game tasks.
 Run: python manage.py create_game_tasks
 """
 from django.core.management.base import BaseCommand
+from core.catalog import invalidate_task_catalog
 from core.models import Task
 
 
@@ -47,6 +48,7 @@ class Command(BaseCommand):
         video_tasks = Task.objects.filter(type='video', is_active=True)
         if video_tasks.exists():
             deactivated_count = video_tasks.update(is_active=False)
+            invalidate_task_catalog()  # update() skips the Task signals
             self.stdout.write(
                 self.style.WARNING(f'Deactivated {deactivated_count} video task(s)')
             )
@@ -0,0 +1,52 @@
+"""
+Export withdrawal requests for payout as CSV or NDJSON.
+Run: python manage.py export_payouts --mark --output payouts.csv
+
+Rows are streamed straight to the file (or stdout), so memory stays flat
+however many requests match. With --mark the matching approved requests
+that are not in a payout batch yet are stamped with a new batch id first,
+and only that batch is exported; re-export it later with --batch <id>.
+"""
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from core.models import WithdrawRequest
+from core.payouts import FORMATS, iter_export, mark_batch, payout_queryset
+
+
+class Command(BaseCommand):
+    help = 'Streams withdrawal requests for payout as CSV or NDJSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=sorted(FORMATS), default='csv')
+        parser.add_argument('--status', default=WithdrawRequest.STATUS_APPROVED, help='Request status to export')
+        parser.add_argument('--method', default=None, help='Only this payout method (e.g. esewa)')
+        parser.add_argument('--start', type=date.fromisoformat, help='First request day (YYYY-MM-DD)')
+        parser.add_argument('--end', type=date.fromisoformat, help='Last request day (YYYY-MM-DD)')
+        parser.add_argument('--batch', default=None, help='Re-export an existing payout batch (other filters ignored)')
+        parser.add_argument('--mark', action='store_true', help='Stamp the unbatched rows with a new payout batch')
+        parser.add_argument('--output', default='-', help='File to write (default: stdout)')
+
+    def handle(self, *args, **options):
+        queryset = payout_queryset(
+            status=options['status'],
+            method=options['method'],
+            start=options['start'],
+            end=options['end'],
+            batch=options['batch'],
+        )
+
+        if options['mark']:
+            batch, rows = mark_batch(queryset)
+            queryset = payout_queryset(status=None, batch=batch)
+            self.stderr.write(f"Payout batch {batch}: {rows} request(s)")
+
+        lines = iter_export(queryset, options['format'])
+        if options['output'] == '-':
+            for line in lines:
+                self.stdout.write(line, ending='')
+        else:
+            with open(options['output'], 'w', newline='', encoding='utf-8') as out:
+                out.writelines(lines)
+            self.stderr.write(self.style.SUCCESS(f"✅ Wrote {options['output']}"))
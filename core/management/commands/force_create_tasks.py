@@ -3,6 +3,7 @@ Force create all game tasks, deleting existing ones first.
 Run: python manage.py force_create_tasks
 """
 from django.core.management.base import BaseCommand
+from core.catalog import invalidate_task_catalog
 from core.models import Task
 
 
@@ -48,6 +49,7 @@ class Command(BaseCommand):
         
         # Deactivate video tasks
         video_deactivated = Task.objects.filter(type='video', is_active=True).update(is_active=False)
+        invalidate_task_catalog()  # update() skips the Task signals
         if video_deactivated > 0:
             self.stdout.write(
                 self.style.WARNING(f'Deactivated {video_deactivated} video task(s)')
@@ -0,0 +1,251 @@
+"""
+Replay synthetic offerwall postbacks and verify exactly-once application.
+Run: python manage.py loadtest_postbacks --count 2000 --concurrency 16 --duplicate-rate 0.3
+
+Creates throwaway users (loadtest_<run>_<n>) seeded with a large balance,
+generates a stream of CPX/Tapjoy credits with the requested duplicate rate,
+shuffles it so retries race the original delivery, and fires it from a
+thread pool through the Django test client (or against a running server
+with --url). A share of the CPX credits is followed by a reversal with the
+same trans_id, as CPX sends them. It then reports throughput and
+p50/p95/p99 latency and checks that every user's balance moved by exactly
+the sum of their credited, unreversed CPXTransaction/TapjoyTransaction
+amounts, with one transaction row per id and every reversal recorded.
+
+Use a development or staging database. SQLite serialises writers, so
+concurrency above 1 mostly measures lock waits there.
+"""
+import json
+import random
+import statistics
+import threading
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import HTTPError
+from urllib.parse import urlencode
+from urllib.request import Request, urlopen
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Sum
+from django.test import Client
+
+from core.models import CPXTransaction, PostbackInbox, TapjoyTransaction
+from core.postbacks import inbox_enabled, process_batch
+
+User = get_user_model()
+
+SEED_BALANCE = 1_000_000
+
+
+class Command(BaseCommand):
+    help = 'Load-tests the offerwall postback endpoints and verifies exactly-once crediting'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=1000, help='Unique postbacks to generate')
+        parser.add_argument('--users', type=int, default=50, help='Synthetic users to spread them over')
+        parser.add_argument('--duplicate-rate', type=float, default=0.2, help='Share of postbacks delivered twice')
+        parser.add_argument('--reversal-rate', type=float, default=0.05, help='Share of CPX credits later reversed (status=2, same trans_id)')
+        parser.add_argument('--provider', choices=['cpx', 'tapjoy', 'mixed'], default='mixed')
+        parser.add_argument('--concurrency', type=int, default=8, help='Worker threads')
+        parser.add_argument('--url', default='', help='Base URL of a running server (default: in-process test client)')
+        parser.add_argument('--seed', type=int, default=None, help='Random seed for a reproducible stream')
+        parser.add_argument('--keep', action='store_true', help='Keep the synthetic users afterwards')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        run = uuid.uuid4().hex[:8]
+
+        users = self.create_users(run, max(1, options['users']))
+        stream, expected, reversed_ids = self.generate(run, users, rng, options)
+
+        self.stdout.write(
+            f"Run {run}: {len(stream)} requests ({len(expected)} unique ids, {len(reversed_ids)} reversed) "
+            f"for {len(users)} users, concurrency {options['concurrency']}"
+        )
+
+        try:
+            results, elapsed = self.fire(stream, options)
+            if inbox_enabled():
+                self.drain_inbox()
+            self.report(results, elapsed)
+            self.verify(users, expected, reversed_ids)
+        finally:
+            if not options['keep']:
+                User.objects.filter(pk__in=[u.pk for u in users]).delete()
+                PostbackInbox.objects.filter(external_id__startswith=f"lt-{run}-").delete()
+
+    # -------------------------------------
+    # STREAM
+    # -------------------------------------
+    def create_users(self, run, count):
+        User.objects.bulk_create([
+            User(username=f"loadtest_{run}_{n}", coins_balance=SEED_BALANCE, ref_code=f"LT{run}{n}"[:20])
+            for n in range(count)
+        ])
+        return list(User.objects.filter(username__startswith=f"loadtest_{run}_"))
+
+    def generate(self, run, users, rng, options):
+        """
+        Return (shuffled requests, {(provider, id): (user_id, net coins)},
+        reversed CPX ids). Each request gets a random position; a reversal
+        is placed after its credit, so it usually debits, but a duplicate
+        of it can still race ahead of the credit.
+        """
+        keyed = []
+        expected = {}
+        reversed_ids = []
+
+        def add(request, position):
+            keyed.append((position, request))
+            if rng.random() < options['duplicate_rate']:
+                keyed.append((rng.random(), request))
+
+        for n in range(max(1, options['count'])):
+            provider = options['provider']
+            if provider == 'mixed':
+                provider = rng.choice(['cpx', 'tapjoy'])
+            user = rng.choice(users)
+            coins = rng.randint(1, 500)
+            external_id = f"lt-{run}-{n}"
+            path = f"/api/offerwalls/{provider}/postback/"
+            position = rng.random()
+
+            if provider == 'cpx':
+                params = {'trans_id': external_id, 'ext_user_id': user.pk, 'amount': coins, 'status': 1}
+                add((path, params), position)
+                if rng.random() < options['reversal_rate']:
+                    add((path, {**params, 'status': 2}), rng.uniform(position, 1.0))
+                    reversed_ids.append(external_id)
+                    coins = 0
+                expected[('cpx', external_id)] = (user.pk, coins)
+            else:
+                params = {'transaction_id': external_id, 'user_id': user.pk, 'currency': coins}
+                add((path, params), position)
+                expected[('tapjoy', external_id)] = (user.pk, coins)
+
+        keyed.sort(key=lambda item: item[0])
+        return [request for _, request in keyed], expected, reversed_ids
+
+    # -------------------------------------
+    # FIRE
+    # -------------------------------------
+    def fire(self, stream, options):
+        base_url = options['url'].rstrip('/')
+        local = threading.local()
+
+        def send(request):
+            path, params = request
+            started = time.perf_counter()
+            if base_url:
+                status = self.send_http(base_url + path, params)
+            else:
+                if not hasattr(local, 'client'):
+                    # Count server errors instead of re-raising them
+                    local.client = Client(raise_request_exception=False)
+                status = local.client.get(path, params).status_code
+            return status, time.perf_counter() - started
+
+        concurrency = max(1, options['concurrency'])
+        started = time.perf_counter()
+        if concurrency == 1:
+            results = [send(request) for request in stream]
+        else:
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                results = list(pool.map(send, stream))
+        return results, time.perf_counter() - started
+
+    def send_http(self, url, params):
+        try:
+            with urlopen(Request(f"{url}?{urlencode(params)}"), timeout=30) as response:
+                return response.status
+        except HTTPError as e:
+            return e.code
+
+    def drain_inbox(self):
+        while True:
+            counts = process_batch()
+            if not counts['claimed']:
+                break
+
+    # -------------------------------------
+    # REPORT / VERIFY
+    # -------------------------------------
+    def report(self, results, elapsed):
+        latencies = sorted(latency * 1000 for _, latency in results)
+        errors = defaultdict(int)
+        for status, _ in results:
+            if status != 200:
+                errors[status] += 1
+
+        if len(latencies) >= 2:
+            cuts = statistics.quantiles(latencies, n=100)
+            p50, p95, p99 = cuts[49], cuts[94], cuts[98]
+        else:
+            p50 = p95 = p99 = latencies[0] if latencies else 0.0
+
+        self.stdout.write(
+            f"   {len(results)} requests in {elapsed:.2f}s "
+            f"({len(results) / elapsed if elapsed else 0:.0f} req/s)\n"
+            f"   latency ms: p50 {p50:.1f}, p95 {p95:.1f}, p99 {p99:.1f}, max {latencies[-1] if latencies else 0:.1f}\n"
+            f"   non-200 responses: {json.dumps(errors) if errors else 'none'}"
+        )
+
+    def verify(self, users, expected, reversed_ids):
+        user_ids = [u.pk for u in users]
+        problems = []
+
+        # Exactly one transaction row per generated id
+        cpx_ids = [external_id for provider, external_id in expected if provider == 'cpx']
+        tapjoy_ids = [external_id for provider, external_id in expected if provider == 'tapjoy']
+        rows = (
+            CPXTransaction.objects.filter(trans_id__in=cpx_ids).count()
+            + TapjoyTransaction.objects.filter(transaction_id__in=tapjoy_ids).count()
+        )
+        if rows != len(expected):
+            problems.append(f"{rows} transaction rows for {len(expected)} unique ids")
+
+        # Every reversal recorded on its credit's row; most of them debited
+        reversed_rows = dict(
+            CPXTransaction.objects.filter(trans_id__in=reversed_ids, status=2).values_list('trans_id', 'applied')
+        )
+        if len(reversed_rows) != len(reversed_ids):
+            problems.append(f"{len(reversed_ids) - len(reversed_rows)} reversal(s) not recorded")
+        debited = sum(reversed_rows.values())
+        self.stdout.write(
+            f"   reversals: {debited} debited a credit, {len(reversed_rows) - debited} arrived first and blocked it"
+        )
+
+        # Balance moved by exactly the credited, unreversed amounts
+        applied = defaultdict(int)
+        for user_id, amount in CPXTransaction.objects.filter(
+            user_id__in=user_ids, applied=True, status=1
+        ).values_list('user_id', 'amount_local'):
+            applied[user_id] += amount
+        for user_id, total in TapjoyTransaction.objects.filter(
+            user_id__in=user_ids, applied=True
+        ).values('user_id').annotate(total=Sum('currency_amount')).values_list('user_id', 'total'):
+            applied[user_id] += total
+
+        generated = defaultdict(int)
+        for user_id, coins in expected.values():
+            generated[user_id] += coins
+
+        for user_id, balance in User.objects.filter(pk__in=user_ids).values_list('pk', 'coins_balance'):
+            moved = balance - SEED_BALANCE
+            if moved != applied[user_id] or moved != generated[user_id]:
+                problems.append(
+                    f"user {user_id}: balance moved {moved}, applied rows {applied[user_id]}, "
+                    f"generated {generated[user_id]}"
+                )
+
+        if problems:
+            for problem in problems[:20]:
+                self.stdout.write(self.style.ERROR(f"   ✗ {problem}"))
+            raise CommandError(f"Exactly-once check failed ({len(problems)} problem(s))")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"\n✅ Exactly-once verified: {len(expected)} ids, {len(user_ids)} balances match"
+        ))
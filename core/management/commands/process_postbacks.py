@@ -0,0 +1,102 @@
+"""
+Apply queued offerwall postbacks from the PostbackInbox.
+Run: python manage.py process_postbacks [--once] [--batch-size 500]
+
+Runs until stopped, polling every --sleep seconds when the inbox is empty.
+With --once it makes a single pass over the rows pending when it starts;
+rows left for retry (a concurrent worker inserted the same id) stay pending
+for the next run.
+Several workers can run side by side on PostgreSQL (rows are claimed with
+SELECT ... FOR UPDATE SKIP LOCKED). Each batch logs its counts, throughput
+and the inbox lag.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Max
+
+from core.models import PostbackInbox
+from core.postbacks import postback_lag, process_batch
+
+
+class Command(BaseCommand):
+    help = 'Applies pending PostbackInbox rows in batches grouped by user'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Inbox rows claimed per batch',
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=1.0,
+            help='Seconds to wait when the inbox is empty',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Make one pass over the rows pending at start and exit',
+        )
+        parser.add_argument(
+            '--stats',
+            action='store_true',
+            help='Print the inbox lag and exit',
+        )
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            self.report_lag()
+            return
+
+        batch_size = max(1, options['batch_size'])
+        totals = {'claimed': 0, 'applied': 0, 'duplicate': 0, 'failed': 0, 'retry': 0}
+
+        # --once makes a single pass over the ids pending now, so rows left
+        # for retry (or arriving meanwhile) cannot keep it running
+        after_id = up_to_id = None
+        if options['once']:
+            up_to_id = PostbackInbox.objects.filter(processed_at__isnull=True).aggregate(last=Max('id'))['last'] or 0
+            after_id = 0
+
+        try:
+            while True:
+                started = time.monotonic()
+                counts = process_batch(batch_size, after_id=after_id, up_to_id=up_to_id)
+                elapsed = time.monotonic() - started
+
+                if counts['claimed']:
+                    for key in totals:
+                        totals[key] += counts[key]
+                    lag = postback_lag()
+                    self.stdout.write(
+                        f"   batch: {counts['claimed']} rows, {counts['users']} users | "
+                        f"applied {counts['applied']}, duplicate {counts['duplicate']}, "
+                        f"failed {counts['failed']}, retry {counts['retry']} | "
+                        f"{counts['claimed'] / elapsed if elapsed else 0:.0f} rows/s | "
+                        f"lag: {lag['pending']} pending, oldest {lag['oldest_age_seconds']:.1f}s"
+                    )
+
+                if options['once']:
+                    if counts['claimed'] < batch_size:
+                        break
+                    after_id = counts['last_id']
+                # A full batch means there is probably more waiting
+                elif counts['claimed'] < batch_size:
+                    time.sleep(options['sleep'])
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.SUCCESS(
+            f"\n✅ Processed {totals['claimed']} postbacks "
+            f"(applied {totals['applied']}, duplicate {totals['duplicate']}, failed {totals['failed']}, "
+            f"retry {totals['retry']})"
+        ))
+
+    def report_lag(self):
+        lag = postback_lag()
+        self.stdout.write(
+            f"Pending postbacks: {lag['pending']}, oldest {lag['oldest_age_seconds']:.1f}s"
+        )
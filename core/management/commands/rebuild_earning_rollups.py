@@ -0,0 +1,105 @@
+"""
+Rebuild DailyEarningRollup rows from WalletTransaction for a date range.
+Run: python manage.py rebuild_earning_rollups --start 2025-01-01 --end 2025-01-31
+
+The range is processed in chunks of days. Each chunk deletes its rollup rows
+and re-inserts them from a GROUP BY (user, day, type) streamed with
+iterator(), so memory stays bounded however large the ledger is.
+Rebuilding today while transactions are still being written can race with
+the live counters; prefer past days or a quiet period.
+"""
+from datetime import date, timedelta, timezone as dt_timezone
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, Min, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from core.models import DailyEarningRollup, WalletTransaction
+from core.utils import day_range
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds DailyEarningRollup rows from WalletTransaction for a date range'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--start',
+            type=date.fromisoformat,
+            help='First day to rebuild (YYYY-MM-DD). Default: first transaction day',
+        )
+        parser.add_argument(
+            '--end',
+            type=date.fromisoformat,
+            help='Last day to rebuild (YYYY-MM-DD). Default: today',
+        )
+        parser.add_argument(
+            '--chunk-days',
+            type=int,
+            default=7,
+            help='Days rebuilt per transaction',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=2000,
+            help='Rows fetched / inserted per round trip',
+        )
+
+    def handle(self, *args, **options):
+        end = options['end'] or timezone.now().date()
+        start = options['start']
+        if start is None:
+            first = WalletTransaction.objects.aggregate(first=Min('created_at'))['first']
+            if first is None:
+                self.stdout.write(self.style.WARNING('No wallet transactions found'))
+                return
+            start = first.astimezone(dt_timezone.utc).date()
+
+        if start > end:
+            raise CommandError('--start must be on or before --end')
+
+        chunk_days = max(1, options['chunk_days'])
+        batch_size = max(1, options['batch_size'])
+
+        total_rows = 0
+        chunk_start = start
+        while chunk_start <= end:
+            chunk_end = min(chunk_start + timedelta(days=chunk_days - 1), end)
+            rows = self.rebuild_chunk(chunk_start, chunk_end, batch_size)
+            total_rows += rows
+            self.stdout.write(f'   {chunk_start} .. {chunk_end}: {rows} rollup rows')
+            chunk_start = chunk_end + timedelta(days=1)
+
+        self.stdout.write(
+            self.style.SUCCESS(f'\n✅ Rebuilt {total_rows} rollup rows for {start} .. {end}')
+        )
+
+    def rebuild_chunk(self, chunk_start, chunk_end, batch_size):
+        range_start, range_end = day_range(chunk_start, chunk_end)
+
+        grouped = (
+            WalletTransaction.objects.filter(created_at__gte=range_start, created_at__lt=range_end)
+            .annotate(day=TruncDate('created_at', tzinfo=dt_timezone.utc))
+            .values('user_id', 'day', 'type')
+            .annotate(coins_sum=Sum('coins'), tx_count=Count('id'))
+            .order_by()
+        )
+
+        written = 0
+        with transaction.atomic():
+            DailyEarningRollup.objects.filter(day__gte=chunk_start, day__lte=chunk_end).delete()
+
+            batch = []
+            for row in grouped.iterator(chunk_size=batch_size):
+                batch.append(DailyEarningRollup(**row))
+                if len(batch) >= batch_size:
+                    DailyEarningRollup.objects.bulk_create(batch)
+                    written += len(batch)
+                    batch = []
+            if batch:
+                DailyEarningRollup.objects.bulk_create(batch)
+                written += len(batch)
+
+        return written
@@ -0,0 +1,29 @@
+"""
+Rebuild the cached leaderboard snapshots from the database.
+Run: python manage.py rebuild_leaderboards [--board daily|weekly|alltime]
+
+Workers build a missing snapshot on demand; run this after deploy, after
+restoring the cache, or from cron to clear any drift in the live boards.
+"""
+from django.core.management.base import BaseCommand
+
+from core.leaderboard import BOARDS, board_window, rebuild_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds leaderboard snapshots from DailyEarningRollup and user totals'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--board',
+            choices=BOARDS,
+            action='append',
+            help='Board to rebuild (repeatable). Default: all boards',
+        )
+
+    def handle(self, *args, **options):
+        for board in options['board'] or BOARDS:
+            seq, scores = rebuild_snapshot(board)
+            self.stdout.write(f'   {board_window(board)}: {len(scores)} users (log seq {seq})')
+
+        self.stdout.write(self.style.SUCCESS('\n✅ Leaderboards rebuilt'))
@@ -3,6 +3,7 @@ Remove/deactivate all video tasks.
 Run: python manage.py remove_video_tasks
 """
 from django.core.management.base import BaseCommand
+from core.catalog import invalidate_task_catalog
 from core.models import Task
 
 
@@ -15,6 +16,7 @@ class Command(BaseCommand):
         
         if count > 0:
             video_tasks.update(is_active=False)
+            invalidate_task_catalog()  # update() skips the Task signals
             self.stdout.write(
                 self.style.SUCCESS(f'✅ Deactivated {count} video task(s)')
             )
@@ -0,0 +1,64 @@
+"""
+Flag users whose task completions are consistently much faster than everyone else's.
+Run nightly: python manage.py score_task_timing --days 1
+
+Loads the window's completions into NumPy arrays, computes per-task-type
+robust z-scores (median / MAD) and each user's median z-score, then writes
+one FraudEvent per outlier with a single bulk insert and raises fraud_score
+with one UPDATE ... FROM VALUES (see core/timing_scores.py).
+Users already flagged for the window are skipped, so reruns are safe.
+"""
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from core.models import FraudEvent
+from core.timing_scores import NUMPY_AVAILABLE, find_outliers, load_durations, record_outliers, robust_z
+
+
+class Command(BaseCommand):
+    help = 'Scores task completion timing and flags statistical outliers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=1, help='Window of completions to score, ending now')
+        parser.add_argument('--threshold', type=float, default=3.5, help='Flag users with median robust z <= -threshold')
+        parser.add_argument('--min-tasks', type=int, default=5, help='Completions a user needs in the window')
+        parser.add_argument('--dry-run', action='store_true', help='Report outliers without writing anything')
+
+    def handle(self, *args, **options):
+        if not NUMPY_AVAILABLE:
+            raise CommandError("NumPy is required: pip install numpy")
+
+        end = timezone.now()
+        start = end - timedelta(days=options['days'])
+        started = time.perf_counter()
+
+        users, types, durations, names = load_durations(start, end)
+        loaded = time.perf_counter()
+        z = robust_z(types, durations)
+        outliers = find_outliers(users, z, options['threshold'], options['min_tasks'])
+
+        flagged = set(
+            FraudEvent.objects.filter(event_type="timing_anomaly", created_at__gte=start)
+            .values_list('user_id', flat=True)
+        )
+        outliers = [o for o in outliers if o[0] not in flagged]
+
+        self.stdout.write(
+            f"   {len(durations)} completions, {len(set(users.tolist()))} users, types: {', '.join(names) or '-'}\n"
+            f"   loaded in {loaded - started:.1f}s, scored in {time.perf_counter() - loaded:.2f}s\n"
+            f"   outliers: {len(outliers)}"
+        )
+        for user_id, median_z, count in outliers[:20]:
+            self.stdout.write(f"   user {user_id}: median z {median_z:.1f} over {count} completions")
+
+        if outliers and not options['dry_run']:
+            with transaction.atomic():
+                record_outliers(outliers, f"{start:%Y-%m-%d %H:%M} to {end:%Y-%m-%d %H:%M}")
+
+        self.stdout.write(self.style.SUCCESS(
+            "\n✅ Timing scores done" + (" (dry run)" if options['dry_run'] else "")
+        ))
@@ -0,0 +1,41 @@
+"""
+Unlock every achievement users already qualify for.
+Run: python manage.py sync_achievements
+
+Run once after deploying the achievement counters, or after adding a rule
+with a target some users have already passed.
+"""
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from core.achievements import RULES, sync_achievements
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Creates UserAchievement rows for rules users already satisfy'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Users evaluated per batch',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options['batch_size'])
+        counters = sorted({rule.counter for rule in RULES.values()})
+
+        batch = []
+        total = 0
+        for user in User.objects.only('pk', *counters).iterator(chunk_size=batch_size):
+            batch.append(user)
+            if len(batch) >= batch_size:
+                total += sync_achievements(batch)
+                batch = []
+        if batch:
+            total += sync_achievements(batch)
+
+        self.stdout.write(self.style.SUCCESS(f'✅ {total} achievement(s) unlocked or already present'))
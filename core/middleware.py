@@ -0,0 +1,40 @@
+"""
+Request middleware.
+"""
+from django.conf import settings
+
+from .ip_intel import lookup
+
+
+def client_ip(request):
+    """
+    The client address as seen by the outermost trusted proxy.
+
+    Each of the settings.TRUSTED_PROXY_COUNT proxies in front of the app
+    appends the address it received the request from to X-Forwarded-For, so
+    the client is the entry that many places from the right; anything to
+    its left was sent by the client and is ignored. With no trusted proxies,
+    or a header shorter than that, REMOTE_ADDR is used.
+    """
+    proxies = getattr(settings, "TRUSTED_PROXY_COUNT", 1)
+    forwarded = request.META.get("HTTP_X_FORWARDED_FOR", "")
+    if proxies > 0 and forwarded:
+        entries = [entry.strip() for entry in forwarded.split(",")]
+        if len(entries) >= proxies and entries[-proxies]:
+            return entries[-proxies]
+    return request.META.get("REMOTE_ADDR")
+
+
+class IpIntelMiddleware:
+    """
+    Sets request.client_ip and request.ip_info (core.ip_intel.IpInfo) so
+    views, fraud checks and eligibility checks share one in-process lookup.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.client_ip = client_ip(request)
+        request.ip_info = lookup(request.client_ip)
+        return self.get_response(request)
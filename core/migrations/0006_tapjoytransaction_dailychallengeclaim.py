@@ -0,0 +1,45 @@
+# Generated by Django 5.2.9 on 2026-10-18 11:47
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_add_streak_and_level'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='task',
+            name='type',
+            field=models.CharField(choices=[('video', 'Video'), ('quiz', 'Quiz'), ('offerwall', 'Offerwall'), ('tapjoy_offerwall', 'Tapjoy Offerwall'), ('scratch_card', 'Scratch Card'), ('spin_wheel', 'Spin Wheel'), ('puzzle', 'Puzzle')], max_length=20),
+        ),
+        migrations.CreateModel(
+            name='TapjoyTransaction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('transaction_id', models.CharField(max_length=100, unique=True)),
+                ('currency_amount', models.IntegerField(default=0)),
+                ('applied', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DailyChallengeClaim',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('challenge_id', models.CharField(max_length=50)),
+                ('claimed_date', models.DateField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='challenge_claims', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'challenge_id', 'claimed_date'], name='core_dailyc_user_id_f1b5d2_idx')],
+                'unique_together': {('user', 'challenge_id', 'claimed_date')},
+            },
+        ),
+    ]
@@ -0,0 +1,94 @@
+# Generated by Django 5.2.9 on 2026-10-18 11:47
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+
+def backfill_today(apps, schema_editor):
+    """
+    Seed today's UserDailyStats rows from the existing tables so the daily
+    limits keep working across the deploy (only today is read by limits).
+    """
+    UserTask = apps.get_model("core", "UserTask")
+    WalletTransaction = apps.get_model("core", "WalletTransaction")
+    UserDailyStats = apps.get_model("core", "UserDailyStats")
+
+    today = timezone.now().date()
+    exempt = ["offerwall", "tapjoy_offerwall", "scratch_card", "spin_wheel", "puzzle", "quiz"]
+    rows = {}
+
+    def row(user_id):
+        return rows.setdefault(user_id, UserDailyStats(user_id=user_id, date=today))
+
+    started = (
+        UserTask.objects.filter(started_at__date=today)
+        .values("user_id", "task__type")
+        .annotate(n=Count("id"))
+    )
+    for r in started:
+        stats = row(r["user_id"])
+        stats.tasks_started += r["n"]
+        if r["task__type"] not in exempt:
+            stats.limited_tasks_started += r["n"]
+
+    completed = (
+        UserTask.objects.filter(status="completed", completed_at__date=today)
+        .values("user_id", "task__type")
+        .annotate(n=Count("id"))
+    )
+    for r in completed:
+        stats = row(r["user_id"])
+        stats.tasks_completed += r["n"]
+        field = f"{r['task__type']}_completed"
+        setattr(stats, field, getattr(stats, field, 0) + r["n"])
+
+    coins = (
+        WalletTransaction.objects.filter(created_at__date=today)
+        .values("user_id", "type")
+        .annotate(total=Sum("coins"))
+    )
+    for r in coins:
+        if r["type"] in ("earn", "bonus", "referral", "withdraw"):
+            setattr(row(r["user_id"]), f"{r['type']}_coins", r["total"] or 0)
+
+    UserDailyStats.objects.bulk_create(rows.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_tapjoytransaction_dailychallengeclaim'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('tasks_started', models.IntegerField(default=0)),
+                ('limited_tasks_started', models.IntegerField(default=0)),
+                ('tasks_completed', models.IntegerField(default=0)),
+                ('video_completed', models.IntegerField(default=0)),
+                ('quiz_completed', models.IntegerField(default=0)),
+                ('offerwall_completed', models.IntegerField(default=0)),
+                ('tapjoy_offerwall_completed', models.IntegerField(default=0)),
+                ('scratch_card_completed', models.IntegerField(default=0)),
+                ('spin_wheel_completed', models.IntegerField(default=0)),
+                ('puzzle_completed', models.IntegerField(default=0)),
+                ('earn_coins', models.IntegerField(default=0)),
+                ('bonus_coins', models.IntegerField(default=0)),
+                ('referral_coins', models.IntegerField(default=0)),
+                ('withdraw_coins', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'User daily stats',
+                'unique_together': {('user', 'date')},
+            },
+        ),
+        migrations.RunPython(backfill_today, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.9 on 2026-10-18 11:51
+
+from django.db import migrations, models
+
+from core.migration_operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('core', '0007_userdailystats'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='user',
+            index=models.Index(fields=['referred_by', 'date_joined', 'id'], name='user_referrer_joined_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='wallettransaction',
+            index=models.Index(fields=['user', 'created_at', 'id'], name='wallettx_user_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='withdrawrequest',
+            index=models.Index(fields=['user', 'created_at', 'id'], name='withdraw_user_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='withdrawrequest',
+            index=models.Index(fields=['status', 'created_at', 'id'], name='withdraw_status_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='withdrawrequest',
+            index=models.Index(fields=['created_at', 'id'], name='withdraw_created_idx'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.9 on 2026-10-18 11:51
+
+from django.db import migrations, models
+
+from core.migration_operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('core', '0008_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='fraudevent',
+            index=models.Index(fields=['user', 'created_at'], name='fraudevent_user_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='usertask',
+            index=models.Index(fields=['user', 'status', 'completed_at'], name='usertask_user_status_done_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='usertask',
+            index=models.Index(fields=['user', 'started_at'], name='usertask_user_started_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='usertask',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['started_at'], name='usertask_pending_started_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='wallettransaction',
+            index=models.Index(fields=['user', 'type', 'created_at'], name='wallettx_user_type_created_idx'),
+        ),
+    ]
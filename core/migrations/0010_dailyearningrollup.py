@@ -0,0 +1,29 @@
+# Generated by Django 5.2.9 on 2026-10-18 11:53
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyEarningRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('type', models.CharField(choices=[('earn', 'Earn'), ('withdraw', 'Withdraw'), ('bonus', 'Bonus'), ('referral', 'Referral')], max_length=20)),
+                ('coins_sum', models.BigIntegerField(default=0)),
+                ('tx_count', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='earning_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'day', 'type')},
+            },
+        ),
+    ]
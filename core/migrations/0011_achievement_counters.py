@@ -0,0 +1,95 @@
+# Generated by Django 5.2.9 on 2026-10-18 11:56
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_counters(apps, schema_editor):
+    """
+    Seed the achievement counters from the existing tables. Unlock rows
+    are created afterwards by `python manage.py sync_achievements`.
+    """
+    User = apps.get_model("core", "User")
+    UserTask = apps.get_model("core", "UserTask")
+    WalletTransaction = apps.get_model("core", "WalletTransaction")
+    WithdrawRequest = apps.get_model("core", "WithdrawRequest")
+
+    def per_user(queryset, aggregate):
+        return Coalesce(
+            Subquery(
+                queryset.filter(user=OuterRef("pk"))
+                .order_by()
+                .values("user")
+                .annotate(n=aggregate)
+                .values("n")
+            ),
+            Value(0),
+            output_field=IntegerField(),
+        )
+
+    User.objects.update(
+        tasks_completed_count=per_user(UserTask.objects.filter(status="completed"), Count("id")),
+        coins_earned_total=per_user(
+            WalletTransaction.objects.filter(type__in=["earn", "bonus", "referral"]), Sum("coins")
+        ),
+        withdrawals_completed_count=per_user(
+            WithdrawRequest.objects.filter(status__in=["approved", "paid"]), Count("id")
+        ),
+        referrals_count=Coalesce(
+            Subquery(
+                User.objects.filter(referred_by=OuterRef("pk"))
+                .order_by()
+                .values("referred_by")
+                .annotate(n=Count("id"))
+                .values("n")
+            ),
+            Value(0),
+            output_field=IntegerField(),
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_dailyearningrollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='coins_earned_total',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='referrals_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='tasks_completed_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='withdrawals_completed_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='UserAchievement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('achievement_id', models.CharField(max_length=50)),
+                ('unlocked_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='achievements', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'achievement_id')},
+            },
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
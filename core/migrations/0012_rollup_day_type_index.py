@@ -0,0 +1,21 @@
+# Generated by Django 5.2.9 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+from core.migration_operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('core', '0011_achievement_counters'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='dailyearningrollup',
+            index=models.Index(fields=['day', 'type'], name='rollup_day_type_idx'),
+        ),
+    ]
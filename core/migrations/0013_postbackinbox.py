@@ -0,0 +1,36 @@
+# Generated by Django 5.2.9 on 2026-10-18 12:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_rollup_day_type_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostbackInbox',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('provider', models.CharField(choices=[('cpx', 'CPX Research'), ('tapjoy', 'Tapjoy')], max_length=20)),
+                ('external_id', models.CharField(max_length=100)),
+                ('user_ref', models.BigIntegerField()),
+                ('action', models.CharField(choices=[('credit', 'Credit'), ('reverse', 'Reverse'), ('record', 'Record only')], max_length=10)),
+                ('coins', models.IntegerField(default=0)),
+                ('event', models.CharField(blank=True, max_length=20)),
+                ('status', models.IntegerField(default=1)),
+                ('note', models.CharField(blank=True, max_length=255)),
+                ('payload', models.JSONField(blank=True, default=dict)),
+                ('received_at', models.DateTimeField(auto_now_add=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+                ('result', models.CharField(blank=True, choices=[('applied', 'Applied'), ('duplicate', 'Duplicate'), ('failed', 'Failed')], max_length=10)),
+                ('error', models.CharField(blank=True, max_length=255)),
+            ],
+            options={
+                'verbose_name_plural': 'Postback inbox',
+                'indexes': [models.Index(condition=models.Q(('processed_at__isnull', True)), fields=['id'], name='postback_inbox_pending_idx')],
+            },
+        ),
+    ]
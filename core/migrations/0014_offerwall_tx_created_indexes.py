@@ -0,0 +1,25 @@
+# Generated by Django 5.2.9 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+from core.migration_operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('core', '0013_postbackinbox'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='cpxtransaction',
+            index=models.Index(fields=['created_at'], name='cpxtx_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='tapjoytransaction',
+            index=models.Index(fields=['created_at'], name='tapjoytx_created_idx'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.9 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+from core.migration_operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('core', '0014_offerwall_tx_created_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='withdrawrequest',
+            name='payout_batch',
+            field=models.CharField(blank=True, default='', max_length=40),
+        ),
+        AddIndexConcurrently(
+            model_name='withdrawrequest',
+            index=models.Index(fields=['payout_batch', 'id'], name='withdraw_payout_batch_idx'),
+        ),
+    ]
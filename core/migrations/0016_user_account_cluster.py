@@ -0,0 +1,31 @@
+# Generated by Django 5.2.9 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+from core.migration_operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('core', '0015_withdrawrequest_payout_batch'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='account_cluster',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='account_cluster_size',
+            field=models.IntegerField(default=1),
+        ),
+        AddIndexConcurrently(
+            model_name='user',
+            index=models.Index(fields=['account_cluster'], name='user_account_cluster_idx'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.9 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+from core.migration_operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('core', '0016_user_account_cluster'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='fraudevent',
+            name='event_type',
+            field=models.CharField(choices=[('suspicious_speed', 'Suspicious task speed'), ('limit_exceeded', 'Daily limit exceeded'), ('timing_anomaly', 'Task timing anomaly'), ('other', 'Other')], max_length=50),
+        ),
+        AddIndexConcurrently(
+            model_name='usertask',
+            index=models.Index(fields=['status', 'completed_at'], name='usertask_status_done_idx'),
+        ),
+    ]
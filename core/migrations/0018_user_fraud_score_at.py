@@ -0,0 +1,26 @@
+# Generated by Django 5.2.9 on 2026-10-18 12:25
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def start_decay_clock(apps, schema_editor):
+    """Existing scores start decaying from the migration time."""
+    User = apps.get_model('core', 'User')
+    User.objects.filter(fraud_score__gt=0).update(fraud_score_at=timezone.now())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_fraudevent_timing_anomaly'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='fraud_score_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(start_decay_clock, migrations.RunPython.noop),
+    ]
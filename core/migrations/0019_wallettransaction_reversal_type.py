@@ -0,0 +1,23 @@
+# Generated by Django 5.2.9 on 2026-10-18 12:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_user_fraud_score_at'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='dailyearningrollup',
+            name='type',
+            field=models.CharField(choices=[('earn', 'Earn'), ('withdraw', 'Withdraw'), ('bonus', 'Bonus'), ('referral', 'Referral'), ('reversal', 'Reversal')], max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='wallettransaction',
+            name='type',
+            field=models.CharField(choices=[('earn', 'Earn'), ('withdraw', 'Withdraw'), ('bonus', 'Bonus'), ('referral', 'Referral'), ('reversal', 'Reversal')], max_length=20),
+        ),
+    ]
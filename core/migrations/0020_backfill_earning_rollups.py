@@ -0,0 +1,42 @@
+from datetime import timezone as dt_timezone
+
+from django.db import migrations
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+
+
+def backfill_rollups(apps, schema_editor):
+    """
+    Rebuild every DailyEarningRollup row from the ledger so analytics,
+    referral earnings and the leaderboards include the history from before
+    0010 (same grouping as `python manage.py rebuild_earning_rollups`).
+    """
+    WalletTransaction = apps.get_model("core", "WalletTransaction")
+    DailyEarningRollup = apps.get_model("core", "DailyEarningRollup")
+
+    grouped = (
+        WalletTransaction.objects.annotate(day=TruncDate("created_at", tzinfo=dt_timezone.utc))
+        .values("user_id", "day", "type")
+        .annotate(coins_sum=Sum("coins"), tx_count=Count("id"))
+        .order_by()
+    )
+
+    DailyEarningRollup.objects.all().delete()
+    batch = []
+    for row in grouped.iterator(chunk_size=2000):
+        batch.append(DailyEarningRollup(**row))
+        if len(batch) >= 2000:
+            DailyEarningRollup.objects.bulk_create(batch)
+            batch = []
+    DailyEarningRollup.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_wallettransaction_reversal_type'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
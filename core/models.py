@@ -1,9 +1,13 @@
+from decimal import Decimal, InvalidOperation
 from django.db import models
 from django.contrib.auth.models import AbstractUser
+from django.core.cache import cache
 from django.utils import timezone
 from django.conf import settings
 import string
 import random
+import time
+import uuid
 
 
 # -----------------------------------------
@@ -25,7 +29,14 @@ class User(AbstractUser):
     # Device / anti-fraud
     device_id = models.CharField(max_length=255, blank=True, null=True, default="")
 
+    # Score as of fraud_score_at; it decays with time (see core/fraud_score.py)
     fraud_score = models.FloatField(default=0.0)
+    fraud_score_at = models.DateTimeField(null=True, blank=True)
+
+    # Multi-account cluster from `manage.py cluster_accounts`: the smallest
+    # user id linked by a shared device, IP or referral (null = no links)
+    account_cluster = models.BigIntegerField(null=True, blank=True)
+    account_cluster_size = models.IntegerField(default=1)
 
     # Wallet
     coins_balance = models.IntegerField(default=0)
@@ -45,6 +56,21 @@ class User(AbstractUser):
     user_level = models.IntegerField(default=1)
     total_experience = models.IntegerField(default=0)
 
+    # All-time counters read by achievement rules (see core/achievements.py)
+    tasks_completed_count = models.IntegerField(default=0)
+    coins_earned_total = models.BigIntegerField(default=0)
+    referrals_count = models.IntegerField(default=0)
+    withdrawals_completed_count = models.IntegerField(default=0)
+
+    class Meta(AbstractUser.Meta):
+        swappable = "AUTH_USER_MODEL"
+        indexes = [
+            # ReferralAnalyticsView keyset pagination
+            models.Index(fields=["referred_by", "date_joined", "id"], name="user_referrer_joined_idx"),
+            # Accounts of one cluster (admin review)
+            models.Index(fields=["account_cluster"], name="user_account_cluster_idx"),
+        ]
+
     # ------------------------------
     # AUTO-GENERATE REFERRAL CODE
     # ------------------------------
@@ -82,10 +108,73 @@ class User(AbstractUser):
             update_fields=["last_earn_date", "daily_earn_count", "last_earn_time"]
         )
 
+    # ------------------------------
+    # DECAYED FRAUD SCORE
+    # ------------------------------
+    @property
+    def current_fraud_score(self):
+        from .fraud_score import current_score
+
+        return round(current_score(self.fraud_score, self.fraud_score_at), 2)
+
 
 # -----------------------------------------
 # SETTINGS MODEL
 # -----------------------------------------
+SETTINGS_VERSION_KEY = "core:settings:version"
+SETTINGS_SNAPSHOT_MAX_AGE = 300  # seconds; reload even if the version key was lost
+
+
+class _SettingsSnapshot:
+    """
+    In-process copy of the whole Settings table.
+
+    The shared cache holds a version token that every committed Settings
+    save/delete replaces (see core/signals.py). Each worker checks the token
+    at most every SETTINGS_CACHE_TTL seconds and reloads the table only when
+    it changed, so steady-state reads cost no database round trip.
+
+    The token only reaches every worker if the cache is shared. Without
+    settings.SHARED_CACHE the snapshot is simply reloaded every
+    SETTINGS_CACHE_TTL seconds, so other workers' edits show up after that.
+    """
+    values = {}
+    version = None
+    checked_at = 0.0
+    loaded_at = 0.0
+
+    @classmethod
+    def get(cls):
+        now = time.monotonic()
+        if now - cls.checked_at < getattr(settings, "SETTINGS_CACHE_TTL", 5):
+            return cls.values
+
+        if not getattr(settings, "SHARED_CACHE", False):
+            cls.values = dict(Settings.objects.values_list("key", "value"))
+            cls.version = None
+            cls.checked_at = cls.loaded_at = now
+            return cls.values
+
+        version = cache.get(SETTINGS_VERSION_KEY)
+        if version is None:
+            cache.add(SETTINGS_VERSION_KEY, uuid.uuid4().hex, None)
+            version = cache.get(SETTINGS_VERSION_KEY)
+
+        if version != cls.version or now - cls.loaded_at > SETTINGS_SNAPSHOT_MAX_AGE:
+            cls.values = dict(Settings.objects.values_list("key", "value"))
+            cls.version = version
+            cls.loaded_at = now
+
+        cls.checked_at = now
+        return cls.values
+
+    @classmethod
+    def invalidate(cls):
+        cache.set(SETTINGS_VERSION_KEY, uuid.uuid4().hex, None)
+        cls.checked_at = 0.0
+        cls.loaded_at = 0.0
+
+
 class Settings(models.Model):
     key = models.CharField(max_length=100, unique=True)
     value = models.CharField(max_length=255)
@@ -95,11 +184,34 @@ class Settings(models.Model):
 
     @staticmethod
     def get_value(key: str, default=None):
+        return _SettingsSnapshot.get().get(key, default)
+
+    @staticmethod
+    def get_int(key: str, default: int = 0) -> int:
         try:
-            return Settings.objects.get(key=key).value
-        except Settings.DoesNotExist:
+            return int(Settings.get_value(key, default))
+        except (TypeError, ValueError):
             return default
 
+    @staticmethod
+    def get_float(key: str, default: float = 0.0) -> float:
+        try:
+            return float(Settings.get_value(key, default))
+        except (TypeError, ValueError):
+            return default
+
+    @staticmethod
+    def get_decimal(key: str, default="0") -> Decimal:
+        try:
+            return Decimal(str(Settings.get_value(key, default)))
+        except (InvalidOperation, TypeError, ValueError):
+            return Decimal(str(default))
+
+    @staticmethod
+    def invalidate_cache():
+        """Force every worker to reload settings (also needed after a bulk update())."""
+        _SettingsSnapshot.invalidate()
+
 
 # -----------------------------------------
 # TASK MODEL
@@ -151,6 +263,21 @@ class UserTask(models.Model):
     ip_address = models.GenericIPAddressField(null=True, blank=True)
     device_id = models.CharField(max_length=255, blank=True, null=True, default="")
 
+    class Meta:
+        indexes = [
+            # Completions per user/day (analytics, achievements, challenges)
+            models.Index(fields=["user", "status", "completed_at"], name="usertask_user_status_done_idx"),
+            # Starts per user/day
+            models.Index(fields=["user", "started_at"], name="usertask_user_started_idx"),
+            # Nightly timing scorer: completions in a time window
+            models.Index(fields=["status", "completed_at"], name="usertask_status_done_idx"),
+            # Pending rows only (the minority once tasks complete): stale-start cleanup / monitoring
+            models.Index(
+                fields=["started_at"],
+                name="usertask_pending_started_idx",
+                condition=models.Q(status="pending"),
+            ),
+        ]
 
     def __str__(self):
         return f"{self.user} - {self.task} ({self.status})"
@@ -165,6 +292,8 @@ class WalletTransaction(models.Model):
         ("withdraw", "Withdraw"),
         ("bonus", "Bonus"),
         ("referral", "Referral"),
+        # Offerwall chargebacks: debits that do not count against earnings
+        ("reversal", "Reversal"),
     )
 
     user = models.ForeignKey(
@@ -176,6 +305,14 @@ class WalletTransaction(models.Model):
     note = models.CharField(max_length=255, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # WalletView keyset pagination
+            models.Index(fields=["user", "created_at", "id"], name="wallettx_user_created_idx"),
+            # Per-type sums over a time window (earnings, referral coins, withdrawals)
+            models.Index(fields=["user", "type", "created_at"], name="wallettx_user_type_created_idx"),
+        ]
+
     def __str__(self):
         return f"{self.user} - {self.type} - {self.coins} coins"
 
@@ -210,6 +347,18 @@ class WithdrawRequest(models.Model):
     admin_note = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     processed_at = models.DateTimeField(null=True, blank=True)
+    # Set when the row is exported for payment (core/payouts.py)
+    payout_batch = models.CharField(max_length=40, blank=True, default="")
+
+    class Meta:
+        indexes = [
+            # Keyset pagination: user list, admin queue by status, admin queue unfiltered
+            models.Index(fields=["user", "created_at", "id"], name="withdraw_user_created_idx"),
+            models.Index(fields=["status", "created_at", "id"], name="withdraw_status_created_idx"),
+            models.Index(fields=["created_at", "id"], name="withdraw_created_idx"),
+            # Payout export: one batch's rows
+            models.Index(fields=["payout_batch", "id"], name="withdraw_payout_batch_idx"),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.amount_rs} - {self.status}"
@@ -222,6 +371,7 @@ class FraudEvent(models.Model):
     EVENT_TYPES = (
         ("suspicious_speed", "Suspicious task speed"),
         ("limit_exceeded", "Daily limit exceeded"),
+        ("timing_anomaly", "Task timing anomaly"),
         ("other", "Other"),
     )
 
@@ -236,6 +386,11 @@ class FraudEvent(models.Model):
 
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "created_at"], name="fraudevent_user_created_idx"),
+        ]
+
     def __str__(self):
         return f"{self.user} - {self.event_type} ({self.score})"
     
@@ -250,6 +405,12 @@ class CPXTransaction(models.Model):
     applied = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Recent-id filter warm-up (core/postback_filter.py)
+            models.Index(fields=["created_at"], name="cpxtx_created_idx"),
+        ]
+
     def __str__(self):
         return f"{self.trans_id} ({self.user})"
 
@@ -262,6 +423,11 @@ class TapjoyTransaction(models.Model):
     applied = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["created_at"], name="tapjoytx_created_idx"),
+        ]
+
     def __str__(self):
         return f"{self.transaction_id} ({self.user}) - {self.currency_amount} coins"
 
@@ -281,3 +447,167 @@ class DailyChallengeClaim(models.Model):
 
     def __str__(self):
         return f"{self.user.username} - {self.challenge_id} - {self.claimed_date}"
+
+
+# -----------------------------------------
+# USER DAILY STATS MODEL
+# -----------------------------------------
+class UserDailyStats(models.Model):
+    """
+    Per-user, per-day counters kept up to date incrementally (see core/stats.py)
+    so limit checks and challenge progress are a single (user, date) lookup
+    instead of COUNT/SUM scans over UserTask and WalletTransaction.
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="daily_stats"
+    )
+    date = models.DateField()
+
+    # Task starts
+    tasks_started = models.IntegerField(default=0)
+    limited_tasks_started = models.IntegerField(default=0)  # count toward the daily task limit
+
+    # Task completions (total + one column per Task.TASK_TYPES entry)
+    tasks_completed = models.IntegerField(default=0)
+    video_completed = models.IntegerField(default=0)
+    quiz_completed = models.IntegerField(default=0)
+    offerwall_completed = models.IntegerField(default=0)
+    tapjoy_offerwall_completed = models.IntegerField(default=0)
+    scratch_card_completed = models.IntegerField(default=0)
+    spin_wheel_completed = models.IntegerField(default=0)
+    puzzle_completed = models.IntegerField(default=0)
+
+    # Coins by WalletTransaction type (signed sums)
+    earn_coins = models.IntegerField(default=0)
+    bonus_coins = models.IntegerField(default=0)
+    referral_coins = models.IntegerField(default=0)
+    withdraw_coins = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = [["user", "date"]]
+        verbose_name_plural = "User daily stats"
+
+    def __str__(self):
+        return f"{self.user_id} - {self.date}"
+
+    @property
+    def coins_earned(self):
+        """Coins earned today (earn + bonus + referral)."""
+        return self.earn_coins + self.bonus_coins + self.referral_coins
+
+    def completed_for_type(self, task_type):
+        return getattr(self, f"{task_type}_completed", 0)
+
+    @classmethod
+    def for_day(cls, user, day=None):
+        """Stats row for the day, or an unsaved all-zero row if none exists yet."""
+        day = day or timezone.now().date()
+        try:
+            return cls.objects.get(user=user, date=day)
+        except cls.DoesNotExist:
+            return cls(user=user, date=day)
+
+
+# -----------------------------------------
+# DAILY EARNING ROLLUP MODEL
+# -----------------------------------------
+class DailyEarningRollup(models.Model):
+    """
+    WalletTransaction totals per (user, day, type), kept current as
+    transactions are written (see core/stats.py). Rebuild any date range
+    with `python manage.py rebuild_earning_rollups`.
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="earning_rollups"
+    )
+    day = models.DateField()
+    type = models.CharField(max_length=20, choices=WalletTransaction.TYPE_CHOICES)
+    coins_sum = models.BigIntegerField(default=0)
+    tx_count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = [["user", "day", "type"]]
+        indexes = [
+            # Leaderboard rebuilds aggregate a day / week across all users
+            models.Index(fields=["day", "type"], name="rollup_day_type_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.day} - {self.type}: {self.coins_sum}"
+
+
+# -----------------------------------------
+# USER ACHIEVEMENT MODEL
+# -----------------------------------------
+class UserAchievement(models.Model):
+    """
+    A badge the user has unlocked. Rows are written when a counter crosses
+    a rule's target (see core/achievements.py), never on read.
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="achievements"
+    )
+    achievement_id = models.CharField(max_length=50)
+    unlocked_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = [["user", "achievement_id"]]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.achievement_id}"
+
+
+# -----------------------------------------
+# POSTBACK INBOX MODEL
+# -----------------------------------------
+class PostbackInbox(models.Model):
+    """
+    Append-only log of validated offerwall postbacks (settings.POSTBACK_INBOX).
+    Handlers write a row and acknowledge at once; `manage.py process_postbacks`
+    applies pending rows in batches (see core/postbacks.py). Exactly-once
+    application comes from the unique CPXTransaction.trans_id /
+    TapjoyTransaction.transaction_id columns, not from this table.
+    """
+    PROVIDER_CHOICES = (
+        ("cpx", "CPX Research"),
+        ("tapjoy", "Tapjoy"),
+    )
+    ACTION_CHOICES = (
+        ("credit", "Credit"),
+        ("reverse", "Reverse"),
+        ("record", "Record only"),
+    )
+    RESULT_CHOICES = (
+        ("applied", "Applied"),
+        ("duplicate", "Duplicate"),
+        ("failed", "Failed"),
+    )
+
+    provider = models.CharField(max_length=20, choices=PROVIDER_CHOICES)
+    external_id = models.CharField(max_length=100)  # trans_id / transaction_id
+    user_ref = models.BigIntegerField()  # User.pk as sent by the network; checked when applied
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    coins = models.IntegerField(default=0)
+    event = models.CharField(max_length=20, blank=True)
+    status = models.IntegerField(default=1)
+    note = models.CharField(max_length=255, blank=True)
+    payload = models.JSONField(default=dict, blank=True)
+
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    result = models.CharField(max_length=10, choices=RESULT_CHOICES, blank=True)
+    error = models.CharField(max_length=255, blank=True)
+
+    class Meta:
+        verbose_name_plural = "Postback inbox"
+        indexes = [
+            # Worker queue: unprocessed rows only
+            models.Index(
+                fields=["id"],
+                name="postback_inbox_pending_idx",
+                condition=models.Q(processed_at__isnull=True),
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.provider}:{self.external_id} ({self.action})"
@@ -0,0 +1,389 @@
+"""
+Offerwall provider adapters.
+
+Each provider is an OfferwallProvider subclass registered in PROVIDERS. It
+declares how its postback parameters map onto a Postback, how the request
+is authenticated, what its status codes mean and which transaction table
+makes its ids unique. The shared view (core/views_offerwalls.py) and the
+inbox worker (core/postbacks.py) do the rest, so a new provider is a new
+adapter class, not another hand-written handler.
+
+Synchronous application is one INSERT ... ON CONFLICT DO NOTHING RETURNING
+on the provider's transaction table followed, only if a row came back, by
+the wallet credit, all in one DB transaction. Applied ids are then recorded
+in core/postback_filter.py so provider retries are answered early.
+
+A reversal reuses the id of the credit it cancels, so it cannot go through
+the unique insert: it flips the credited row to reversed with a conditional
+UPDATE and debits only if that UPDATE matched the row.
+"""
+import hashlib
+import hmac
+import os
+from collections import namedtuple
+from decimal import Decimal, InvalidOperation
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from .models import CPXTransaction, TapjoyTransaction
+from .postback_filter import mark_seen
+from .wallet import credit, debit
+
+# action: "credit" | "reverse" | "record" (store the id, move no coins)
+Postback = namedtuple("Postback", "external_id user_ref coins action event status note payload")
+
+
+class PostbackError(Exception):
+    """Rejected postback; `status` is the HTTP status to answer with."""
+
+    def __init__(self, detail, status=400):
+        super().__init__(detail)
+        self.detail = detail
+        self.status = status
+
+
+class IgnoredPostback(Exception):
+    """Valid postback that carries nothing to record (answered with 200)."""
+
+
+def _get_env(name: str, default: str = "") -> str:
+    return os.getenv(name, default).strip()
+
+
+# -------------------------------------
+# IDEMPOTENT INSERT
+# -------------------------------------
+def insert_ignore_conflict(instance, conflict_field):
+    """
+    INSERT the unsaved instance unless a row with the same `conflict_field`
+    exists: INSERT ... ON CONFLICT (...) DO NOTHING RETURNING pk.
+    Returns True if the row was inserted.
+    """
+    meta = instance._meta
+    fields = [f for f in meta.concrete_fields if not f.primary_key]
+    qn = connection.ops.quote_name
+
+    sql = "INSERT INTO {table} ({columns}) VALUES ({values}) ON CONFLICT ({conflict}) DO NOTHING RETURNING {pk}".format(
+        table=qn(meta.db_table),
+        columns=", ".join(qn(f.column) for f in fields),
+        values=", ".join(["%s"] * len(fields)),
+        conflict=qn(meta.get_field(conflict_field).column),
+        pk=qn(meta.pk.column),
+    )
+    params = [f.get_db_prep_save(f.pre_save(instance, True), connection) for f in fields]
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        row = cursor.fetchone()
+    if row is None:
+        return False
+    instance.pk = row[0]
+    return True
+
+
+# -------------------------------------
+# BASE ADAPTER
+# -------------------------------------
+class OfferwallProvider:
+    name = ""
+    label = ""
+    methods = ("GET",)
+
+    # Table whose unique `id_field` makes each postback apply once
+    transaction_model = None
+    id_field = ""
+
+    # Reversals: lookup that matches a credited row (None = not supported)
+    # and the column holding the coins it credited
+    credited_lookup = None
+    amount_field = ""
+
+    # Postback field -> request parameter names, first one present wins
+    params = {
+        "external_id": ("trans_id", "transaction_id"),
+        "user_ref": ("user_id",),
+        "amount": ("amount",),
+        "status": ("status",),
+        "event": ("event",),
+    }
+    defaults = {"amount": "0", "status": "1", "event": "complete"}
+
+    # ---- request parsing ----
+    def request_data(self, request):
+        if request.method == "POST" and hasattr(request.data, "items"):
+            return {k: str(v) for k, v in request.data.items()}
+        return request.query_params.dict()
+
+    def value(self, data, field):
+        for name in self.params.get(field, ()):
+            if data.get(name):
+                return data[name]
+        return self.defaults.get(field, "")
+
+    def parse(self, request):
+        """Validate the request and return a Postback. Raises PostbackError."""
+        # Read the raw body before DRF parses it, for signature checks
+        body = request.body
+        data = self.request_data(request)
+        external_id = self.value(data, "external_id")
+        user_ref = self.value(data, "user_ref")
+        if not external_id or not user_ref:
+            raise PostbackError(f"missing {self.params['external_id'][0]} or {self.params['user_ref'][0]}")
+
+        try:
+            user_ref = int(user_ref)
+        except (TypeError, ValueError):
+            raise PostbackError(f"invalid {self.params['user_ref'][0]}")
+
+        self.verify(data, body)
+
+        try:
+            coins = int(Decimal(self.value(data, "amount")))
+        except (InvalidOperation, ValueError, OverflowError):
+            coins = 0
+        try:
+            status = int(self.value(data, "status"))
+        except (TypeError, ValueError):
+            raise PostbackError("invalid status")
+
+        event = self.value(data, "event").lower()
+        action = self.action(status, coins)
+        postback = Postback(external_id, user_ref, coins, action, event, status, "", data)
+        return postback._replace(note=self.note(postback)[:255])
+
+    # ---- provider semantics ----
+    def verify(self, data, body):
+        """Raise PostbackError if the request is not authentic."""
+
+    def action(self, status, coins):
+        return "credit" if coins > 0 else "record"
+
+    def note(self, postback):
+        return f"{self.label} {postback.event} ({self.id_field}={postback.external_id})"
+
+    def transaction_row(self, postback, user):
+        """Unsaved transaction_model row for the postback."""
+        raise NotImplementedError
+
+    def reversed_values(self, postback):
+        """Column updates that mark a credited row as reversed."""
+        raise NotImplementedError
+
+    def response(self, postback, applied):
+        if not applied:
+            return {"ok": True, "duplicate": True}
+        return {"ok": True}
+
+    # ---- offerwall ----
+    def wall_url(self, user):
+        """Return (url, error)."""
+        raise NotImplementedError
+
+    def wall_response(self, user, url):
+        return {"url": url}
+
+    # ---- apply ----
+    def apply(self, postback, user):
+        """Record and apply the postback once. Returns False for a duplicate."""
+        if postback.action == "reverse":
+            return self.reverse(postback, user)
+
+        with transaction.atomic():
+            if not insert_ignore_conflict(self.transaction_row(postback, user), self.id_field):
+                # The conflicting row is committed: remember it for the next retry
+                mark_seen(self, [postback.external_id])
+                return False
+
+            transaction.on_commit(lambda: mark_seen(self, [postback.external_id]))
+            if postback.action == "credit":
+                credit(user, postback.coins, "earn", note=postback.note)
+        return True
+
+    def reverse(self, postback, user):
+        """
+        Reverse the credit with the same id once. Returns False for a
+        duplicate (already reversed, or the id was only recorded).
+        """
+        rows = self.transaction_model.objects.filter(
+            **{self.id_field: postback.external_id, "user": user, **self.credited_lookup}
+        )
+        with transaction.atomic():
+            # The row lock serializes concurrent reversals; only one matches
+            if rows.update(**self.reversed_values(postback)) != 1:
+                # Reversal before its credit: record the id so the credit is
+                # dropped when it arrives
+                row = self.transaction_row(postback, user)
+                row.applied = False
+                recorded = insert_ignore_conflict(row, self.id_field)
+                if recorded:
+                    transaction.on_commit(lambda: mark_seen(self, [postback.external_id]))
+                return recorded
+
+            coins = self.transaction_model.objects.filter(
+                **{self.id_field: postback.external_id}
+            ).values_list(self.amount_field, flat=True).get()
+            # Reversals never take the balance below zero
+            debit(user, coins, "reversal", note=postback.note, clamp=True)
+        return True
+
+
+PROVIDERS = {}
+
+
+def register(provider_class):
+    PROVIDERS[provider_class.name] = provider_class()
+    return provider_class
+
+
+# -------------------------------------
+# CPX RESEARCH
+# -------------------------------------
+@register
+class CPXProvider(OfferwallProvider):
+    """
+    CPX calls /api/cpx/postback/?trans_id=...&ext_user_id=...&amount=...&status=1|2
+    status 1 credits, status 2 reverses an earlier credit.
+    """
+    name = "cpx"
+    label = "CPX"
+    transaction_model = CPXTransaction
+    id_field = "trans_id"
+    credited_lookup = {"status": 1, "applied": True}
+    amount_field = "amount_local"
+    params = {
+        **OfferwallProvider.params,
+        "user_ref": ("ext_user_id", "user_id"),
+        "amount": ("amount", "amount_local"),
+    }
+
+    def verify(self, data, body):
+        # CPX formula: md5(ext_user_id + "-" + your_secure_hash)
+        secure_hash = data.get("secure_hash", "")
+        if not secure_hash and not settings.CPX_REQUIRE_SECURE_HASH:
+            return
+        expected = hashlib.md5(
+            f"{self.value(data, 'user_ref')}-{settings.CPX_SECURITY_HASH}".encode("utf-8")
+        ).hexdigest()
+        if not settings.CPX_SECURITY_HASH or not hmac.compare_digest(expected, secure_hash):
+            raise PostbackError("Invalid secure_hash")
+
+    def action(self, status, coins):
+        if coins <= 0:
+            return "record"
+        return {1: "credit", 2: "reverse"}.get(status, "record")
+
+    def note(self, postback):
+        if postback.action == "reverse":
+            return f"CPX reversal (trans_id={postback.external_id})"
+        return f"CPX {postback.event} (trans_id={postback.external_id})"
+
+    def transaction_row(self, postback, user):
+        return CPXTransaction(
+            trans_id=postback.external_id,
+            user=user,
+            event=postback.event or "complete",
+            status=postback.status,
+            amount_local=postback.coins,
+            applied=postback.action != "record",
+        )
+
+    def reversed_values(self, postback):
+        return {"status": postback.status, "event": postback.event or "cancel"}
+
+    def wall_url(self, user):
+        """
+        ext_user_id MUST be unique per user. Best = user.id (stable).
+        """
+        app_id = _get_env("CPX_APP_ID")
+        secure_hash = _get_env("CPX_SECURITY_HASH")
+
+        if not app_id:
+            return None, "CPX_APP_ID missing"
+        if not secure_hash:
+            return None, "CPX_SECURITY_HASH missing"
+
+        # CPX offers URL (works for web iframe)
+        base = "https://offers.cpx-research.com/index.php"
+        params = {
+            "app_id": app_id,
+            "ext_user_id": str(user.id),
+            "secure_hash": secure_hash,
+            "currency": _get_env("CPX_CURRENCY", "coins"),
+        }
+        return f"{base}?{urlencode(params)}", None
+
+
+# -------------------------------------
+# TAPJOY
+# -------------------------------------
+@register
+class TapjoyProvider(OfferwallProvider):
+    """
+    Tapjoy sends rewards via POST (JSON) or GET with user_id, currency,
+    transaction_id and an optional HMAC-SHA256 signature of the raw body.
+    """
+    name = "tapjoy"
+    label = "Tapjoy offerwall"
+    methods = ("GET", "POST")
+    transaction_model = TapjoyTransaction
+    id_field = "transaction_id"
+    params = {
+        **OfferwallProvider.params,
+        "external_id": ("transaction_id", "trans_id"),
+        "amount": ("currency", "amount"),
+    }
+
+    def verify(self, data, body):
+        secret_key = _get_env("TAPJOY_SECRET_KEY")
+        signature = data.get("signature", "")
+        if not secret_key or not signature:
+            return
+        expected = hmac.new(secret_key.encode("utf-8"), body, hashlib.sha256).hexdigest()
+        if not hmac.compare_digest(expected, signature):
+            raise PostbackError("invalid signature", status=401)
+
+    def action(self, status, coins):
+        if coins <= 0:
+            raise IgnoredPostback("zero or negative amount")
+        return "credit"
+
+    def note(self, postback):
+        return f"Tapjoy offerwall (transaction_id={postback.external_id})"
+
+    def transaction_row(self, postback, user):
+        return TapjoyTransaction(
+            transaction_id=postback.external_id,
+            user=user,
+            currency_amount=postback.coins,
+            applied=postback.action != "record",
+        )
+
+    def response(self, postback, applied):
+        if not applied:
+            return {"ok": True, "duplicate": True}
+        return {"ok": True, "coins_added": postback.coins}
+
+    def wall_url(self, user):
+        """
+        Build Tapjoy offerwall URL for web.
+        For mobile, use Tapjoy SDK directly.
+        """
+        sdk_key = _get_env("TAPJOY_SDK_KEY")
+        if not sdk_key:
+            return None, "TAPJOY_SDK_KEY missing"
+
+        base = "https://www.tapjoy.com/offers"
+        params = {
+            "sdk_key": sdk_key,
+            "user_id": str(user.id),
+        }
+        return f"{base}?{urlencode(params)}", None
+
+    def wall_response(self, user, url):
+        return {
+            "url": url,
+            "sdk_key": _get_env("TAPJOY_SDK_KEY"),
+            "user_id": str(user.id),
+        }
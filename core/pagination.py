@@ -0,0 +1,104 @@
+"""
+Keyset (cursor) pagination shared by the list endpoints.
+
+Rows are ordered newest first on (<field>, id) and the cursor carries the
+last row's (field, id). Each page is an index range scan on the matching
+composite index, so deep pages cost the same as the first one and no
+COUNT(*) is needed.
+"""
+import base64
+import json
+
+from django.db import connections
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ValidationError
+
+
+class KeysetPagination:
+    page_size = 50
+    max_page_size = 200
+
+    def __init__(self, field="created_at", page_size=None):
+        self.field = field
+        if page_size:
+            self.page_size = page_size
+        self.next_cursor = None
+
+    # -----------------------------
+    # CURSOR ENCODING
+    # -----------------------------
+    @staticmethod
+    def encode_cursor(value, pk):
+        raw = json.dumps([value.isoformat(), pk]).encode("utf-8")
+        return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+    @staticmethod
+    def decode_cursor(cursor):
+        try:
+            raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+            value, pk = json.loads(raw)
+            value = parse_datetime(value)
+            if value is None:
+                raise ValueError
+            return value, int(pk)
+        except (TypeError, ValueError):
+            raise ValidationError({"cursor": "Invalid cursor."})
+
+    # -----------------------------
+    # PAGINATION
+    # -----------------------------
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get("page_size", self.page_size))
+        except (TypeError, ValueError):
+            size = self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def paginate_queryset(self, queryset, request):
+        """Return one page (a list) and set self.next_cursor."""
+        size = self.get_page_size(request)
+        field = self.field
+
+        queryset = queryset.order_by(f"-{field}", "-id")
+
+        cursor = request.query_params.get("cursor")
+        if cursor:
+            value, pk = self.decode_cursor(cursor)
+            queryset = queryset.filter(
+                Q(**{f"{field}__lt": value}) | Q(**{field: value, "id__lt": pk})
+            )
+
+        rows = list(queryset[: size + 1])
+        if len(rows) > size:
+            rows = rows[:size]
+            last = rows[-1]
+            self.next_cursor = self.encode_cursor(getattr(last, field), last.pk)
+        else:
+            self.next_cursor = None
+        return rows
+
+    def get_headers(self):
+        """Headers for endpoints whose body is a bare list."""
+        return {"X-Next-Cursor": self.next_cursor} if self.next_cursor else {}
+
+
+# -------------------------------------
+# ESTIMATED COUNT
+# -------------------------------------
+def estimated_count(queryset):
+    """
+    Planner row estimate for `queryset` on PostgreSQL (no table scan),
+    exact COUNT(*) on other backends.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return queryset.count()
+
+    sql, params = queryset.order_by().values("pk").query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
@@ -0,0 +1,141 @@
+"""
+Recent transaction-id filter for fast duplicate postback rejection.
+
+Two layers sit in front of the provider's transaction table:
+
+  - an exact key per applied id in the shared cache, written after the
+    transaction commits, so any worker can answer a retry without the DB;
+  - an in-process Bloom filter (two rotating generations, bounded memory),
+    warmed from the last POSTBACK_DEDUP_DAYS of transaction rows when the
+    gunicorn worker starts (gunicorn.conf.py), or on first use elsewhere. A Bloom hit can be a false positive, so it is confirmed with one
+    indexed EXISTS probe; a miss never touches the database.
+
+A miss on both falls through to the normal INSERT ... ON CONFLICT path,
+which stays the source of truth.
+"""
+import hashlib
+import math
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+SEEN_KEY = "core:postback:seen:{provider}:{external_id}"
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings."""
+
+    def __init__(self, capacity, error_rate=0.01):
+        self.capacity = capacity
+        self.size = max(64, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, item):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        return all(self.bits[p >> 3] & (1 << (p & 7)) for p in self._positions(item))
+
+
+class RecentIds:
+    """
+    Two Bloom generations of `capacity` ids each: when the current one is
+    full it becomes the previous one and the oldest generation is dropped.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.current = BloomFilter(capacity)
+        self.previous = None
+
+    def add(self, item):
+        if self.current.count >= self.capacity:
+            self.previous, self.current = self.current, BloomFilter(self.capacity)
+        self.current.add(item)
+
+    def __contains__(self, item):
+        return item in self.current or (self.previous is not None and item in self.previous)
+
+
+_recent = None
+_lock = threading.Lock()
+
+
+def _days():
+    return getattr(settings, "POSTBACK_DEDUP_DAYS", 7)
+
+
+def _member(provider, external_id):
+    return f"{provider.name}:{external_id}"
+
+
+def _get_recent():
+    """The worker's filter, warmed from the database on first use."""
+    if _recent is not None:
+        return _recent
+    return warm_recent_ids()
+
+
+def warm_recent_ids():
+    """
+    Load the filter from the database unless it is already loaded. Called
+    from the gunicorn worker start hook so no postback pays for the scan.
+    """
+    global _recent
+    with _lock:
+        if _recent is None:
+            from .offerwalls import PROVIDERS
+
+            recent = RecentIds(getattr(settings, "POSTBACK_DEDUP_CAPACITY", 1_000_000))
+            since = timezone.now() - timedelta(days=_days())
+            for provider in PROVIDERS.values():
+                ids = (
+                    provider.transaction_model.objects.filter(created_at__gte=since)
+                    .values_list(provider.id_field, flat=True)
+                    .iterator(chunk_size=5000)
+                )
+                for external_id in ids:
+                    recent.add(_member(provider, external_id))
+            _recent = recent
+    return _recent
+
+
+def reset_recent_ids():
+    """Drop the in-process filter (tests, or after a bulk data change)."""
+    global _recent
+    with _lock:
+        _recent = None
+
+
+def mark_seen(provider, external_ids):
+    """Record ids that now have a committed transaction row."""
+    recent = _get_recent()
+    for external_id in external_ids:
+        recent.add(_member(provider, external_id))
+    cache.set_many(
+        {SEEN_KEY.format(provider=provider.name, external_id=external_id): 1 for external_id in external_ids},
+        _days() * 24 * 60 * 60,
+    )
+
+
+def is_known_duplicate(provider, external_id):
+    """True if the id already has a transaction row."""
+    if cache.get(SEEN_KEY.format(provider=provider.name, external_id=external_id)):
+        return True
+    if _member(provider, external_id) in _get_recent():
+        # Possible false positive: confirm with the unique index
+        return provider.transaction_model.objects.filter(**{provider.id_field: external_id}).exists()
+    return False
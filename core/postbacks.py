@@ -0,0 +1,209 @@
+"""
+Postback inbox: fast acknowledgment for offerwall postbacks.
+
+With settings.POSTBACK_INBOX on, the postback handlers validate the request,
+enqueue_postback() a PostbackInbox row and answer immediately. The
+`process_postbacks` command then applies pending rows in batches:
+
+  - rows whose id already has a row in the provider's transaction table
+    (or appears earlier in the batch) are marked duplicate;
+  - the remaining rows are grouped by user, their transaction rows are
+    bulk-inserted and the user's credits are applied with as few wallet
+    credits as their notes fit in (each ledger note lists its ids), so a
+    user usually costs one balance UPDATE per batch;
+  - reversals reuse the credited id, so they skip the duplicate check and
+    go through the provider's conditional reverse() after the credits.
+
+The providers' unique id columns make application exactly-once:
+if another worker inserts the same id concurrently, that user's group rolls
+back and is seen as a duplicate on the next pass. Any other integrity error
+fails the user's rows with the error recorded.
+"""
+import logging
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.db.models import Min
+from django.utils import timezone
+
+from .models import PostbackInbox, WalletTransaction
+from .offerwalls import PROVIDERS
+from .postback_filter import mark_seen
+from .wallet import credit
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+
+def inbox_enabled():
+    return getattr(settings, "POSTBACK_INBOX", False)
+
+
+def enqueue_postback(provider, postback):
+    """Write a validated Postback to the inbox. The only write on the request path."""
+    return PostbackInbox.objects.create(
+        provider=provider,
+        external_id=postback.external_id,
+        user_ref=postback.user_ref,
+        action=postback.action,
+        coins=postback.coins,
+        event=postback.event,
+        status=postback.status,
+        note=postback.note,
+        payload=postback.payload,
+    )
+
+
+def postback_lag():
+    """Inbox backlog: pending row count and age of the oldest pending row."""
+    pending = PostbackInbox.objects.filter(processed_at__isnull=True)
+    oldest = pending.aggregate(oldest=Min("received_at"))["oldest"]
+    return {
+        "pending": pending.count(),
+        "oldest_age_seconds": (timezone.now() - oldest).total_seconds() if oldest else 0.0,
+    }
+
+
+# -------------------------------------
+# BATCH APPLY
+# -------------------------------------
+def _seen_ids(rows):
+    """(provider, external_id) pairs that already have a transaction row."""
+    ids = defaultdict(set)
+    for row in rows:
+        ids[row.provider].add(row.external_id)
+
+    seen = set()
+    for name, external_ids in ids.items():
+        provider = PROVIDERS[name]
+        existing = provider.transaction_model.objects.filter(
+            **{f"{provider.id_field}__in": external_ids}
+        ).values_list(provider.id_field, flat=True)
+        seen.update((name, external_id) for external_id in existing)
+    return seen
+
+
+def _inserted_elsewhere(rows):
+    """Whether another worker has meanwhile inserted one of the rows' ids."""
+    return bool(_seen_ids([row for row in rows if row.action != "reverse"]))
+
+
+def _credit_groups(rows):
+    """Split credit rows into runs whose joined notes fit one ledger note."""
+    limit = WalletTransaction._meta.get_field("note").max_length
+    groups, length = [], 0
+    for row in rows:
+        if groups and length + 2 + len(row.note) <= limit:
+            groups[-1].append(row)
+            length += 2 + len(row.note)
+        else:
+            groups.append([row])
+            length = len(row.note)
+    return groups
+
+
+def _apply_user(user, rows):
+    """
+    Insert the transaction rows, credit the coins and apply the reversals
+    for one user. Returns the reversal rows that matched no credited row.
+    """
+    reversals = [row for row in rows if row.action == "reverse"]
+    by_provider = defaultdict(list)
+    for row in rows:
+        if row.action != "reverse":
+            by_provider[row.provider].append(row)
+    for name, provider_rows in by_provider.items():
+        provider = PROVIDERS[name]
+        provider.transaction_model.objects.bulk_create(
+            [provider.transaction_row(row, user) for row in provider_rows]
+        )
+
+    # One wallet credit per group; every WalletTransaction still names its ids
+    for group in _credit_groups([row for row in rows if row.action == "credit"]):
+        credit(user, sum(row.coins for row in group), "earn", note="; ".join(row.note for row in group))
+
+    return [row for row in reversals if not PROVIDERS[row.provider].reverse(row, user)]
+
+
+def process_batch(batch_size=500, after_id=None, up_to_id=None):
+    """
+    Apply up to `batch_size` pending inbox rows, optionally only those with
+    after_id < id <= up_to_id. Returns a dict of counts (claimed, applied,
+    duplicate, failed, retry, users) and the last claimed id (last_id).
+    """
+    counts = defaultdict(int)
+    now = timezone.now()
+
+    pending = PostbackInbox.objects.filter(processed_at__isnull=True)
+    if after_id is not None:
+        pending = pending.filter(id__gt=after_id)
+    if up_to_id is not None:
+        pending = pending.filter(id__lte=up_to_id)
+
+    with transaction.atomic():
+        rows = list(pending.select_for_update(skip_locked=True).order_by("id")[:batch_size])
+        counts["claimed"] = len(rows)
+        if not rows:
+            return counts
+        counts["last_id"] = rows[-1].id
+
+        users = User.objects.in_bulk({row.user_ref for row in rows})
+        seen = _seen_ids(rows)
+
+        by_user = defaultdict(list)
+        for row in rows:
+            key = (row.provider, row.external_id)
+            if row.action == "reverse":
+                # Checked against the credited row by the provider's reverse()
+                if row.user_ref not in users:
+                    row.result, row.error = "failed", "user not found"
+                else:
+                    by_user[row.user_ref].append(row)
+            elif key in seen:
+                row.result = "duplicate"
+            elif row.user_ref not in users:
+                row.result, row.error = "failed", "user not found"
+            else:
+                seen.add(key)
+                by_user[row.user_ref].append(row)
+
+        for user_id, user_rows in by_user.items():
+            try:
+                with transaction.atomic():
+                    unmatched = _apply_user(users[user_id], user_rows)
+            except IntegrityError as e:
+                if _inserted_elsewhere(user_rows):
+                    # A concurrent worker inserted one of these ids: leave the
+                    # rows pending so the next pass classifies them as duplicates
+                    continue
+                logger.exception("Failed to apply postbacks for user %s", user_id)
+                for row in user_rows:
+                    row.result, row.error = "failed", str(e)[:255]
+                continue
+            except Exception as e:
+                logger.exception("Failed to apply postbacks for user %s", user_id)
+                for row in user_rows:
+                    row.result, row.error = "failed", str(e)[:255]
+                continue
+            for row in user_rows:
+                row.result = "duplicate" if row in unmatched else "applied"
+            counts["users"] += 1
+
+        done = [row for row in rows if row.result]
+        for row in done:
+            row.processed_at = now
+            counts[row.result] += 1
+        counts["retry"] = len(rows) - len(done)
+        PostbackInbox.objects.bulk_update(done, ["processed_at", "result", "error"], batch_size=500)
+
+        known = defaultdict(list)
+        for row in done:
+            if row.result in ("applied", "duplicate") and row.action != "reverse":
+                known[row.provider].append(row.external_id)
+        for name, external_ids in known.items():
+            transaction.on_commit(lambda p=PROVIDERS[name], ids=external_ids: mark_seen(p, ids))
+
+    return counts
@@ -6,6 +6,8 @@ from .models import (
     WalletTransaction,
     WithdrawRequest,
 )
+from .achievements import increment
+from .wallet import credit
 
 User = get_user_model()
 
@@ -73,25 +75,16 @@ class RegisterSerializer(serializers.ModelSerializer):
             referrer_bonus = 50
             user_bonus = 20
 
-            user.referred_by.coins_balance += referrer_bonus
-            user.referred_by.save(update_fields=["coins_balance"])
-
-            WalletTransaction.objects.create(
-                user=user.referred_by,
-                type="referral",
-                coins=referrer_bonus,
+            credit(
+                user.referred_by,
+                referrer_bonus,
+                "referral",
                 note=f"Referral bonus for inviting {user.username}",
             )
 
-            user.coins_balance += user_bonus
-            user.save(update_fields=["coins_balance"])
+            credit(user, user_bonus, "bonus", note="Signup referral bonus")
 
-            WalletTransaction.objects.create(
-                user=user,
-                type="bonus",
-                coins=user_bonus,
-                note="Signup referral bonus",
-            )
+            increment(user.referred_by, "referrals_count")
 
         return user
 
@@ -101,6 +94,8 @@ class RegisterSerializer(serializers.ModelSerializer):
 # -----------------------------------------------------------
 
 class UserSerializer(serializers.ModelSerializer):
+    fraud_score = serializers.FloatField(source="current_fraud_score", read_only=True)
+
     class Meta:
         model = User
         fields = (
@@ -205,6 +200,8 @@ class WithdrawRequestSerializer(serializers.ModelSerializer):
 class ReferralUserSummarySerializer(serializers.ModelSerializer):
     """Used by ReferralAnalyticsView to show invited user's progress."""
 
+    fraud_score = serializers.FloatField(source="current_fraud_score", read_only=True)
+
     class Meta:
         model = User
         fields = [
@@ -0,0 +1,30 @@
+"""
+Model signal handlers (connected in CoreConfig.ready).
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .catalog import invalidate_task_catalog
+from .models import Settings, Task
+
+
+# -------------------------------------
+# SETTINGS CACHE INVALIDATION
+# -------------------------------------
+@receiver(post_save, sender=Settings)
+@receiver(post_delete, sender=Settings)
+def invalidate_settings_cache(sender, **kwargs):
+    # After commit, or a worker could reload the old rows under the new token
+    transaction.on_commit(Settings.invalidate_cache)
+
+
+# -------------------------------------
+# TASK CATALOG INVALIDATION
+# -------------------------------------
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Task)
+def invalidate_task_catalog_cache(sender, **kwargs):
+    # After commit: a poll racing the open transaction would otherwise cache
+    # the old catalog under the new version
+    transaction.on_commit(invalidate_task_catalog)
@@ -0,0 +1,111 @@
+"""
+Incremental per-user counters: UserDailyStats and DailyEarningRollup.
+
+Writers call these helpers in the same DB transaction as the event they
+record; readers use the counter rows instead of counting/summing history.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .achievements import increment
+from .bulk import upsert_add
+from .models import DailyEarningRollup, UserDailyStats
+
+# Task types that do not count toward check_daily_task_limit
+# (offerwalls, and game tasks which have their own per-type limits)
+GAME_TASK_TYPES = ["scratch_card", "spin_wheel", "puzzle", "quiz"]
+DAILY_LIMIT_EXEMPT_TYPES = ["offerwall", "tapjoy_offerwall"] + GAME_TASK_TYPES
+
+# WalletTransaction types that count as "earned"
+EARNING_TYPES = ["earn", "bonus", "referral"]
+
+_COIN_FIELDS = {
+    "earn": "earn_coins",
+    "bonus": "bonus_coins",
+    "referral": "referral_coins",
+    "withdraw": "withdraw_coins",
+}
+
+
+def _increment(model, lookup, increments):
+    """
+    Atomically add `increments` to the row matching `lookup`, creating the
+    row on first use.
+    """
+    rows = model.objects.filter(**lookup)
+    updates = {field: F(field) + n for field, n in increments.items()}
+
+    if rows.update(**updates):
+        return
+
+    try:
+        with transaction.atomic():
+            model.objects.create(**lookup, **increments)
+    except IntegrityError:
+        # Another request created the row first
+        rows.update(**updates)
+
+
+def bump(user, day=None, **increments):
+    """Add `increments` to the user's UserDailyStats row for `day`."""
+    day = day or timezone.now().date()
+    _increment(UserDailyStats, {"user": user, "date": day}, increments)
+
+
+def bump_rollup(user, tx_type, coins, day=None):
+    """Add one transaction of `coins` to the user's (day, type) rollup row."""
+    day = day or timezone.now().date()
+    _increment(
+        DailyEarningRollup,
+        {"user": user, "day": day, "type": tx_type},
+        {"coins_sum": coins, "tx_count": 1},
+    )
+
+
+# -------------------------------------
+# EVENT HOOKS
+# -------------------------------------
+def record_task_started(user, task):
+    increments = {"tasks_started": 1}
+    if task.type not in DAILY_LIMIT_EXEMPT_TYPES:
+        increments["limited_tasks_started"] = 1
+    bump(user, **increments)
+
+
+def record_task_completed(user, task):
+    bump(user, tasks_completed=1, **{f"{task.type}_completed": 1})
+    increment(user, "tasks_completed_count")
+
+
+def record_coins(user, tx_type, coins):
+    """Called by the wallet service for every WalletTransaction it writes."""
+    field = _COIN_FIELDS.get(tx_type)
+    if field and coins:
+        bump(user, **{field: coins})
+    bump_rollup(user, tx_type, coins)
+
+
+def record_coins_many(tx_type, totals, day=None):
+    """
+    Set-based record_coins for bulk wallet writes: `totals` maps
+    user_id -> (coins, transaction count).
+    """
+    day = day or timezone.now().date()
+    field = _COIN_FIELDS.get(tx_type)
+    if field:
+        upsert_add(
+            UserDailyStats,
+            [UserDailyStats(user_id=user_id, date=day, **{field: coins}) for user_id, (coins, _) in totals.items() if coins],
+            ["user", "date"],
+            [field],
+        )
+    upsert_add(
+        DailyEarningRollup,
+        [
+            DailyEarningRollup(user_id=user_id, day=day, type=tx_type, coins_sum=coins, tx_count=count)
+            for user_id, (coins, count) in totals.items()
+        ],
+        ["user", "day", "type"],
+        ["coins_sum", "tx_count"],
+    )
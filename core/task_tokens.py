@@ -0,0 +1,91 @@
+"""
+Signed task-start tokens (optional, settings.TASK_START_TOKENS).
+
+In token mode TaskStartView writes no pending UserTask row. It returns a
+token signed with SECRET_KEY (django.core.signing, HMAC-SHA256) carrying
+the user, task, start time, device and a random nonce. TaskCompleteView
+verifies the token and writes a single completed row. Each nonce can be
+consumed once: the replay cache keeps it until the token would have
+expired anyway.
+
+The replay guard is only sound on a cache every worker shares, so token
+mode stays off (pending rows are used) unless settings.SHARED_CACHE is on.
+"""
+import logging
+import secrets
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+TASK_TOKEN_SALT = "core.task_start"
+TASK_TOKEN_REPLAY_KEY = "core:task-token:used:{nonce}"
+
+
+class InvalidTaskToken(Exception):
+    """The token is malformed, tampered with, expired or for another user."""
+
+
+class TaskTokenReused(Exception):
+    """The token was already used to complete a task."""
+
+
+_warned = False
+
+
+def tokens_enabled():
+    global _warned
+    if not getattr(settings, "TASK_START_TOKENS", False):
+        return False
+    if not getattr(settings, "SHARED_CACHE", False):
+        # A per-worker cache would let each worker accept the same token once
+        if not _warned:
+            logger.warning("TASK_START_TOKENS ignored: the replay guard needs a shared cache (SHARED_CACHE)")
+            _warned = True
+        return False
+    return True
+
+
+def _max_age():
+    return getattr(settings, "TASK_START_TOKEN_MAX_AGE", 6 * 60 * 60)
+
+
+def issue_task_token(user, task, device_id=""):
+    """Return a signed token recording that `user` started `task` now."""
+    payload = {
+        "u": user.pk,
+        "t": task.pk,
+        "s": time.time(),
+        "d": device_id or "",
+        "n": secrets.token_urlsafe(12),
+    }
+    return signing.dumps(payload, salt=TASK_TOKEN_SALT)
+
+
+def read_task_token(token, user):
+    """
+    Verify the token and return (task_id, started_at, device_id, nonce).
+    Raises InvalidTaskToken.
+    """
+    try:
+        payload = signing.loads(token or "", salt=TASK_TOKEN_SALT, max_age=_max_age())
+    except signing.SignatureExpired:
+        raise InvalidTaskToken("Task start token expired. Start the task again.")
+    except signing.BadSignature:
+        raise InvalidTaskToken("Invalid task start token.")
+
+    if payload.get("u") != user.pk:
+        raise InvalidTaskToken("Invalid task start token.")
+
+    started_at = datetime.fromtimestamp(payload["s"], tz=dt_timezone.utc)
+    return payload["t"], started_at, payload["d"], payload["n"]
+
+
+def consume_task_token(nonce):
+    """Mark the token's nonce as used. Raises TaskTokenReused on a replay."""
+    if not cache.add(TASK_TOKEN_REPLAY_KEY.format(nonce=nonce), 1, _max_age()):
+        raise TaskTokenReused("Task already completed.")
@@ -1,3 +1,1132 @@
-from django.test import TestCase
+import csv
+import hashlib
+import json
+import os
+import re
+import tempfile
+import time
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from io import StringIO
+from unittest import mock, skipUnless
+from urllib.parse import urlencode
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import IntegrityError, connection
+from django.db.models import Sum
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.exceptions import PermissionDenied
+from rest_framework.test import APIClient, APIRequestFactory, force_authenticate
+
+from .models import (
+    CPXTransaction, DailyChallengeClaim, DailyEarningRollup, FraudEvent, PostbackInbox, Settings, Task, User,
+    UserAchievement, UserDailyStats, UserTask, WalletTransaction, WithdrawRequest,
+)
+from . import fraud_score, fraud_sink, ip_intel, leaderboard
+from .catalog import get_task_catalog, invalidate_task_catalog
+from .leaderboard import SortedBoard
+from .middleware import client_ip
+from .postback_filter import BloomFilter, reset_recent_ids, warm_recent_ids
+from .postbacks import postback_lag, process_batch
+from .stats import bump, record_task_completed, record_task_started
+from .timing_scores import NUMPY_AVAILABLE
+from .utils import check_daily_task_limit, day_filter, day_range, record_fraud_event
+from .views_daily_bonus import DailyBonusView
+from .views_streak import LoginStreakView
+from .wallet import InsufficientBalance, credit, debit, experience_updates
+
+
+# -----------------------------------------
+# WALLET SERVICE
+# -----------------------------------------
+class WalletTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("saver", password="x")
+
+    def assert_ledger_matches(self):
+        self.user.refresh_from_db()
+        ledger = self.user.wallet_transactions.aggregate(total=Sum("coins"))["total"] or 0
+        self.assertEqual(self.user.coins_balance, ledger)
+
+    def test_stale_instances_cannot_overdraw(self):
+        credit(self.user, 100, "earn")
+        first, second = User.objects.get(pk=self.user.pk), User.objects.get(pk=self.user.pk)
+        debit(first, 60, "withdraw")
+        # `second` still believes the balance is 100
+        with self.assertRaises(InsufficientBalance):
+            debit(second, 60, "withdraw")
+        self.assert_ledger_matches()
+        self.assertEqual(self.user.coins_balance, 40)
+
+    def test_column_updates_ride_on_the_credit(self):
+        credit(self.user, 25, "earn", **experience_updates(250))
+        self.user.refresh_from_db()
+        # Level = floor(sqrt(250 / 100)) + 1
+        self.assertEqual((self.user.total_experience, self.user.user_level), (250, 2))
+        self.assertEqual(self.user.wallet_transactions.get().coins, 25)
+        self.assert_ledger_matches()
+
+    def test_clamped_debit_records_the_applied_amount(self):
+        credit(self.user, 30, "earn")
+        tx = debit(self.user, 100, "reversal", note="chargeback", clamp=True)
+        self.assertEqual(tx.coins, -30)
+        self.assert_ledger_matches()
+        self.assertEqual(self.user.coins_balance, 0)
+        self.assertEqual(debit(self.user, 5, "reversal", clamp=True).coins, 0)
+
+    def test_stats_increments(self):
+        credit(self.user, 50, "earn")
+        credit(self.user, 20, "bonus")
+        debit(self.user, 10, "withdraw")
+        debit(self.user, 15, "reversal", clamp=True)
+
+        stats = UserDailyStats.for_day(self.user)
+        self.assertEqual((stats.earn_coins, stats.bonus_coins, stats.withdraw_coins), (50, 20, -10))
+        self.user.refresh_from_db()
+        # Reversals are not earnings: the lifetime total only grows
+        self.assertEqual(self.user.coins_earned_total, 70)
+        rollup = DailyEarningRollup.objects.get(user=self.user, type="reversal")
+        self.assertEqual((rollup.coins_sum, rollup.tx_count), (-15, 1))
+        self.assert_ledger_matches()
+
+    def test_parallel_daily_bonus_and_streak_claims_pay_once(self):
+        self.user.last_login_date = timezone.now().date() - timedelta(days=1)
+        self.user.login_streak = 3
+        self.user.save()
+        factory = APIRequestFactory()
+
+        for view, path in ((DailyBonusView.as_view(), "/api/daily-bonus/"), (LoginStreakView.as_view(), "/api/streak/")):
+            # Both requests loaded the user before either claimed
+            stale = [User.objects.get(pk=self.user.pk) for _ in range(2)]
+            responses = []
+            for user in stale:
+                request = factory.post(path)
+                force_authenticate(request, user=user)
+                responses.append(view(request))
+            self.assertEqual(responses[0].status_code, 200)
+            self.assertTrue(responses[1].status_code == 400 or responses[1].data["bonus"] == 0)
+
+        self.assertEqual(self.user.wallet_transactions.filter(type="bonus").count(), 2)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.login_streak, 4)
+        self.assert_ledger_matches()
+
+    def test_concurrent_challenge_claim_pays_once(self):
+        self.user.login_streak = 3
+        self.user.save()
+        client = APIClient()
+        client.force_authenticate(self.user)
+        self.assertEqual(client.post("/api/challenges/", {"challenge_id": "streak_3_days"}).status_code, 200)
+
+        # A second request that passed the "already claimed" check before the
+        # first one inserted its claim row hits the unique constraint instead
+        with mock.patch.object(DailyChallengeClaim.objects, "filter") as claims:
+            claims.return_value.exists.return_value = False
+            response = client.post("/api/challenges/", {"challenge_id": "streak_3_days"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("already been claimed", response.data["detail"])
+        self.assertEqual(self.user.wallet_transactions.count(), 1)
+        self.assert_ledger_matches()
+
+
+# -----------------------------------------
+# DAILY STATS
+# -----------------------------------------
+class UserDailyStatsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("counter", password="x")
+
+    def test_counters_follow_task_and_wallet_writes(self):
+        video = Task.objects.create(type="video", title="Video")
+        quiz = Task.objects.create(type="quiz", title="Quiz")
+        for task in (video, quiz):
+            record_task_started(self.user, task)
+        record_task_completed(self.user, quiz)
+        credit(self.user, 40, "earn")
+        credit(self.user, 10, "bonus")
+
+        stats = UserDailyStats.for_day(self.user)
+        # Game tasks have their own limits: only the video counts as limited
+        self.assertEqual((stats.tasks_started, stats.limited_tasks_started, stats.tasks_completed), (2, 1, 1))
+        self.assertEqual((stats.completed_for_type("quiz"), stats.coins_earned), (1, 50))
+
+    @mock.patch("core.utils.record_fraud_event")
+    def test_daily_limit_reads_the_stats_row(self, record_fraud_event):
+        check_daily_task_limit(self.user)
+        bump(self.user, limited_tasks_started=3)
+        with self.assertRaises(PermissionDenied):
+            check_daily_task_limit(self.user)
+        self.assertEqual(record_fraud_event.call_args.kwargs["event_type"], "limit_exceeded")
+
+
+# -----------------------------------------
+# KEYSET PAGINATION
+# -----------------------------------------
+class KeysetPaginationTests(TestCase):
+    def test_wallet_pages_cover_every_row_once_with_timestamp_ties(self):
+        user = User.objects.create_user("pager", password="x")
+        for n in range(7):
+            credit(user, n + 1, "earn")
+        # Identical timestamps: the id tie-breaker must still split pages cleanly
+        user.wallet_transactions.update(created_at=timezone.now())
+        client = APIClient()
+        client.force_authenticate(user)
+
+        seen, cursor = [], None
+        while True:
+            params = {"page_size": 3, **({"cursor": cursor} if cursor else {})}
+            data = client.get("/api/wallet/", params).data
+            seen += [tx["id"] for tx in data["transactions"]]
+            cursor = data["next_cursor"]
+            if not cursor:
+                break
+        self.assertEqual(seen, sorted(user.wallet_transactions.values_list("id", flat=True), reverse=True))
+        self.assertEqual(client.get("/api/wallet/", {"cursor": "garbage"}).status_code, 400)
+
+
+# -----------------------------------------
+# SETTINGS SNAPSHOT
+# -----------------------------------------
+class SettingsSnapshotTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        Settings.invalidate_cache()
+
+    @override_settings(SHARED_CACHE=True, SETTINGS_CACHE_TTL=60)
+    def test_shared_cache_snapshot_reloads_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            row = Settings.objects.create(key="DAILY_BONUS_COINS", value="20")
+        self.assertEqual(Settings.get_int("DAILY_BONUS_COINS"), 20)
+        with self.assertNumQueries(0):
+            self.assertEqual(Settings.get_int("DAILY_BONUS_COINS"), 20)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            row.value = "35"
+            row.save()
+            self.assertEqual(Settings.get_int("DAILY_BONUS_COINS"), 20)
+        self.assertEqual(Settings.get_int("DAILY_BONUS_COINS"), 35)
+
+    @override_settings(SHARED_CACHE=False, SETTINGS_CACHE_TTL=60)
+    def test_without_shared_cache_snapshot_expires(self):
+        Settings.objects.create(key="COIN_TO_RS_RATE", value="0.02")
+        self.assertEqual(Settings.get_float("COIN_TO_RS_RATE"), 0.02)
+        # Another worker's edit: no signal reaches this process
+        Settings.objects.filter(key="COIN_TO_RS_RATE").update(value="0.03")
+        with self.assertNumQueries(0):
+            self.assertEqual(Settings.get_float("COIN_TO_RS_RATE"), 0.02)
+
+        later = time.monotonic() + 61
+        with mock.patch("core.models.time.monotonic", return_value=later):
+            self.assertEqual(Settings.get_float("COIN_TO_RS_RATE"), 0.03)
+
+
+# -----------------------------------------
+# TASK CATALOG CACHE
+# -----------------------------------------
+class TaskCatalogTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        invalidate_task_catalog()
+
+    @override_settings(SHARED_CACHE=True)
+    def test_task_edit_reaches_next_read_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            task = Task.objects.create(type="video", title="Old title")
+        body, etag = get_task_catalog()
+        self.assertIn(b"Old title", body)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            task.title = "New title"
+            task.save()
+            # Still open: the version is not bumped yet
+            self.assertEqual(get_task_catalog()[1], etag)
+
+        body, new_etag = get_task_catalog()
+        self.assertIn(b"New title", body)
+        self.assertNotEqual(new_etag, etag)
+
+    @override_settings(SHARED_CACHE=False, TASK_CATALOG_LOCAL_TTL=60)
+    def test_without_shared_cache_local_copy_expires(self):
+        task = Task.objects.create(type="video", title="Old title")
+        get_task_catalog()
+        # Another worker's edit: no version bump reaches this process
+        Task.objects.filter(pk=task.pk).update(title="New title")
+        with self.assertNumQueries(0):
+            self.assertIn(b"Old title", get_task_catalog()[0])
+
+        later = time.monotonic() + 61
+        with mock.patch("core.catalog.time.monotonic", return_value=later):
+            self.assertIn(b"New title", get_task_catalog()[0])
+
+
+# -----------------------------------------
+# INDEX COVERAGE FOR HOT QUERIES
+# -----------------------------------------
+@skipUnless(connection.vendor == "sqlite", "EXPLAIN QUERY PLAN is SQLite syntax")
+class HotQueryIndexTests(TestCase):
+    """
+    Run the core views and EXPLAIN every SELECT they emit. None of them may
+    fall back to a full table scan on the large tables.
+    """
+    HOT_TABLES = {
+        "core_usertask",
+        "core_wallettransaction",
+        "core_withdrawrequest",
+        "core_fraudevent",
+        "core_userdailystats",
+        "core_dailyearningrollup",
+        "core_userachievement",
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("indexer", password="x")
+        cls.admin = User.objects.create_superuser("indexadmin", password="x")
+        User.objects.create_user("invited", password="x", referred_by=cls.user)
+
+        video = Task.objects.create(type="video", title="Video", reward_coins=5)
+        Task.objects.create(type="puzzle", title="Puzzle")
+        UserTask.objects.create(user=cls.user, task=video, status="completed")
+        credit(cls.user, 5, "earn")
+        WithdrawRequest.objects.create(user=cls.user, amount_rs=50, method="esewa", account_id="1")
+
+    def assert_queries_use_indexes(self, queries):
+        with connection.cursor() as cursor:
+            for query in queries:
+                sql = query["sql"]
+                if not sql.startswith("SELECT"):
+                    continue
+                # Captured SQL has params inlined, which is all EXPLAIN needs
+                cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+                for row in cursor.fetchall():
+                    detail = row[-1]
+                    match = re.match(r"SCAN (\w+)", detail)
+                    if match and match.group(1) in self.HOT_TABLES and "INDEX" not in detail:
+                        self.fail(f"Full scan of {match.group(1)}: {detail}\n{sql}")
+
+    def run_view(self, client, method, url, **kwargs):
+        with CaptureQueriesContext(connection) as captured:
+            response = getattr(client, method)(url, **kwargs)
+        self.assertLess(response.status_code, 500, url)
+        self.assert_queries_use_indexes(captured.captured_queries)
+
+    def test_user_views(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        puzzle = Task.objects.get(type="puzzle")
+
+        for url in [
+            "/api/me/",
+            "/api/tasks/",
+            "/api/wallet/",
+            "/api/withdraws/",
+            "/api/referrals/",
+            "/api/analytics/",
+            "/api/achievements/",
+            "/api/challenges/",
+            "/api/daily-bonus/",
+            "/api/streak/",
+        ]:
+            self.run_view(client, "get", url)
+
+        self.run_view(client, "post", f"/api/tasks/game/complete/{puzzle.id}/")
+        self.run_view(client, "post", "/api/daily-bonus/")
+        self.run_view(client, "post", "/api/ads/rewarded/complete/")
+
+    def test_admin_views(self):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+
+        self.run_view(client, "get", "/api/admin/withdraws/")
+        self.run_view(client, "get", "/api/admin/withdraws/", data={"status": "pending"})
+
+
+# -----------------------------------------
+# DAY WINDOWS
+# -----------------------------------------
+class DayRangeTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user("clock", password="x")
+        self.late = WalletTransaction.objects.create(user=user, type="earn", coins=1)
+        self.early = WalletTransaction.objects.create(user=user, type="earn", coins=2)
+        WalletTransaction.objects.filter(pk=self.late.pk).update(
+            created_at=datetime(2024, 3, 1, 23, 59, 59, tzinfo=dt_timezone.utc),
+        )
+        WalletTransaction.objects.filter(pk=self.early.pk).update(
+            created_at=datetime(2024, 3, 2, 0, 0, 0, tzinfo=dt_timezone.utc),
+        )
+
+    def ids(self, *days):
+        return list(
+            WalletTransaction.objects.filter(**day_filter("created_at", *days)).order_by("id").values_list("id", flat=True)
+        )
+
+    def test_utc_day_boundaries(self):
+        start, end = day_range(date(2024, 3, 1), date(2024, 3, 1))
+        self.assertEqual(start, datetime(2024, 3, 1, tzinfo=dt_timezone.utc))
+        self.assertEqual(end, datetime(2024, 3, 2, tzinfo=dt_timezone.utc))
+
+        self.assertEqual(self.ids(date(2024, 3, 1), date(2024, 3, 1)), [self.late.pk])
+        self.assertEqual(self.ids(date(2024, 3, 2), date(2024, 3, 2)), [self.early.pk])
+        self.assertEqual(self.ids(date(2024, 3, 1), date(2024, 3, 2)), [self.late.pk, self.early.pk])
+
+    @override_settings(TIME_ZONE="Asia/Kathmandu")
+    def test_days_stay_utc_under_another_time_zone(self):
+        # 23:59:59 UTC is already 2 March in Kathmandu; the windows (like the
+        # rollups and daily stats) are keyed by the UTC day regardless
+        self.assertEqual(self.ids(date(2024, 3, 1), date(2024, 3, 1)), [self.late.pk])
+        self.assertEqual(day_range(date(2024, 3, 1))[0].utcoffset(), timedelta(0))
+
+        # The default day is today in UTC, not in the local time zone
+        now = datetime(2024, 3, 1, 20, 0, tzinfo=dt_timezone.utc)  # 01:45 on 2 March in Kathmandu
+        with mock.patch("core.utils.timezone.now", return_value=now):
+            self.assertEqual(self.ids(), [self.late.pk])
+
+
+# -----------------------------------------
+# ANALYTICS QUERY BUDGET
+# -----------------------------------------
+class UserAnalyticsQueryBudgetTests(TestCase):
+    """UserAnalyticsView must run a fixed number of queries, however much history exists."""
+    QUERY_BUDGET = 5
+
+    def test_query_budget_is_fixed(self):
+        user = User.objects.create_user("analyst", password="x")
+        User.objects.create_user("friend", password="x", referred_by=user)
+        task = Task.objects.create(type="quiz", title="Quiz")
+        client = APIClient()
+        client.force_authenticate(user)
+
+        for _ in range(2):
+            with self.assertNumQueries(self.QUERY_BUDGET):
+                response = client.get("/api/analytics/")
+            self.assertEqual(response.status_code, 200)
+
+            UserTask.objects.create(user=user, task=task, status="completed", completed_at=timezone.now())
+            credit(user, 50, "earn")
+            credit(user, 20, "bonus")
+
+        data = response.data
+        self.assertEqual(data["earnings"]["total"], 70)
+        self.assertEqual(data["earnings"]["today"], 70)
+        self.assertEqual(data["earnings"]["daily_breakdown"][0]["coins"], 70)
+        self.assertEqual(data["tasks"]["total_completed"], 1)
+        self.assertEqual(data["tasks"]["by_type"], [{"task__type": "quiz", "count": 1}])
+        self.assertEqual(data["referrals"]["total"], 1)
+
+
+# -----------------------------------------
+# EARNING ROLLUPS
+# -----------------------------------------
+class DailyEarningRollupTests(TestCase):
+    def test_rebuild_matches_live_counters(self):
+        user = User.objects.create_user("roller", password="x")
+        credit(user, 50, "earn")
+        credit(user, 30, "earn")
+        credit(user, 10, "bonus")
+
+        def snapshot():
+            return sorted(
+                DailyEarningRollup.objects.filter(user=user)
+                .values_list("day", "type", "coins_sum", "tx_count")
+            )
+
+        live = snapshot()
+        today = timezone.now().date()
+        self.assertEqual(live, [(today, "bonus", 10, 1), (today, "earn", 80, 2)])
+
+        DailyEarningRollup.objects.all().delete()
+        call_command("rebuild_earning_rollups", stdout=StringIO())
+        self.assertEqual(snapshot(), live)
+
+
+# -----------------------------------------
+# ACHIEVEMENTS
+# -----------------------------------------
+class AchievementTests(TestCase):
+    def test_unlocked_on_credit_and_read_in_one_query(self):
+        user = User.objects.create_user("achiever", password="x")
+        credit(user, 600, "earn")
+        self.assertFalse(UserAchievement.objects.filter(user=user).exists())
+
+        credit(user, 600, "bonus")
+        self.assertEqual(
+            list(UserAchievement.objects.filter(user=user).values_list("achievement_id", flat=True)),
+            ["earner_1000"],
+        )
+
+        client = APIClient()
+        client.force_authenticate(user)
+        with self.assertNumQueries(1):
+            response = client.get("/api/achievements/")
+
+        self.assertEqual([a["id"] for a in response.data["unlocked"]], ["earner_1000"])
+        locked = {a["id"]: a for a in response.data["locked"]}
+        self.assertEqual(locked["earner_5000"]["progress"], 1200)
+        self.assertIn("tasker_10", locked)
+
+
+# -----------------------------------------
+# LEADERBOARDS
+# -----------------------------------------
+class LeaderboardTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        leaderboard._local.clear()
+
+    def test_sorted_board_ranks(self):
+        board = SortedBoard({1: 50, 2: 80, 3: 50})
+        self.assertEqual(board.top(3), [(2, 80), (1, 50), (3, 50)])
+        board.add(3, 40)
+        self.assertEqual(board.rank(3), 1)
+        self.assertEqual(board.rank(2), 2)
+        self.assertIsNone(board.rank(99))
+
+    @override_settings(SHARED_CACHE=True)
+    def test_credits_replayed_into_boards(self):
+        alice = User.objects.create_user("alice", password="x")
+        bob = User.objects.create_user("bob", password="x")
+        credit(alice, 30, "earn")
+
+        # First read builds the snapshot from the database
+        client = APIClient()
+        client.force_authenticate(bob)
+        self.assertEqual(client.get("/api/leaderboard/daily/").data["me"]["rank"], None)
+
+        # Later credits arrive through the shared delta log
+        with self.captureOnCommitCallbacks(execute=True):
+            credit(bob, 50, "earn")
+        with self.captureOnCommitCallbacks(execute=True):
+            credit(alice, 5, "bonus")
+        with self.settings(LEADERBOARD_SYNC_INTERVAL=0):
+            response = client.get("/api/leaderboard/daily/")
+            ranks = client.get("/api/leaderboard/me/").data
+
+        self.assertEqual(
+            [(row["username"], row["score"]) for row in response.data["top"]],
+            [("bob", 50), ("alice", 35)],
+        )
+        self.assertEqual(response.data["me"], {"rank": 1, "score": 50})
+        self.assertEqual(ranks["weekly"]["rank"], 1)
+        self.assertEqual(ranks["alltime"]["total_ranked"], 2)
+
+    @override_settings(SHARED_CACHE=False, LEADERBOARD_LOCAL_TTL=60)
+    def test_without_shared_cache_boards_rebuild_from_database(self):
+        alice = User.objects.create_user("alice", password="x")
+        credit(alice, 30, "earn")
+        self.assertEqual(leaderboard.get_board("alltime").top(1), [(alice.id, 30)])
+
+        # Credited in another worker: nothing is published, the TTL catches it
+        with self.captureOnCommitCallbacks(execute=True):
+            credit(alice, 20, "earn")
+        self.assertEqual(leaderboard.get_board("alltime").top(1), [(alice.id, 30)])
+        later = time.monotonic() + 61
+        with mock.patch("core.leaderboard.time.monotonic", return_value=later):
+            self.assertEqual(leaderboard.get_board("alltime").top(1), [(alice.id, 50)])
+            self.assertEqual(leaderboard.get_board("daily").top(1), [(alice.id, 50)])
+
+
+# -----------------------------------------
+# SLIDING-WINDOW FRAUD FEATURES
+# -----------------------------------------
+class FraudFeatureTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_features_and_score_read_without_database(self):
+        from .fraud_features import record_completion, record_start, risk
+
+        for user_id in (1, 2, 3, 4):
+            record_start(user_id, "shared-device", "10.0.0.1")
+        for _ in range(8):
+            record_completion(1, "shared-device", "10.0.0.1")
+
+        with self.assertNumQueries(0):
+            score, values = risk(1, "shared-device", "10.0.0.1")
+        self.assertEqual(values["user_rate"], 8)
+        self.assertEqual(values["device_accounts"], 4)
+        self.assertEqual(values["ip_accounts"], 4)
+        # 2 completions over the allowance (5 each) + 2 extra accounts (15 each)
+        self.assertEqual(score, 40.0)
+        self.assertEqual(risk(9, "other-device")[0], 0.0)
+
+    @override_settings(FRAUD_RISK_BLOCK_SCORE=30)
+    def test_task_start_blocked_over_threshold(self):
+        task = Task.objects.create(type="video", title="Video", reward_coins=5)
+        client = APIClient()
+        for n in range(4):
+            user = User.objects.create_user(f"farm{n}", password="x")
+            client.force_authenticate(user)
+            response = client.post(f"/api/tasks/start/{task.id}/", {"device_id": "farm-phone"})
+        # Fourth account on one device: 2 over the allowance -> 30
+        self.assertEqual(response.status_code, 403)
+
+
+# -----------------------------------------
+# MULTI-ACCOUNT CLUSTERS
+# -----------------------------------------
+class AccountClusterTests(TestCase):
+    def test_shared_device_ip_and_referral_clusters(self):
+        task = Task.objects.create(type="video", title="Video")
+        a = User.objects.create_user("farm_a", password="x", device_id="phone-1")
+        b = User.objects.create_user("farm_b", password="x", device_id="phone-1")
+        c = User.objects.create_user("farm_c", password="x", referred_by=b)
+        d = User.objects.create_user("farm_d", password="x")
+        loner = User.objects.create_user("loner", password="x", device_id="phone-9")
+        other = User.objects.create_user("other", password="x")
+        UserTask.objects.create(user=c, task=task, ip_address="10.1.1.1")
+        UserTask.objects.create(user=d, task=task, ip_address="10.1.1.1")
+        # A NAT address shared by too many accounts links nobody
+        for user in (a, loner, other):
+            UserTask.objects.create(user=user, task=task, ip_address="10.9.9.9")
+        # ... also when its users are spread over several tables
+        for user in (loner, other):
+            UserTask.objects.create(user=user, task=task, ip_address="10.5.5.5")
+        FraudEvent.objects.create(user=a, event_type="limit_exceeded", score=1, ip_address="10.5.5.5")
+
+        out = StringIO()
+        call_command("cluster_accounts", max_key_users=2, chunk_size=2, stdout=out)
+        self.assertIn("ip: 3 distinct values, 2 skipped as shared", out.getvalue())
+        clusters = dict(User.objects.values_list("username", "account_cluster"))
+        self.assertEqual({clusters[n] for n in ("farm_a", "farm_b", "farm_c", "farm_d")}, {a.pk})
+        self.assertIsNone(clusters["loner"])
+        self.assertIsNone(clusters["other"])
+        d.refresh_from_db()
+        self.assertEqual(d.account_cluster_size, 4)
+
+        # Links removed: a rerun resets the cluster
+        UserTask.objects.filter(user=d).delete()
+        call_command("cluster_accounts", max_key_users=2, stdout=StringIO())
+        d.refresh_from_db()
+        self.assertEqual((d.account_cluster, d.account_cluster_size), (None, 1))
+
+
+# -----------------------------------------
+# BUFFERED FRAUD EVENTS
+# -----------------------------------------
+class FraudSinkTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        fraud_sink.flush()
+
+    @override_settings(FRAUD_EVENT_USER_CAP=3, FRAUD_EVENT_BUFFER_SIZE=100)
+    def test_events_capped_buffered_and_flushed_in_one_batch(self):
+        users = [User.objects.create_user(f"abuser{n}", password="x") for n in range(2)]
+        with self.assertNumQueries(0):
+            for _ in range(10):
+                for user in users:
+                    record_fraud_event(user, "10.0.0.1", "dev", "limit_exceeded", 10.0, "over limit")
+
+        # bulk insert + decay UPDATE + add UPDATE inside one savepoint
+        with self.assertNumQueries(5):
+            self.assertEqual(fraud_sink.flush(), 6)
+        for user in users:
+            user.refresh_from_db()
+            self.assertEqual(user.fraud_score, 30.0)
+            self.assertEqual(user.fraud_events.count(), 3)
+
+
+# -----------------------------------------
+# DECAYED FRAUD SCORE
+# -----------------------------------------
+@override_settings(FRAUD_SCORE_HALF_LIFE_DAYS=10)
+class FraudScoreDecayTests(TestCase):
+    def test_score_halves_per_half_life_on_read_write_and_filter(self):
+        now = timezone.now()
+        old = User.objects.create_user("reformed", password="x", fraud_score=40.0,
+                                       fraud_score_at=now - timedelta(days=20))
+        recent = User.objects.create_user("recent", password="x", fraud_score=40.0, fraud_score_at=now)
+
+        self.assertAlmostEqual(fraud_score.current_score(40.0, old.fraud_score_at, now), 10.0)
+        self.assertEqual(
+            list(fraud_score.filter_by_score(User.objects.all(), 20, now).values_list("pk", flat=True)),
+            [recent.pk],
+        )
+
+        fraud_score.add_scores({old.pk: 5.0}, now)
+        old.refresh_from_db()
+        self.assertAlmostEqual(old.fraud_score, 15.0, places=3)
+        self.assertEqual(old.fraud_score_at, now)
+
+
+# -----------------------------------------
+# IP INTELLIGENCE
+# -----------------------------------------
+class IpIntelTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.networks = os.path.join(tmp.name, "networks.csv")
+        countries = os.path.join(tmp.name, "countries.csv")
+        self.write(self.networks, "cidr,label\n34.64.0.0/10,datacenter\n34.80.0.0/16,other\n2001:db8::/32,vpn\n")
+        self.write(countries, "start,end,country\n1.0.0.0,1.0.0.255,AU\n34.0.0.0,34.255.255.255,US\nbad line\n")
+        settings = override_settings(
+            IP_INTEL_NETWORK_FILES=[self.networks], IP_INTEL_COUNTRY_FILES=[countries], IP_INTEL_CHECK_INTERVAL=0,
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        ip_intel.reset_index()
+        self.addCleanup(ip_intel.reset_index)
+
+    def write(self, path, text):
+        with open(path, "w") as f:
+            f.write(text)
+
+    def test_lookup_and_reload_on_file_change(self):
+        self.assertEqual(ip_intel.lookup("34.80.1.2"), ("34.80.1.2", "datacenter", "US"))
+        self.assertEqual(ip_intel.lookup("::ffff:1.0.0.9"), ("1.0.0.9", None, "AU"))
+        self.assertEqual(ip_intel.lookup("2001:db8::1").network, "vpn")
+        self.assertEqual(ip_intel.lookup("8.8.8.8"), ("8.8.8.8", None, None))
+        self.assertEqual(ip_intel.lookup("not-an-ip"), ip_intel.UNKNOWN)
+
+        self.write(self.networks, "8.8.8.0/24,vpn\n")
+        os.utime(self.networks, ns=(0, 0))
+        self.assertEqual(ip_intel.lookup("8.8.8.8").network, "vpn")
+        self.assertIsNone(ip_intel.lookup("34.80.1.2").network)
+
+    @override_settings(TASK_BLOCKED_NETWORKS=["datacenter"], TRUSTED_PROXY_COUNT=1)
+    def test_task_start_refused_from_blocked_network(self):
+        user = User.objects.create_user("hosted", password="x")
+        task = Task.objects.create(type="video", title="Video")
+        client = APIClient()
+        client.force_authenticate(user)
+        # A spoofed left-most entry does not hide the address the proxy appended
+        response = client.post(
+            f"/api/tasks/start/{task.id}/", REMOTE_ADDR="10.0.0.2", HTTP_X_FORWARDED_FOR="1.0.0.9, 34.64.0.1",
+        )
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(UserTask.objects.exists())
+
+        response = client.post(f"/api/tasks/start/{task.id}/", REMOTE_ADDR="10.0.0.2", HTTP_X_FORWARDED_FOR="1.0.0.9")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(UserTask.objects.get().ip_address, "1.0.0.9")
+
+    def test_client_ip_behind_one_proxy(self):
+        factory = APIRequestFactory()
+
+        def ip(**meta):
+            return client_ip(factory.get("/", REMOTE_ADDR="10.0.0.2", **meta))
+
+        # Default deploy: one proxy appends the real client to X-Forwarded-For
+        self.assertEqual(ip(HTTP_X_FORWARDED_FOR="1.0.0.9"), "1.0.0.9")
+        self.assertEqual(ip(HTTP_X_FORWARDED_FOR="6.6.6.6, 1.0.0.9"), "1.0.0.9")
+        self.assertEqual(ip(), "10.0.0.2")
+        with override_settings(TRUSTED_PROXY_COUNT=0):
+            self.assertEqual(ip(HTTP_X_FORWARDED_FOR="1.0.0.9"), "10.0.0.2")
+
+
+# -----------------------------------------
+# TASK TIMING ANOMALIES
+# -----------------------------------------
+class TaskTimingScoreTests(TestCase):
+    @skipUnless(NUMPY_AVAILABLE, "NumPy not installed")
+    def test_consistently_fast_user_flagged_once(self):
+        task = Task.objects.create(type="video", title="Video")
+        now = timezone.now()
+        fast = User.objects.create_user("speedy", password="x")
+        for n in range(20):
+            user = User.objects.create_user(f"normal{n}", password="x")
+            UserTask.objects.create(
+                user=user, task=task, status="completed",
+                started_at=now - timedelta(seconds=60 + n), completed_at=now,
+            )
+        for _ in range(5):
+            UserTask.objects.create(
+                user=fast, task=task, status="completed",
+                started_at=now - timedelta(seconds=20), completed_at=now,
+            )
+
+        for _ in range(2):
+            call_command("score_task_timing", stdout=StringIO())
+        self.assertEqual(list(FraudEvent.objects.values_list("user_id", flat=True)), [fast.pk])
+        fast.refresh_from_db()
+        # 20 s against a ~70 s median: z = -5.3 -> score 10.6
+        self.assertEqual(fast.fraud_score, 10.6)
+
+
+# -----------------------------------------
+# SIGNED TASK START TOKENS
+# -----------------------------------------
+@override_settings(TASK_START_TOKENS=True, SHARED_CACHE=True)
+class TaskStartTokenTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        # Write the too-fast FraudEvent before the test rolls back
+        self.addCleanup(fraud_sink.flush)
+        self.user = User.objects.create_user("starter", password="x")
+        self.task = Task.objects.create(type="video", title="Video", reward_coins=5)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def start(self):
+        response = self.client.post(f"/api/tasks/start/{self.task.id}/", {"device_id": "dev-1"})
+        self.assertEqual(response.status_code, 201)
+        self.assertNotIn("user_task_id", response.data)
+        return response.data["start_token"]
+
+    def test_complete_writes_one_row_and_token_is_single_use(self):
+        token = self.start()
+        self.assertFalse(UserTask.objects.exists())
+
+        later = timezone.now() + timedelta(seconds=30)
+        with mock.patch("core.views.timezone.now", return_value=later):
+            response = self.client.post("/api/tasks/complete/", {"start_token": token})
+            replay = self.client.post("/api/tasks/complete/", {"start_token": token})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(replay.status_code, 409)
+        row = UserTask.objects.get()
+        self.assertEqual((row.status, row.device_id), ("completed", "dev-1"))
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.coins_balance, 5)
+
+    def test_too_fast_tampered_and_foreign_tokens_write_nothing(self):
+        self.assertEqual(self.client.post("/api/tasks/complete/", {"start_token": self.start()}).status_code, 400)
+
+        token = self.start()
+        other = APIClient()
+        other.force_authenticate(User.objects.create_user("other", password="x"))
+        later = timezone.now() + timedelta(seconds=30)
+        with mock.patch("core.views.timezone.now", return_value=later):
+            self.assertEqual(self.client.post("/api/tasks/complete/", {"start_token": token + "x"}).status_code, 400)
+            self.assertEqual(other.post("/api/tasks/complete/", {"start_token": token}).status_code, 400)
+            self.assertFalse(UserTask.objects.exists())
+
+            self.assertEqual(self.client.post("/api/tasks/complete/", {"start_token": token}).status_code, 200)
+
+    def test_tokens_refused_without_shared_cache(self):
+        token = self.start()
+        with override_settings(SHARED_CACHE=False):
+            later = timezone.now() + timedelta(seconds=30)
+            with mock.patch("core.views.timezone.now", return_value=later):
+                self.assertEqual(self.client.post("/api/tasks/complete/", {"start_token": token}).status_code, 400)
+            response = self.client.post(f"/api/tasks/start/{self.task.id}/", {"device_id": "dev-1"})
+            self.assertIn("user_task_id", response.data)
+
+
+# -----------------------------------------
+# POSTBACK INBOX
+# -----------------------------------------
+@override_settings(POSTBACK_INBOX=True)
+class PostbackInboxTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        reset_recent_ids()
+
+    def test_postbacks_queued_then_applied_once_per_user(self):
+        user = User.objects.create_user("offerer", password="x")
+        client = APIClient()
+
+        def cpx(trans_id, amount, user_id=user.id):
+            response = client.get("/api/cpx/postback/", {"trans_id": trans_id, "ext_user_id": user_id, "amount": amount})
+            self.assertEqual(response.data, {"ok": True, "queued": True})
+
+        cpx("c1", 100)
+        cpx("c2", 50)
+        cpx("c1", 100)  # network retry
+        cpx("c3", 10, user_id=999999)
+        client.get("/api/tapjoy/postback/", {"transaction_id": "t1", "user_id": user.id, "currency": 25})
+        self.assertEqual(user.wallet_transactions.count(), 0)
+
+        counts = process_batch()
+        self.assertEqual(
+            (counts["applied"], counts["duplicate"], counts["failed"], counts["users"]),
+            (3, 1, 1, 1),
+        )
+        user.refresh_from_db()
+        self.assertEqual(user.coins_balance, 175)
+        # One ledger row that still names every id it paid for
+        note = user.wallet_transactions.get().note
+        for external_id in ("trans_id=c1", "trans_id=c2", "transaction_id=t1"):
+            self.assertIn(external_id, note)
+
+        # Redelivery after the batch committed is still applied only once
+        cpx("c2", 50)
+        self.assertEqual(process_batch()["duplicate"], 1)
+        user.refresh_from_db()
+        self.assertEqual(user.coins_balance, 175)
+
+        # Reversal of c1 (same trans_id) and its retry: one debit
+        for _ in range(2):
+            client.get("/api/cpx/postback/", {"trans_id": "c1", "ext_user_id": user.id, "amount": 100, "status": 2})
+        counts = process_batch()
+        self.assertEqual((counts["applied"], counts["duplicate"]), (1, 1))
+        user.refresh_from_db()
+        self.assertEqual(user.coins_balance, 75)
+        self.assertEqual(postback_lag()["pending"], 0)
+
+    def test_once_makes_a_single_pass(self):
+        user = User.objects.create_user("inbox2", password="x")
+        client = APIClient()
+        for trans_id in ("r1", "r2", "r3"):
+            client.get("/api/cpx/postback/", {"trans_id": trans_id, "ext_user_id": user.id, "amount": 5})
+
+        # Every group is rescheduled for retry; --once still stops
+        with mock.patch("core.postbacks._apply_user", side_effect=IntegrityError), \
+                mock.patch("core.postbacks._inserted_elsewhere", return_value=True):
+            out = StringIO()
+            call_command("process_postbacks", once=True, batch_size=2, stdout=out)
+        self.assertIn("retry 3)", out.getvalue())
+        self.assertEqual(postback_lag()["pending"], 3)
+
+        call_command("process_postbacks", once=True, stdout=StringIO())
+        user.refresh_from_db()
+        self.assertEqual(user.coins_balance, 15)
+
+    def test_other_integrity_errors_fail_the_rows(self):
+        user = User.objects.create_user("inbox3", password="x")
+        APIClient().get("/api/cpx/postback/", {"trans_id": "f1", "ext_user_id": user.id, "amount": 5})
+
+        with mock.patch("core.postbacks._apply_user", side_effect=IntegrityError("NOT NULL constraint failed")):
+            counts = process_batch()
+        self.assertEqual((counts["failed"], counts["retry"]), (1, 0))
+        row = PostbackInbox.objects.get()
+        self.assertEqual((row.result, row.error), ("failed", "NOT NULL constraint failed"))
+
+
+# -----------------------------------------
+# BULK WITHDRAWAL REVIEW
+# -----------------------------------------
+class BulkWithdrawalTests(TestCase):
+    def setUp(self):
+        self.users = [User.objects.create_user(f"payee{n}", password="x") for n in range(3)]
+        for user in self.users:
+            for amount in (50, 100):
+                WithdrawRequest.objects.create(user=user, amount_rs=amount, method="esewa", account_id="98")
+
+    def test_reject_refunds_per_user_in_fixed_queries(self):
+        from .withdrawals import reject_withdrawals
+
+        with self.assertNumQueries(9):
+            rejected, refunds = reject_withdrawals(WithdrawRequest.objects.all(), admin_note="fraud wave")
+        self.assertEqual(len(rejected), 6)
+        # Default rate 0.025: Rs 150 -> 6000 coins per user
+        self.assertEqual(sum(refunds.values()), 18000)
+        for user in self.users:
+            user.refresh_from_db()
+            self.assertEqual(user.coins_balance, 6000)
+            self.assertEqual(user.wallet_transactions.filter(type="withdraw").count(), 2)
+        rollup = DailyEarningRollup.objects.get(user=self.users[0], type="withdraw")
+        self.assertEqual((rollup.coins_sum, rollup.tx_count), (6000, 2))
+        self.assertFalse(WithdrawRequest.objects.exclude(status="rejected", admin_note="fraud wave").exists())
+        # Already rejected: nothing happens twice
+        self.assertEqual(reject_withdrawals(WithdrawRequest.objects.all()), ([], {}))
+
+    def test_bulk_approve_api(self):
+        admin = User.objects.create_user("boss", password="x", is_staff=True)
+        client = APIClient()
+        client.force_authenticate(admin)
+        ids = list(WithdrawRequest.objects.filter(user=self.users[0]).values_list("pk", flat=True))
+
+        response = client.post("/api/admin/withdraws/bulk/approve/", {"ids": ids}, format="json")
+        self.assertEqual(sorted(response.data["ids"]), sorted(ids))
+        self.users[0].refresh_from_db()
+        self.assertEqual(self.users[0].withdrawals_completed_count, 2)
+        self.assertTrue(UserAchievement.objects.filter(user=self.users[0], achievement_id="withdrawer_1").exists())
+        self.assertEqual(client.post(f"/api/admin/withdraws/{ids[0]}/reject/").status_code, 400)
+
+
+# -----------------------------------------
+# PAYOUT EXPORT
+# -----------------------------------------
+class PayoutExportTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user("finance", password="x", is_staff=True))
+        self.payee = User.objects.create_user("payee", password="x", email="payee@example.com")
+        approved = WithdrawRequest.STATUS_APPROVED
+        self.esewa = WithdrawRequest.objects.create(
+            user=self.payee, amount_rs=50, method="esewa", account_id="98", status=approved,
+        )
+        self.khalti = WithdrawRequest.objects.create(
+            user=self.payee, amount_rs=100, method="khalti", account_id="97", status=approved,
+        )
+        self.pending = WithdrawRequest.objects.create(user=self.payee, amount_rs=75, method="esewa", account_id="98")
+        WithdrawRequest.objects.filter(pk=self.khalti.pk).update(
+            created_at=timezone.now().replace(year=2024, month=3, day=1, hour=12),
+        )
+
+    def export(self, mark=False, **params):
+        send = self.client.post if mark else self.client.get
+        response = send(f"/api/admin/withdraws/export/?{urlencode(params)}")
+        self.assertEqual(response.status_code, 200)
+        return response, b"".join(response.streaming_content).decode()
+
+    def test_csv_and_ndjson_output(self):
+        response, body = self.export(output="csv")
+        self.assertEqual(response["Content-Type"], "text/csv")
+        rows = list(csv.reader(body.splitlines()))
+        self.assertEqual(rows[0][:4], ["id", "user_id", "username", "email"])
+        self.assertEqual([int(row[0]) for row in rows[1:]], [self.esewa.pk, self.khalti.pk])
+        self.assertEqual(rows[1][2:7], ["payee", "payee@example.com", "50.00", "esewa", "98"])
+
+        response, body = self.export(output="ndjson")
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual([row["id"] for row in rows], [self.esewa.pk, self.khalti.pk])
+        self.assertEqual((rows[1]["method"], rows[1]["status"]), ("khalti", "approved"))
+        self.assertTrue(rows[1]["created_at"].startswith("2024-03-01"))
+
+    def test_filters(self):
+        def ids(**params):
+            return [json.loads(line)["id"] for line in self.export(output="ndjson", **params)[1].splitlines()]
+
+        self.assertEqual(ids(method="khalti"), [self.khalti.pk])
+        self.assertEqual(ids(status="pending"), [self.pending.pk])
+        self.assertEqual(ids(**{"from": "2024-03-01", "to": "2024-03-01"}), [self.khalti.pk])
+        self.assertEqual(ids(to="2024-02-29"), [])
+
+        for params in ({"from": "2024-02-30"}, {"to": "yesterday"}, {"output": "xlsx"}):
+            response = self.client.get(f"/api/admin/withdraws/export/?{urlencode(params)}")
+            self.assertEqual(response.status_code, 400, params)
+
+    def test_mark_and_batch_reexport(self):
+        response, body = self.export(mark=True, output="ndjson")
+        batch = response["X-Payout-Batch"]
+        self.assertEqual({json.loads(line)["payout_batch"] for line in body.splitlines()}, {batch})
+        self.assertEqual(len(body.splitlines()), 2)
+        # Already batched rows are not handed out twice
+        self.assertEqual(len(self.export(mark=True, output="csv")[1].splitlines()), 1)
+
+        # A re-export by batch id keeps rows that were paid in the meantime
+        WithdrawRequest.objects.filter(pk=self.esewa.pk).update(status="paid")
+        self.assertEqual(len(self.export(output="ndjson", batch=batch)[1].splitlines()), 2)
+        out = StringIO()
+        call_command("export_payouts", batch=batch, stdout=out)
+        self.assertEqual(len(out.getvalue().splitlines()), 3)
+
+
+# -----------------------------------------
+# IDEMPOTENCY-KEY
+# -----------------------------------------
+class IdempotencyKeyTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("retrier", password="x")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_retry_replays_first_response(self):
+        first = self.client.post("/api/daily-bonus/", HTTP_IDEMPOTENCY_KEY="k1")
+        with self.assertNumQueries(0):
+            retry = self.client.post("/api/daily-bonus/", HTTP_IDEMPOTENCY_KEY="k1")
+        self.assertEqual(retry.status_code, 200)
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.coins_balance, first.data["bonus_coins"])
+        # A new key runs the view again (and hits the once-a-day rule)
+        self.assertEqual(self.client.post("/api/daily-bonus/", HTTP_IDEMPOTENCY_KEY="k2").status_code, 400)
+        self.assertEqual(
+            self.client.post("/api/ads/rewarded/complete/", {"x": 1}, HTTP_IDEMPOTENCY_KEY="k1").status_code, 200
+        )
+        self.assertEqual(
+            self.client.post("/api/ads/rewarded/complete/", {"x": 2}, HTTP_IDEMPOTENCY_KEY="k1").status_code, 422
+        )
+
+    @override_settings(IDEMPOTENCY_WAIT=0.1)
+    def test_in_flight_request_is_collapsed(self):
+        from .idempotency import _cache_key
+
+        request = mock.Mock(method="POST", path="/api/daily-bonus/", user=self.user)
+        cache.add(f"{_cache_key(request, 'busy')}:lock", 1)
+        response = self.client.post("/api/daily-bonus/", HTTP_IDEMPOTENCY_KEY="busy")
+        self.assertEqual(response.status_code, 409)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.coins_balance, 0)
+
+
+# -----------------------------------------
+# OFFERWALL PROVIDERS
+# -----------------------------------------
+class OfferwallPostbackTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("walluser", password="x")
+        self.client = APIClient()
+        cache.clear()
+        reset_recent_ids()
+
+    def cpx(self, **params):
+        return self.client.get("/api/cpx/postback/", {"ext_user_id": self.user.id, **params})
+
+    def test_cpx_credit_duplicate_and_reversal(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.cpx(trans_id="a", amount=100).data, {"ok": True})
+        self.assertEqual(self.cpx(trans_id="a", amount=100).data, {"ok": True, "duplicate": True})
+
+        # The reversal reuses the credited trans_id and debits exactly once
+        self.assertEqual(self.cpx(trans_id="a", amount=100, status=2).data, {"ok": True})
+        self.assertEqual(self.cpx(trans_id="a", amount=100, status=2).data, {"ok": True, "duplicate": True})
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.coins_balance, 0)
+        self.assertEqual(CPXTransaction.objects.get(trans_id="a").status, 2)
+
+        # A reversal that arrives first blocks the late credit
+        with self.captureOnCommitCallbacks(execute=True):
+            self.cpx(trans_id="b", amount=300, status=2)
+        self.assertEqual(self.cpx(trans_id="b", amount=300).data, {"ok": True, "duplicate": True})
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.coins_balance, 0)
+        self.assertEqual(self.cpx(trans_id="c", amount=5, status="x").status_code, 400)
+
+    def test_known_duplicate_answered_without_database(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.cpx(trans_id="r1", amount=50)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.cpx(trans_id="r1", amount=50).data, {"ok": True, "duplicate": True})
+
+        # Bloom hit without the shared key: confirmed by one EXISTS probe
+        cache.clear()
+        with self.assertNumQueries(1):
+            self.assertEqual(self.cpx(trans_id="r1", amount=50).data, {"ok": True, "duplicate": True})
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.coins_balance, 50)
+
+        # Warmed at worker start: the first postback pays no table scan
+        reset_recent_ids()
+        warm_recent_ids()
+        cache.clear()
+        with self.assertNumQueries(1):
+            self.assertEqual(self.cpx(trans_id="r1", amount=50).data, {"ok": True, "duplicate": True})
+
+        bloom = BloomFilter(1000)
+        for n in range(1000):
+            bloom.add(f"id-{n}")
+        self.assertTrue(all(f"id-{n}" in bloom for n in range(1000)))
+        self.assertLess(sum(f"other-{n}" in bloom for n in range(1000)), 50)
+
+    @override_settings(CPX_REQUIRE_SECURE_HASH=True, CPX_SECURITY_HASH="s3cret")
+    def test_cpx_secure_hash_required(self):
+        self.assertEqual(self.cpx(trans_id="h", amount=10).status_code, 400)
+        good = hashlib.md5(f"{self.user.id}-s3cret".encode()).hexdigest()
+        self.assertEqual(self.cpx(trans_id="h", amount=10, secure_hash=good).status_code, 200)
+
+    def test_loadtest_harness_verifies_exactly_once(self):
+        out = StringIO()
+        call_command(
+            "loadtest_postbacks",
+            count=60, users=5, duplicate_rate=0.5, reversal_rate=0.2, concurrency=1, seed=7, stdout=out,
+        )
+        self.assertIn("Exactly-once verified: 60 ids", out.getvalue())
+        # Reversals reuse the credited trans_id and take the balance back down
+        debited = int(re.search(r"reversals: (\d+) debited", out.getvalue()).group(1))
+        self.assertGreater(debited, 0)
+        self.assertFalse(User.objects.filter(username__startswith="loadtest_").exists())
+
+    def test_tapjoy_and_generic_route(self):
+        response = self.client.post(
+            "/api/offerwalls/tapjoy/postback/",
+            {"transaction_id": "t1", "user_id": self.user.id, "currency": 40},
+            format="json",
+        )
+        self.assertEqual(response.data, {"ok": True, "coins_added": 40})
+        response = self.client.get("/api/tapjoy/postback/", {"transaction_id": "t2", "user_id": self.user.id})
+        self.assertEqual(response.data["message"], "zero or negative amount")
+        self.assertEqual(self.client.get("/api/offerwalls/nope/postback/").status_code, 404)
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.coins_balance, 40)
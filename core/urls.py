@@ -1,7 +1,5 @@
 from django.urls import path
 from rest_framework_simplejwt.views import TokenRefreshView
-from .cpx import cpx_wall_url, cpx_postback
-from .tapjoy import tapjoy_wall_url, tapjoy_postback
 
 from .views import (
     CustomTokenObtainPairView,
@@ -25,7 +23,9 @@ from .views_analytics import UserAnalyticsView
 from .views_streak import LoginStreakView
 from .views_achievements import AchievementsView
 from .views_challenges import DailyChallengesView
-from .views_admin import AdminWithdrawListView, AdminWithdrawDetailView, AdminWithdrawActionView, AdminWithdrawActionView
+from .views_leaderboard import LeaderboardView, LeaderboardRankView
+from .views_offerwalls import offerwall_wall_url, offerwall_postback
+from .views_admin import AdminWithdrawListView, AdminWithdrawDetailView, AdminWithdrawActionView, AdminWithdrawActionView, AdminWithdrawBulkActionView, AdminWithdrawExportView
 
 
 urlpatterns = [
@@ -53,6 +53,8 @@ urlpatterns = [
         TaskCompleteView.as_view(),
         name="task_complete",
     ),
+    # Token mode (TASK_START_TOKENS): {"start_token": ...} in the body
+    path("tasks/complete/", TaskCompleteView.as_view(), name="task_complete_token"),
     # Game-based tasks (instant completion)
     path("tasks/game/complete/<int:task_id>/", GameTaskCompleteView.as_view(), name="game_task_complete"),
 
@@ -92,6 +94,12 @@ urlpatterns = [
     # DAILY CHALLENGES
     # -------------------------
     path("challenges/", DailyChallengesView.as_view(), name="daily_challenges"),
+
+    # -------------------------
+    # LEADERBOARDS
+    # -------------------------
+    path("leaderboard/me/", LeaderboardRankView.as_view(), name="leaderboard_rank"),
+    path("leaderboard/<str:board>/", LeaderboardView.as_view(), name="leaderboard"),
     
     # -------------------------
     # CORS TEST (for debugging)
@@ -104,21 +112,21 @@ urlpatterns = [
     path("ads/rewarded/complete/", RewardedAdCompleteView.as_view(), name="rewarded_ad_complete"),
     
     # -------------------------
-    # CPX
-    # -------------------------
-    path("cpx/wall/", cpx_wall_url, name="cpx_wall"),
-    path("cpx/postback/", cpx_postback, name="cpx_postback"),
-    
-    # -------------------------
-    # TAPJOY
+    # OFFERWALLS (providers in core/offerwalls.py)
     # -------------------------
-    path("tapjoy/wall/", tapjoy_wall_url, name="tapjoy_wall"),
-    path("tapjoy/postback/", tapjoy_postback, name="tapjoy_postback"),
+    path("cpx/wall/", offerwall_wall_url, {"provider": "cpx"}, name="cpx_wall"),
+    path("cpx/postback/", offerwall_postback, {"provider": "cpx"}, name="cpx_postback"),
+    path("tapjoy/wall/", offerwall_wall_url, {"provider": "tapjoy"}, name="tapjoy_wall"),
+    path("tapjoy/postback/", offerwall_postback, {"provider": "tapjoy"}, name="tapjoy_postback"),
+    path("offerwalls/<str:provider>/wall/", offerwall_wall_url, name="offerwall_wall"),
+    path("offerwalls/<str:provider>/postback/", offerwall_postback, name="offerwall_postback"),
     
     # -------------------------
     # ADMIN (Admin only - requires IsAdminUser permission)
     # -------------------------
     path("admin/withdraws/", AdminWithdrawListView.as_view(), name="admin_withdraw_list"),
+    path("admin/withdraws/export/", AdminWithdrawExportView.as_view(), name="admin_withdraw_export"),
+    path("admin/withdraws/bulk/<str:action>/", AdminWithdrawBulkActionView.as_view(), name="admin_withdraw_bulk_action"),
     path("admin/withdraws/<int:withdraw_id>/", AdminWithdrawDetailView.as_view(), name="admin_withdraw_detail"),
     path("admin/withdraws/<int:withdraw_id>/<str:action>/", AdminWithdrawActionView.as_view(), name="admin_withdraw_action"),
 ]
@@ -1,12 +1,45 @@
-from django.utils import timezone
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.utils import timezone
 from rest_framework.exceptions import PermissionDenied
 
-from .models import FraudEvent, UserTask
+from . import fraud_sink
+from .models import UserDailyStats
 
 User = get_user_model()
 
 
+# -------------------------------------
+# DAY WINDOWS (sargable date filters)
+# -------------------------------------
+def day_range(start_day=None, end_day=None):
+    """
+    Half-open UTC [start, end) datetime range covering the calendar days
+    start_day..end_day inclusive (both default to today).
+
+    Filtering a timestamp with this range (field__gte/field__lt) lets the
+    database use a plain btree index, unlike `field__date=...` which wraps
+    the column in a date cast.
+    """
+    today = timezone.now().date()
+    start_day = start_day or today
+    end_day = end_day or today
+    start = datetime.combine(start_day, time.min, tzinfo=dt_timezone.utc)
+    end = datetime.combine(end_day + timedelta(days=1), time.min, tzinfo=dt_timezone.utc)
+    return start, end
+
+
+def day_filter(field, start_day=None, end_day=None):
+    """
+    Filter kwargs for `field` within day_range(start_day, end_day), e.g.
+    WalletTransaction.objects.filter(**day_filter("created_at", week_ago)).
+    """
+    start, end = day_range(start_day, end_day)
+    return {f"{field}__gte": start, f"{field}__lt": end}
+
+
 # -------------------------------------
 # FRAUD LOGGING
 # -------------------------------------
@@ -14,20 +47,11 @@ def record_fraud_event(user, ip_address, device_id, event_type, score, reason):
     """
     Record a fraud event & update the user's fraud score.
     Does NOT block the user by itself.
+
+    Events are capped per user and written in batches (see core/fraud_sink.py),
+    so repeated abuse does not turn into a write per request.
     """
-    # Update total fraud score
-    user.fraud_score += score
-    user.save(update_fields=["fraud_score"])
-
-    # Store detailed event
-    FraudEvent.objects.create(
-        user=user,
-        event_type=event_type,
-        score=score,
-        reason=reason,
-        ip_address=ip_address,
-        device_id=device_id,
-    )
+    fraud_sink.record(user.pk, ip_address, device_id, event_type, score, reason)
 
 
 # -------------------------------------
@@ -42,17 +66,30 @@ def check_task_speed(user_task, min_seconds=8):
     if not user_task.completed_at:
         return  # should never happen
 
-    duration = (user_task.completed_at - user_task.started_at).total_seconds()
+    check_task_duration(
+        user_task.user,
+        user_task.task_id,
+        user_task.started_at,
+        user_task.completed_at,
+        ip_address=user_task.ip_address,
+        device_id=user_task.device_id,
+        min_seconds=min_seconds,
+    )
+
+
+def check_task_duration(user, task_id, started_at, completed_at, ip_address=None, device_id=None, min_seconds=8):
+    """check_task_speed for a start time that has no UserTask row (signed start tokens)."""
+    duration = (completed_at - started_at).total_seconds()
 
     # If completed too fast = cheating
     if duration < min_seconds:
         record_fraud_event(
-            user=user_task.user,
-            ip_address=user_task.ip_address,
-            device_id=user_task.device_id,
+            user=user,
+            ip_address=ip_address,
+            device_id=device_id,
             event_type="suspicious_speed",
             score=5.0,
-            reason=f"Task {user_task.task_id} completed in {duration}s (< {min_seconds}s).",
+            reason=f"Task {task_id} completed in {duration}s (< {min_seconds}s).",
         )
 
         raise PermissionDenied(
@@ -71,18 +108,9 @@ def check_daily_task_limit(user, max_tasks_per_day=3):
     Game-based tasks (scratch_card, spin_wheel, puzzle, quiz) have their own per-type limits.
     """
 
-    today = timezone.now().date()
-
-    # Count only non-offerwall and non-game tasks started today
-    # Exclude offerwall tasks and game-based tasks from daily limit
-    # Game tasks have their own per-type limits (3 times per type)
-    game_types = ["scratch_card", "spin_wheel", "puzzle", "quiz"]
-    count_today = UserTask.objects.filter(
-        user=user,
-        started_at__date=today
-    ).exclude(
-        task__type__in=["offerwall", "tapjoy_offerwall"] + game_types  # Exclude offerwall and game tasks from daily limit
-    ).count()
+    # Limited (non-offerwall, non-game) starts are counted incrementally
+    # in UserDailyStats, so this is a single (user, date) lookup.
+    count_today = UserDailyStats.for_day(user).limited_tasks_started
 
     if count_today >= max_tasks_per_day:
 
@@ -99,3 +127,24 @@ def check_daily_task_limit(user, max_tasks_per_day=3):
         raise PermissionDenied(
             f"Daily task limit reached ({max_tasks_per_day} tasks per day). Try again tomorrow."
         )
+
+
+# -------------------------------------
+# IP ELIGIBILITY
+# -------------------------------------
+def check_ip_eligibility(ip_info):
+    """
+    Refuse tasks from networks in settings.TASK_BLOCKED_NETWORKS and, when
+    settings.TASK_ALLOWED_COUNTRIES is set, from IPs located in other countries
+    (IPs missing from the country ranges are allowed).
+    `ip_info` is request.ip_info (core.ip_intel); None skips the check.
+    """
+    if ip_info is None:
+        return
+
+    if ip_info.network and ip_info.network in getattr(settings, "TASK_BLOCKED_NETWORKS", ()):
+        raise PermissionDenied("Tasks are not available over VPN, proxy or hosting networks.")
+
+    allowed = getattr(settings, "TASK_ALLOWED_COUNTRIES", ())
+    if allowed and ip_info.country and ip_info.country not in allowed:
+        raise PermissionDenied("Tasks are not available in your region.")
@@ -1,14 +1,23 @@
 from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.http import HttpResponse, HttpResponseNotModified
 from django.utils import timezone
+from django.utils.http import parse_etags
 
 from rest_framework import status, permissions
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
 from rest_framework_simplejwt.views import TokenObtainPairView
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from rest_framework.exceptions import PermissionDenied
 
-from .models import Task, UserTask, WalletTransaction, WithdrawRequest, Settings
+from .catalog import get_task_catalog
+from .fraud_features import check_risk, record_completion, record_start
+from .idempotency import idempotent
+from .middleware import client_ip
+from .models import Task, UserTask, UserDailyStats, WalletTransaction, WithdrawRequest, Settings
+from .pagination import KeysetPagination
 from .serializers import (
     RegisterSerializer,
     UserSerializer,
@@ -16,7 +25,17 @@ from .serializers import (
     WalletTransactionSerializer,
     WithdrawRequestSerializer,
 )
-from .utils import check_task_speed, check_daily_task_limit
+from .stats import GAME_TASK_TYPES, record_task_started, record_task_completed
+from .task_tokens import (
+    InvalidTaskToken,
+    TaskTokenReused,
+    consume_task_token,
+    issue_task_token,
+    read_task_token,
+    tokens_enabled,
+)
+from .utils import check_task_speed, check_task_duration, check_daily_task_limit, check_ip_eligibility
+from .wallet import credit, debit, experience_updates, InsufficientBalance
 
 User = get_user_model()
 
@@ -25,8 +44,10 @@ User = get_user_model()
 #  HELPERS
 # -----------------------------
 def get_client_ip(request):
-    x_forwarded_for = request.META.get("HTTP_X_FORWARDED_FOR")
-    return x_forwarded_for.split(",")[0] if x_forwarded_for else request.META.get("REMOTE_ADDR")
+    # Set by core.middleware.IpIntelMiddleware
+    if getattr(request, "client_ip", None):
+        return request.client_ip
+    return client_ip(request)
 
 
 # -----------------------------
@@ -71,17 +92,30 @@ class MeView(APIView):
 #  TASK SYSTEM
 # -----------------------------
 class TaskListView(APIView):
+    """
+    Active task catalog, served from the versioned catalog cache.
+    Supports If-None-Match -> 304 so polling clients skip the body.
+    The token is validated without a user lookup, so a hit runs no queries.
+    """
+    authentication_classes = [JWTStatelessUserAuthentication]
+
     def get(self, request):
-        tasks = Task.objects.filter(is_active=True).order_by('id')
-        # Log for debugging
-        import logging
-        logger = logging.getLogger(__name__)
-        task_list = list(tasks.values('id', 'type', 'title', 'is_active'))
-        logger.info(f"TaskListView: Returning {len(task_list)} tasks: {task_list}")
-        return Response(TaskSerializer(tasks, many=True).data)
+        body, etag = get_task_catalog()
+
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+        # If-None-Match uses weak comparison, so ignore any W/ prefix
+        client_etags = [t.removeprefix("W/") for t in parse_etags(request.META.get("HTTP_IF_NONE_MATCH", ""))]
+        if etag in client_etags or "*" in client_etags:
+            return HttpResponseNotModified(headers=headers)
+
+        return HttpResponse(body, content_type="application/json", headers=headers)
 
 
 class TaskStartView(APIView):
+    """
+    Start a task. With settings.TASK_START_TOKENS the start is returned as a
+    signed token instead of a pending UserTask row (see core/task_tokens.py).
+    """
     def post(self, request, task_id):
 
         # DAILY LIMIT CHECK
@@ -94,14 +128,33 @@ class TaskStartView(APIView):
 
         ip = get_client_ip(request)
         device_id = request.data.get("device_id")
+        ip_info = getattr(request, "ip_info", None)
+        check_ip_eligibility(ip_info)
 
-        user_task = UserTask.objects.create(
-            user=request.user,
-            task=task,
-            status="pending",
-            ip_address=ip,
-            device_id=device_id,
-        )
+        # Sliding-window risk (cache only, no DB queries)
+        record_start(request.user.pk, device_id, ip)
+        check_risk(request.user.pk, device_id, ip, ip_info)
+
+        if tokens_enabled():
+            record_task_started(request.user, task)
+            return Response(
+                {
+                    "message": "Task started",
+                    "start_token": issue_task_token(request.user, task, device_id),
+                    "task": TaskSerializer(task).data,
+                },
+                status=status.HTTP_201_CREATED,
+            )
+
+        with transaction.atomic():
+            user_task = UserTask.objects.create(
+                user=request.user,
+                task=task,
+                status="pending",
+                ip_address=ip,
+                device_id=device_id,
+            )
+            record_task_started(request.user, task)
 
         return Response(
             {"message": "Task started", "user_task_id": user_task.id, "task": TaskSerializer(task).data},
@@ -109,8 +162,37 @@ class TaskStartView(APIView):
         )
 
 
+def check_task_type_limit(user, task):
+    """
+    For game-based tasks, check by task TYPE (not specific task ID).
+    Returns an error Response when the per-type daily limit is reached.
+    """
+    if task.type not in GAME_TASK_TYPES:
+        return None
+
+    task_type_completions_today = UserDailyStats.for_day(user).completed_for_type(task.type)
+
+    # Allow 3 times per day per task TYPE
+    max_per_task_type_per_day = 3
+    if task_type_completions_today >= max_per_task_type_per_day:
+        task_type_display = task.get_type_display()
+        return Response(
+            {"detail": f"You have already completed {task_type_display} tasks {max_per_task_type_per_day} times today. Try again tomorrow."},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    return None
+
+
 class TaskCompleteView(APIView):
-    def post(self, request, user_task_id):
+    """
+    Complete a started task: POST /tasks/complete/<user_task_id>/ for a
+    pending row, or POST /tasks/complete/ with {"start_token"} in token mode.
+    """
+    @idempotent
+    def post(self, request, user_task_id=None):
+        if user_task_id is None:
+            return self.complete_from_token(request)
+
         try:
             user_task = UserTask.objects.get(id=user_task_id, user=request.user, status="pending")
         except UserTask.DoesNotExist:
@@ -119,26 +201,9 @@ class TaskCompleteView(APIView):
         user = request.user
         task = user_task.task
 
-        # For game-based tasks, check by task TYPE (not specific task ID)
-        # Allow up to 3 times per day per task TYPE
-        game_types = ["scratch_card", "spin_wheel", "puzzle", "quiz"]
-        if task.type in game_types:
-            today = timezone.now().date()
-            task_type_completions_today = UserTask.objects.filter(
-                user=user,
-                task__type=task.type,  # Filter by task type, not specific task ID
-                status="completed",
-                completed_at__date=today
-            ).count()
-            
-            # Allow 3 times per day per task TYPE
-            max_per_task_type_per_day = 3
-            if task_type_completions_today >= max_per_task_type_per_day:
-                task_type_display = task.get_type_display()
-                return Response(
-                    {"detail": f"You have already completed {task_type_display} tasks {max_per_task_type_per_day} times today. Try again tomorrow."},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
+        limit_response = check_task_type_limit(user, task)
+        if limit_response:
+            return limit_response
 
         # DAILY EARNING LIMIT
         if not user.can_earn_now(max_per_day=100):
@@ -147,7 +212,9 @@ class TaskCompleteView(APIView):
         # MARK COMPLETED
         user_task.status = "completed"
         user_task.completed_at = timezone.now()
-        user_task.save()
+        with transaction.atomic():
+            user_task.save()
+            record_task_completed(user, task)
 
         # FRAUD CHECK
         try:
@@ -155,27 +222,80 @@ class TaskCompleteView(APIView):
         except Exception as e:
             return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-        reward = user_task.task.reward_coins
+        record_completion(user.pk, user_task.device_id, user_task.ip_address)
+        return self.reward(user, task)
+
+    def complete_from_token(self, request):
+        user = request.user
+        # Fail closed: without token mode there is no sound replay guard
+        if not tokens_enabled():
+            return Response({"detail": "Task start tokens are disabled. Start the task again."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            task_id, started_at, device_id, nonce = read_task_token(request.data.get("start_token"), user)
+        except InvalidTaskToken as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        request_device = request.data.get("device_id")
+        if request_device and device_id and request_device != device_id:
+            return Response({"detail": "Invalid task start token."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            task = Task.objects.get(id=task_id, is_active=True)
+        except Task.DoesNotExist:
+            return Response({"detail": "Task not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        limit_response = check_task_type_limit(user, task)
+        if limit_response:
+            return limit_response
+
+        # DAILY EARNING LIMIT
+        if not user.can_earn_now(max_per_day=100):
+            raise PermissionDenied("Daily earning limit reached. Try again tomorrow.")
+
+        ip = get_client_ip(request)
+        completed_at = timezone.now()
+
+        try:
+            consume_task_token(nonce)
+        except TaskTokenReused as e:
+            return Response({"detail": str(e)}, status=status.HTTP_409_CONFLICT)
+
+        # FRAUD CHECK (nothing is written for a too-fast completion)
+        try:
+            check_task_duration(user, task.id, started_at, completed_at, ip_address=ip, device_id=device_id)
+        except Exception as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Single write: the completed row
+        with transaction.atomic():
+            UserTask.objects.create(
+                user=user,
+                task=task,
+                status="completed",
+                started_at=started_at,
+                completed_at=completed_at,
+                ip_address=ip,
+                device_id=device_id,
+            )
+            record_task_completed(user, task)
+
+        record_completion(user.pk, device_id, ip)
+        return self.reward(user, task)
+
+    def reward(self, user, task):
+        reward = task.reward_coins
 
         # UPDATE counters
         user.register_earn()
-        user.coins_balance += reward
-        
-        # Add experience points (10 XP per task)
-        user.total_experience += 10
-        # Level up calculation: Level = floor(sqrt(total_experience / 100)) + 1
-        import math
-        new_level = math.floor(math.sqrt(user.total_experience / 100)) + 1
-        if new_level > user.user_level:
-            user.user_level = new_level
-        
-        user.save(update_fields=["coins_balance", "total_experience", "user_level"])
 
-        WalletTransaction.objects.create(
-            user=user,
-            type="earn",
-            coins=reward,
-            note=f"Completed task {user_task.task.title}",
+        # Credit coins + 10 XP per task (level recomputed in the same UPDATE)
+        credit(
+            user,
+            reward,
+            "earn",
+            note=f"Completed task {task.title}",
+            **experience_updates(10),
         )
 
         return Response({"message": "Task completed", "reward_coins": reward})
@@ -188,16 +308,19 @@ class WalletView(APIView):
     def get(self, request):
         user = request.user
 
-        rate = float(Settings.get_value("COIN_TO_RS_RATE", "0.025"))
+        rate = Settings.get_float("COIN_TO_RS_RATE", 0.025)
         balance_rs = user.coins_balance * rate
 
-        tx = WalletTransaction.objects.filter(user=user).order_by("-created_at")[:50]
+        # Newest 50 transactions; pass ?cursor=<next_cursor> for older pages
+        paginator = KeysetPagination(page_size=50)
+        tx = paginator.paginate_queryset(WalletTransaction.objects.filter(user=user), request)
 
         return Response({
             "coins_balance": user.coins_balance,
             "approx_balance_rs": round(balance_rs, 2),
             "coin_to_rs_rate": rate,
             "transactions": WalletTransactionSerializer(tx, many=True).data,
+            "next_cursor": paginator.next_cursor,
         })
 
 
@@ -205,6 +328,7 @@ class WalletView(APIView):
 #  WITHDRAW SYSTEM
 # -----------------------------
 class WithdrawRequestView(APIView):
+    @idempotent
     def post(self, request):
         user = request.user
 
@@ -221,8 +345,8 @@ class WithdrawRequestView(APIView):
         except:
             return Response({"detail": "Invalid amount"}, status=status.HTTP_400_BAD_REQUEST)
 
-        rate = float(Settings.get_value("COIN_TO_RS_RATE", "0.025"))
-        min_rs = float(Settings.get_value("MIN_WITHDRAW_RS", "50"))
+        rate = Settings.get_float("COIN_TO_RS_RATE", 0.025)
+        min_rs = Settings.get_float("MIN_WITHDRAW_RS", 50.0)
 
         if amount_rs < min_rs:
             return Response({"detail": f"Minimum withdraw is Rs {min_rs}"}, status=status.HTTP_400_BAD_REQUEST)
@@ -232,24 +356,25 @@ class WithdrawRequestView(APIView):
         if user.coins_balance < coins_needed:
             return Response({"detail": "Insufficient balance"}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Deduct coins
-        user.coins_balance -= coins_needed
-        user.save()
-
-        WithdrawRequest.objects.create(
-            user=user,
-            amount_rs=amount_rs,
-            method=method,
-            account_id=account_id,
-        )
+        # Deduct coins (conditional UPDATE - fails if balance dropped meanwhile)
+        try:
+            with transaction.atomic():
+                debit(
+                    user,
+                    coins_needed,
+                    "withdraw",
+                    note=f"Withdraw request via {method}",
+                    amount_rs=amount_rs,
+                )
 
-        WalletTransaction.objects.create(
-            user=user,
-            type="withdraw",
-            coins=-coins_needed,
-            amount_rs=amount_rs,
-            note=f"Withdraw request via {method}",
-        )
+                WithdrawRequest.objects.create(
+                    user=user,
+                    amount_rs=amount_rs,
+                    method=method,
+                    account_id=account_id,
+                )
+        except InsufficientBalance:
+            return Response({"detail": "Insufficient balance"}, status=status.HTTP_400_BAD_REQUEST)
 
         return Response({"message": "Withdraw request created"}, status=status.HTTP_201_CREATED)
 
@@ -261,6 +386,7 @@ class RewardedAdCompleteView(APIView):
     """
     permission_classes = [permissions.IsAuthenticated]
     
+    @idempotent
     def post(self, request):
         user = request.user
         
@@ -276,16 +402,7 @@ class RewardedAdCompleteView(APIView):
         
         # Credit coins
         user.register_earn()
-        user.coins_balance += reward_coins
-        user.save(update_fields=["coins_balance", "last_earn_date", "daily_earn_count", "last_earn_time"])
-        
-        # Create wallet transaction
-        WalletTransaction.objects.create(
-            user=user,
-            type="earn",
-            coins=reward_coins,
-            note="Watched rewarded ad",
-        )
+        credit(user, reward_coins, "earn", note="Watched rewarded ad")
         
         return Response({
             "message": "Reward credited successfully",
@@ -296,5 +413,9 @@ class RewardedAdCompleteView(APIView):
 
 class UserWithdrawListView(APIView):
     def get(self, request):
-        w = WithdrawRequest.objects.filter(user=request.user).order_by("-created_at")
-        return Response(WithdrawRequestSerializer(w, many=True).data)
+        # Body stays a plain list; the next page cursor is in X-Next-Cursor
+        paginator = KeysetPagination()
+        w = paginator.paginate_queryset(
+            WithdrawRequest.objects.filter(user=request.user).select_related("user"), request
+        )
+        return Response(WithdrawRequestSerializer(w, many=True).data, headers=paginator.get_headers())
@@ -5,11 +5,15 @@ These endpoints require admin/staff permissions.
 from rest_framework import status, permissions
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from django.http import StreamingHttpResponse
 from django.utils import timezone
-from django.db import transaction
+from django.utils.dateparse import parse_date
 
-from .models import WithdrawRequest, Settings
+from .models import WithdrawRequest
+from .pagination import KeysetPagination, estimated_count
+from .payouts import FORMATS, iter_export, mark_batch, payout_queryset
 from .serializers import WithdrawRequestSerializer
+from .withdrawals import approve_withdrawals, reject_withdrawals
 
 
 class AdminWithdrawListView(APIView):
@@ -20,12 +24,17 @@ class AdminWithdrawListView(APIView):
     permission_classes = [permissions.IsAdminUser]
     
     def get(self, request):
+        """
+        Paged newest first; pass ?cursor=<next_cursor> for the next page.
+        The total is only computed with ?count=estimate (planner estimate on
+        PostgreSQL), so paging the queue never runs a COUNT(*).
+        """
         # Get filter parameters
         status_filter = request.query_params.get('status', None)
         method_filter = request.query_params.get('method', None)
         
         # Base queryset
-        queryset = WithdrawRequest.objects.select_related('user').order_by('-created_at')
+        queryset = WithdrawRequest.objects.select_related('user')
         
         # Apply filters
         if status_filter:
@@ -33,10 +42,18 @@ class AdminWithdrawListView(APIView):
         if method_filter:
             queryset = queryset.filter(method=method_filter)
         
+        paginator = KeysetPagination()
+        page = paginator.paginate_queryset(queryset, request)
+        
+        count = None
+        if request.query_params.get('count') == 'estimate':
+            count = estimated_count(queryset)
+        
         # Serialize and return
-        serializer = WithdrawRequestSerializer(queryset, many=True)
+        serializer = WithdrawRequestSerializer(page, many=True)
         return Response({
-            "count": queryset.count(),
+            "count": count,
+            "next_cursor": paginator.next_cursor,
             "results": serializer.data
         })
 
@@ -90,10 +107,15 @@ class AdminWithdrawActionView(APIView):
                     status=status.HTTP_400_BAD_REQUEST
                 )
             
-            withdraw.status = WithdrawRequest.STATUS_APPROVED
-            withdraw.processed_at = timezone.now()
-            withdraw.admin_note = request.data.get('admin_note', withdraw.admin_note)
-            withdraw.save()
+            if not approve_withdrawals(
+                WithdrawRequest.objects.filter(pk=withdraw.pk),
+                admin_note=request.data.get('admin_note'),
+            ):
+                return Response(
+                    {"detail": "Withdrawal request was already processed"},
+                    status=status.HTTP_409_CONFLICT
+                )
+            withdraw.refresh_from_db(fields=['status', 'processed_at', 'admin_note'])
             
             return Response({
                 "message": "Withdrawal request approved",
@@ -108,17 +130,17 @@ class AdminWithdrawActionView(APIView):
                 )
             
             # Refund coins to user
-            rate = float(Settings.get_value("COIN_TO_RS_RATE", "0.1"))
-            coins_to_refund = int(float(withdraw.amount_rs) / rate)
-            
-            with transaction.atomic():
-                withdraw.user.coins_balance += coins_to_refund
-                withdraw.user.save(update_fields=["coins_balance"])
-                
-                withdraw.status = WithdrawRequest.STATUS_REJECTED
-                withdraw.processed_at = timezone.now()
-                withdraw.admin_note = request.data.get('admin_note', withdraw.admin_note)
-                withdraw.save()
+            rejected, refunds = reject_withdrawals(
+                WithdrawRequest.objects.filter(pk=withdraw.pk),
+                admin_note=request.data.get('admin_note'),
+            )
+            if not rejected:
+                return Response(
+                    {"detail": "Withdrawal request was already processed"},
+                    status=status.HTTP_409_CONFLICT
+                )
+            coins_to_refund = refunds[withdraw.pk]
+            withdraw.refresh_from_db(fields=['status', 'processed_at', 'admin_note'])
             
             return Response({
                 "message": "Withdrawal request rejected and coins refunded",
@@ -149,3 +171,100 @@ class AdminWithdrawActionView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+
+
+class AdminWithdrawBulkActionView(APIView):
+    """
+    Approve or reject many pending withdrawal requests at once (admin only).
+    POST /api/admin/withdraws/bulk/approve/  {"ids": [...], "admin_note": "..."}
+    POST /api/admin/withdraws/bulk/reject/   {"ids": [...], "admin_note": "..."}
+    Requests that are no longer pending are skipped.
+    """
+    permission_classes = [permissions.IsAdminUser]
+    
+    def post(self, request, action):
+        ids = request.data.get('ids')
+        if not isinstance(ids, list) or not ids:
+            return Response({"detail": "ids must be a non-empty list"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            ids = [int(i) for i in ids]
+        except (TypeError, ValueError):
+            return Response({"detail": "ids must be integers"}, status=status.HTTP_400_BAD_REQUEST)
+        
+        queryset = WithdrawRequest.objects.filter(pk__in=ids)
+        admin_note = request.data.get('admin_note')
+        
+        if action == 'approve':
+            approved = approve_withdrawals(queryset, admin_note=admin_note)
+            return Response({
+                "message": f"{len(approved)} withdrawal request(s) approved",
+                "ids": [w.pk for w in approved],
+            })
+        
+        elif action == 'reject':
+            rejected, refunds = reject_withdrawals(queryset, admin_note=admin_note)
+            return Response({
+                "message": f"{len(rejected)} withdrawal request(s) rejected and coins refunded",
+                "ids": [w.pk for w in rejected],
+                "coins_refunded": sum(refunds.values()),
+            })
+        
+        return Response(
+            {"detail": f"Invalid action: {action}. Use 'approve' or 'reject'"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+
+class AdminWithdrawExportView(APIView):
+    """
+    Stream withdrawal requests for payout as CSV or NDJSON (admin only).
+    GET /api/admin/withdraws/export/?output=csv|ndjson&status=approved&method=&from=YYYY-MM-DD&to=YYYY-MM-DD&batch=
+    POST with the same query parameters first stamps the matching rows that
+    are not in a payout batch yet with a new batch id (X-Payout-Batch header)
+    and streams that batch. GET with `batch` re-exports that batch whatever
+    the rows' current status.
+    """
+    permission_classes = [permissions.IsAdminUser]
+    
+    def get(self, request):
+        return self.export(request, mark=False)
+    
+    def post(self, request):
+        return self.export(request, mark=True)
+    
+    def export(self, request, mark):
+        params = request.query_params
+        fmt = params.get('output', 'csv')
+        if fmt not in FORMATS:
+            return Response({"detail": "output must be csv or ndjson"}, status=status.HTTP_400_BAD_REQUEST)
+        
+        dates = {}
+        for name in ('from', 'to'):
+            if params.get(name):
+                try:
+                    dates[name] = parse_date(params[name])
+                except ValueError:
+                    # Well formed but impossible, e.g. 2024-02-30
+                    dates[name] = None
+                if dates[name] is None:
+                    return Response({"detail": f"Invalid {name} date"}, status=status.HTTP_400_BAD_REQUEST)
+        
+        queryset = payout_queryset(
+            status=params.get('status', WithdrawRequest.STATUS_APPROVED),
+            method=params.get('method'),
+            start=dates.get('from'),
+            end=dates.get('to'),
+            batch=params.get('batch'),
+        )
+        
+        batch = None
+        if mark:
+            batch, _ = mark_batch(queryset)
+            queryset = payout_queryset(status=None, batch=batch)
+        
+        response = StreamingHttpResponse(iter_export(queryset, fmt), content_type=FORMATS[fmt])
+        filename = f"payouts-{batch or timezone.now().strftime('%Y%m%d-%H%M%S')}.{fmt}"
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        if batch:
+            response['X-Payout-Batch'] = batch
+        return response
@@ -8,7 +8,9 @@ from rest_framework import status, permissions
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from .models import UserTask, WalletTransaction, Task
+from .models import DailyEarningRollup, Task, UserTask, WalletTransaction
+from .stats import EARNING_TYPES
+from .utils import day_range
 
 
 class UserAnalyticsView(APIView):
@@ -18,6 +20,11 @@ class UserAnalyticsView(APIView):
     - Task completion stats
     - Withdrawal history
     - Referral stats
+
+    Fixed query budget: one conditional aggregation over DailyEarningRollup
+    (totals and the 7-day breakdown), the withdrawn-rupees sum, one
+    conditional aggregation over UserTask, plus the pending-withdrawal and
+    referral counts.
     """
     permission_classes = [permissions.IsAuthenticated]
 
@@ -27,77 +34,75 @@ class UserAnalyticsView(APIView):
         week_ago = today - timedelta(days=7)
         month_ago = today - timedelta(days=30)
 
-        # Earnings Overview
-        total_earned = WalletTransaction.objects.filter(
-            user=user,
-            type__in=["earn", "bonus", "referral"]
-        ).aggregate(total=Sum("coins"))["total"] or 0
-
-        today_earned = WalletTransaction.objects.filter(
-            user=user,
-            type__in=["earn", "bonus", "referral"],
-            created_at__date=today
-        ).aggregate(total=Sum("coins"))["total"] or 0
-
-        week_earned = WalletTransaction.objects.filter(
-            user=user,
-            type__in=["earn", "bonus", "referral"],
-            created_at__date__gte=week_ago
-        ).aggregate(total=Sum("coins"))["total"] or 0
-
-        month_earned = WalletTransaction.objects.filter(
-            user=user,
-            type__in=["earn", "bonus", "referral"],
-            created_at__date__gte=month_ago
-        ).aggregate(total=Sum("coins"))["total"] or 0
-
-        # Task Statistics
-        total_tasks = UserTask.objects.filter(user=user, status="completed").count()
-        today_tasks = UserTask.objects.filter(
-            user=user,
-            status="completed",
-            completed_at__date=today
-        ).count()
-        week_tasks = UserTask.objects.filter(
-            user=user,
-            status="completed",
-            completed_at__date__gte=week_ago
-        ).count()
-
-        # Task type breakdown
-        task_types = UserTask.objects.filter(
-            user=user,
-            status="completed"
-        ).values("task__type").annotate(count=Count("id"))
+        today_start, _ = day_range(today)
+        week_start, _ = day_range(week_ago)
 
-        # Withdrawal Stats
-        total_withdrawn = WalletTransaction.objects.filter(
+        # Earnings Overview + 7-day breakdown: a handful of rollup rows per
+        # day instead of the user's whole ledger
+        earnings = DailyEarningRollup.objects.filter(
             user=user,
-            type="withdraw"
-        ).aggregate(total=Sum("amount_rs"))["total"] or 0
-
-        pending_withdrawals = user.withdrawals.filter(status="pending").count()
-
-        # Referral Stats
-        total_referrals = user.referrals.count()
-        active_referrals = user.referrals.filter(
-            last_earn_date__gte=week_ago
-        ).count()
-
-        # Average earnings per day (last 7 days)
+            type__in=EARNING_TYPES,
+        ).aggregate(
+            total=Sum("coins_sum"),
+            today=Sum("coins_sum", filter=Q(day__gte=today)),
+            week=Sum("coins_sum", filter=Q(day__gte=week_ago)),
+            month=Sum("coins_sum", filter=Q(day__gte=month_ago)),
+            **{
+                f"day_{i}": Sum("coins_sum", filter=Q(day=today - timedelta(days=i)))
+                for i in range(7)
+            },
+        )
         daily_earnings = []
         for i in range(7):
             date = today - timedelta(days=i)
-            day_earned = WalletTransaction.objects.filter(
-                user=user,
-                type__in=["earn", "bonus", "referral"],
-                created_at__date=date
-            ).aggregate(total=Sum("coins"))["total"] or 0
             daily_earnings.append({
                 "date": date.isoformat(),
-                "coins": day_earned
+                "coins": earnings[f"day_{i}"] or 0
             })
 
+        # Withdrawals are summed in rupees, which the rollup does not carry
+        withdrawn = WalletTransaction.objects.filter(
+            user=user,
+            type="withdraw",
+        ).aggregate(total_rs=Sum("amount_rs"))
+
+        # Task Statistics: one pass with a conditional count per task type
+        completed = Q(status="completed")
+        task_type_codes = [code for code, _ in Task.TASK_TYPES]
+        tasks = UserTask.objects.filter(user=user).aggregate(
+            total=Count("id", filter=completed),
+            today=Count("id", filter=completed & Q(completed_at__gte=today_start)),
+            week=Count("id", filter=completed & Q(completed_at__gte=week_start)),
+            **{
+                f"type_{code}": Count("id", filter=completed & Q(task__type=code))
+                for code in task_type_codes
+            },
+        )
+        task_types = [
+            {"task__type": code, "count": tasks[f"type_{code}"]}
+            for code in task_type_codes
+            if tasks[f"type_{code}"]
+        ]
+
+        pending_withdrawals = user.withdrawals.filter(status="pending").count()
+
+        # Referral Stats
+        referrals = user.referrals.aggregate(
+            total=Count("id"),
+            active=Count("id", filter=Q(last_earn_date__gte=week_ago)),
+        )
+
+        total_earned = earnings["total"] or 0
+        today_earned = earnings["today"] or 0
+        week_earned = earnings["week"] or 0
+        month_earned = earnings["month"] or 0
+        total_withdrawn = withdrawn["total_rs"] or 0
+        total_tasks = tasks["total"]
+        today_tasks = tasks["today"]
+        week_tasks = tasks["week"]
+        total_referrals = referrals["total"]
+        active_referrals = referrals["active"]
+
         return Response({
             "earnings": {
                 "total": total_earned,
@@ -110,7 +115,7 @@ class UserAnalyticsView(APIView):
                 "total_completed": total_tasks,
                 "today": today_tasks,
                 "this_week": week_tasks,
-                "by_type": list(task_types)
+                "by_type": task_types
             },
             "withdrawals": {
                 "total_rs": float(total_withdrawn),
@@ -2,13 +2,14 @@
 Daily and weekly challenges system.
 """
 from django.utils import timezone
-from django.db.models import Count, Sum, Q
+from django.db import IntegrityError, transaction
 from datetime import timedelta
 from rest_framework import status, permissions
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from .models import UserTask, WalletTransaction, Settings, DailyChallengeClaim
+from .models import UserDailyStats, DailyChallengeClaim
+from .wallet import credit
 
 
 class DailyChallengesView(APIView):
@@ -21,21 +22,15 @@ class DailyChallengesView(APIView):
         user = request.user
         today = timezone.now().date()
 
+        stats = UserDailyStats.for_day(user, today)
+
         # Challenge 1: Complete 3 tasks today
-        tasks_today = UserTask.objects.filter(
-            user=user,
-            status="completed",
-            completed_at__date=today
-        ).count()
+        tasks_today = stats.tasks_completed
         challenge_1_complete = tasks_today >= 3
         challenge_1_reward = 30 if challenge_1_complete else 0
 
         # Challenge 2: Earn 100 coins today
-        coins_today = WalletTransaction.objects.filter(
-            user=user,
-            type__in=["earn", "bonus", "referral"],
-            created_at__date=today
-        ).aggregate(total=Sum("coins"))["total"] or 0
+        coins_today = stats.coins_earned
         challenge_2_complete = coins_today >= 100
         challenge_2_reward = 50 if challenge_2_complete else 0
 
@@ -102,93 +97,49 @@ class DailyChallengesView(APIView):
             challenge_id=challenge_id,
             claimed_date=today
         ).exists():
-            return Response(
-                {"detail": "This challenge reward has already been claimed today. Try again tomorrow."},
-                status=status.HTTP_400_BAD_REQUEST
-            )
+            return self.already_claimed()
 
         # Re-check challenge completion
         if challenge_id == "complete_3_tasks":
-            tasks_today = UserTask.objects.filter(
-                user=user,
-                status="completed",
-                completed_at__date=today
-            ).count()
+            tasks_today = UserDailyStats.for_day(user, today).tasks_completed
             if tasks_today >= 3:
-                reward = 30
-                user.coins_balance += reward
-                user.save(update_fields=["coins_balance"])
-                WalletTransaction.objects.create(
-                    user=user,
-                    type="bonus",
-                    coins=reward,
-                    note="Daily challenge: Complete 3 tasks"
-                )
-                # Mark as claimed
-                DailyChallengeClaim.objects.create(
-                    user=user,
-                    challenge_id=challenge_id,
-                    claimed_date=today
-                )
-                return Response({
-                    "message": "Challenge reward claimed!",
-                    "reward": reward,
-                    "new_balance": user.coins_balance
-                })
+                return self.claim(user, challenge_id, today, 30, "Daily challenge: Complete 3 tasks")
 
         elif challenge_id == "earn_100_coins":
-            coins_today = WalletTransaction.objects.filter(
-                user=user,
-                type__in=["earn", "bonus", "referral"],
-                created_at__date=today
-            ).aggregate(total=Sum("coins"))["total"] or 0
+            coins_today = UserDailyStats.for_day(user, today).coins_earned
             if coins_today >= 100:
-                reward = 50
-                user.coins_balance += reward
-                user.save(update_fields=["coins_balance"])
-                WalletTransaction.objects.create(
-                    user=user,
-                    type="bonus",
-                    coins=reward,
-                    note="Daily challenge: Earn 100 coins"
-                )
-                # Mark as claimed
-                DailyChallengeClaim.objects.create(
-                    user=user,
-                    challenge_id=challenge_id,
-                    claimed_date=today
-                )
-                return Response({
-                    "message": "Challenge reward claimed!",
-                    "reward": reward,
-                    "new_balance": user.coins_balance
-                })
+                return self.claim(user, challenge_id, today, 50, "Daily challenge: Earn 100 coins")
 
         elif challenge_id == "streak_3_days":
             if user.login_streak >= 3:
-                reward = 20
-                user.coins_balance += reward
-                user.save(update_fields=["coins_balance"])
-                WalletTransaction.objects.create(
-                    user=user,
-                    type="bonus",
-                    coins=reward,
-                    note="Daily challenge: 3 day streak"
-                )
-                # Mark as claimed
+                return self.claim(user, challenge_id, today, 20, "Daily challenge: 3 day streak")
+
+        return Response(
+            {"detail": "Challenge not completed yet"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    def claim(self, user, challenge_id, today, reward, note):
+        """Mark the challenge as claimed (unique per day) and credit together."""
+        try:
+            with transaction.atomic():
                 DailyChallengeClaim.objects.create(
                     user=user,
                     challenge_id=challenge_id,
                     claimed_date=today
                 )
-                return Response({
-                    "message": "Challenge reward claimed!",
-                    "reward": reward,
-                    "new_balance": user.coins_balance
-                })
+                credit(user, reward, "bonus", note=note)
+        except IntegrityError:
+            # A concurrent request claimed it between the check and the insert
+            return self.already_claimed()
+        return Response({
+            "message": "Challenge reward claimed!",
+            "reward": reward,
+            "new_balance": user.coins_balance
+        })
 
+    def already_claimed(self):
         return Response(
-            {"detail": "Challenge not completed yet"},
+            {"detail": "This challenge reward has already been claimed today. Try again tomorrow."},
             status=status.HTTP_400_BAD_REQUEST
         )
-
@@ -1,9 +1,12 @@
+from django.db.models import Q
 from django.utils import timezone
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, permissions
 
-from .models import WalletTransaction, Settings
+from .idempotency import idempotent
+from .models import Settings
+from .wallet import ConditionNotMet, credit
 
 
 class DailyBonusView(APIView):
@@ -22,11 +25,7 @@ class DailyBonusView(APIView):
         already_claimed = user.daily_bonus_claimed == today
 
         # Get bonus amount from Settings table
-        bonus_str = Settings.get_value("DAILY_BONUS_COINS", "20")
-        try:
-            bonus = int(bonus_str)
-        except ValueError:
-            bonus = 20
+        bonus = Settings.get_int("DAILY_BONUS_COINS", 20)
 
         return Response({
             "already_claimed": already_claimed,
@@ -34,6 +33,7 @@ class DailyBonusView(APIView):
             "last_claimed": user.daily_bonus_claimed,
         })
 
+    @idempotent
     def post(self, request):
         """
         Claim the daily reward.
@@ -49,24 +49,24 @@ class DailyBonusView(APIView):
             )
 
         # Load bonus amount
-        bonus_str = Settings.get_value("DAILY_BONUS_COINS", "20")
-        try:
-            bonus_coins = int(bonus_str)
-        except ValueError:
-            bonus_coins = 20
-
-        # Apply coins to wallet
-        user.coins_balance += bonus_coins
-        user.daily_bonus_claimed = today
-        user.save(update_fields=["coins_balance", "daily_bonus_claimed"])
+        bonus_coins = Settings.get_int("DAILY_BONUS_COINS", 20)
 
-        # Record in wallet transactions
-        WalletTransaction.objects.create(
-            user=user,
-            type="bonus",
-            coins=bonus_coins,
-            note="Daily login bonus",
-        )
+        # Apply coins to wallet and record the transaction. The claim check
+        # is part of the UPDATE, so parallel requests cannot both claim.
+        try:
+            credit(
+                user,
+                bonus_coins,
+                "bonus",
+                note="Daily login bonus",
+                only_if=Q(daily_bonus_claimed__isnull=True) | Q(daily_bonus_claimed__lt=today),
+                daily_bonus_claimed=today,
+            )
+        except ConditionNotMet:
+            return Response(
+                {"detail": "Daily bonus already claimed today."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
 
         return Response(
             {
@@ -2,6 +2,7 @@
 Game-based task views (scratch card, spin wheel, puzzle, quiz)
 These tasks are completed instantly and reward coins automatically.
 """
+from django.db import transaction
 from django.utils import timezone
 from rest_framework import status, permissions
 from rest_framework.response import Response
@@ -9,10 +10,13 @@ from rest_framework.views import APIView
 from rest_framework.exceptions import PermissionDenied, AuthenticationFailed
 import random
 
-from .models import Task, UserTask, WalletTransaction
+from .fraud_features import check_risk, record_completion
+from .models import Task, UserTask, UserDailyStats
 from .serializers import TaskSerializer
-from .utils import check_daily_task_limit
+from .stats import record_task_started, record_task_completed
+from .utils import check_daily_task_limit, check_ip_eligibility
 from .views import get_client_ip
+from .wallet import credit, experience_updates
 
 
 class GameTaskCompleteView(APIView):
@@ -68,13 +72,7 @@ class GameTaskCompleteView(APIView):
             
             # Check how many times user completed tasks of THIS TYPE today
             # Allow up to 3 times per day per task TYPE (scratch_card, spin_wheel, puzzle, quiz)
-            today = timezone.now().date()
-            task_type_completions_today = UserTask.objects.filter(
-                user=user,
-                task__type=task.type,  # Filter by task type, not specific task ID
-                status="completed",
-                completed_at__date=today
-            ).count()
+            task_type_completions_today = UserDailyStats.for_day(user).completed_for_type(task.type)
             
             # Allow 3 times per day per task TYPE
             max_per_task_type_per_day = 3
@@ -111,38 +109,42 @@ class GameTaskCompleteView(APIView):
             ip = get_client_ip(request)
             device_id = request.data.get("device_id", "")
             
-            # Create and mark as completed immediately
-            user_task = UserTask.objects.create(
-                user=user,
-                task=task,
-                status="completed",
-                started_at=timezone.now(),
-                completed_at=timezone.now(),
-                ip_address=ip,
-                device_id=device_id,
-            )
+            # IP eligibility and sliding-window risk (no DB queries)
+            ip_info = getattr(request, "ip_info", None)
+            try:
+                check_ip_eligibility(ip_info)
+                check_risk(user.pk, device_id, ip, ip_info)
+            except PermissionDenied as e:
+                return Response(
+                    {"detail": str(e)},
+                    status=status.HTTP_403_FORBIDDEN
+                )
             
-            # Award coins immediately (with transaction safety)
+            # Create and mark as completed immediately, then award coins
+            # (task row, daily stats and wallet credit commit together)
             user.register_earn()
-            user.coins_balance += reward
-            
-            # Add experience points (10 XP per task)
-            user.total_experience += 10
-            # Level up calculation: Level = floor(sqrt(total_experience / 100)) + 1
-            import math
-            new_level = math.floor(math.sqrt(user.total_experience / 100)) + 1
-            if new_level > user.user_level:
-                user.user_level = new_level
-            
-            user.save(update_fields=["coins_balance", "last_earn_date", "daily_earn_count", "last_earn_time", "total_experience", "user_level"])
-            
-            # Create wallet transaction
-            WalletTransaction.objects.create(
-                user=user,
-                type="earn",
-                coins=reward,
-                note=f"Completed {task.get_type_display()}: {task.title}",
-            )
+            with transaction.atomic():
+                user_task = UserTask.objects.create(
+                    user=user,
+                    task=task,
+                    status="completed",
+                    started_at=timezone.now(),
+                    completed_at=timezone.now(),
+                    ip_address=ip,
+                    device_id=device_id,
+                )
+                record_task_started(user, task)
+                record_task_completed(user, task)
+
+                # Credit coins + 10 XP per task (level recomputed in the same UPDATE)
+                credit(
+                    user,
+                    reward,
+                    "earn",
+                    note=f"Completed {task.get_type_display()}: {task.title}",
+                    **experience_updates(10),
+                )
+            record_completion(user.pk, device_id, ip)
             
             return Response({
                 "message": "Task completed successfully",
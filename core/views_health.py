@@ -5,6 +5,8 @@ from django.http import JsonResponse
 from django.db import connection
 from django.core.cache import cache
 
+from .postbacks import inbox_enabled, postback_lag
+
 
 def health_check(request):
     """
@@ -36,6 +38,13 @@ def health_check(request):
     except Exception as e:
         health_status["checks"]["cache"] = f"error: {str(e)}"
     
+    # Postback inbox backlog (informational; a lagging worker is not an outage)
+    if inbox_enabled():
+        try:
+            health_status["checks"]["postback_inbox"] = postback_lag()
+        except Exception as e:
+            health_status["checks"]["postback_inbox"] = f"error: {str(e)}"
+    
     status_code = 200 if health_status["status"] == "healthy" else 503
     return JsonResponse(health_status, status=status_code)
 
@@ -0,0 +1,84 @@
+"""
+Earnings leaderboard endpoints (daily, weekly, all-time).
+"""
+from django.contrib.auth import get_user_model
+from rest_framework import status, permissions
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
+
+from .leaderboard import BOARDS, board_window, get_board
+
+User = get_user_model()
+
+MAX_LEADERBOARD_LIMIT = 100
+
+
+class LeaderboardView(APIView):
+    """
+    Top-N users on a board plus the caller's own rank.
+    GET /api/leaderboard/<board>/?limit=10
+
+    Ranks come from the in-memory board; the only query loads the
+    usernames of the listed users.
+    """
+    authentication_classes = [JWTStatelessUserAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, board):
+        if board not in BOARDS:
+            return Response({"detail": "Unknown leaderboard"}, status=status.HTTP_404_NOT_FOUND)
+
+        try:
+            limit = int(request.query_params.get("limit", 10))
+        except ValueError:
+            limit = 10
+        limit = max(1, min(limit, MAX_LEADERBOARD_LIMIT))
+
+        scores = get_board(board)
+        top = scores.top(limit)
+        usernames = dict(
+            User.objects.filter(id__in=[user_id for user_id, _ in top]).values_list("id", "username")
+        )
+
+        user_id = int(request.user.id)
+        return Response({
+            "board": board,
+            "window": board_window(board),
+            "total_ranked": len(scores),
+            "top": [
+                {
+                    "rank": rank,
+                    "user_id": top_user_id,
+                    "username": usernames.get(top_user_id, ""),
+                    "score": score,
+                }
+                for rank, (top_user_id, score) in enumerate(top, start=1)
+            ],
+            "me": {
+                "rank": scores.rank(user_id),
+                "score": scores.scores.get(user_id, 0),
+            },
+        }, status=status.HTTP_200_OK)
+
+
+class LeaderboardRankView(APIView):
+    """
+    The caller's rank and score on every board. Runs no database queries.
+    GET /api/leaderboard/me/
+    """
+    authentication_classes = [JWTStatelessUserAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        user_id = int(request.user.id)
+        data = {}
+        for board in BOARDS:
+            scores = get_board(board)
+            data[board] = {
+                "window": board_window(board),
+                "rank": scores.rank(user_id),
+                "score": scores.scores.get(user_id, 0),
+                "total_ranked": len(scores),
+            }
+        return Response(data, status=status.HTTP_200_OK)
@@ -0,0 +1,72 @@
+"""
+Offerwall endpoints shared by every provider in core/offerwalls.py.
+"""
+from django.contrib.auth import get_user_model
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.response import Response
+
+from .fraud_features import record_completion
+from .offerwalls import PROVIDERS, IgnoredPostback, PostbackError
+from .postback_filter import is_known_duplicate
+from .postbacks import enqueue_postback, inbox_enabled
+
+User = get_user_model()
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def offerwall_wall_url(request, provider):
+    adapter = PROVIDERS.get(provider)
+    if adapter is None:
+        return Response({"detail": "Unknown offerwall"}, status=status.HTTP_404_NOT_FOUND)
+
+    url, err = adapter.wall_url(request.user)
+    if err:
+        return Response({"detail": err}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(adapter.wall_response(request.user, url))
+
+
+@api_view(["GET", "POST"])
+@permission_classes([AllowAny])
+def offerwall_postback(request, provider):
+    """
+    Server-to-server postback from an offerwall network.
+    Validated by the provider adapter, then either applied at once or, with
+    settings.POSTBACK_INBOX, queued for `manage.py process_postbacks`.
+    """
+    adapter = PROVIDERS.get(provider)
+    if adapter is None:
+        return Response({"detail": "Unknown offerwall"}, status=status.HTTP_404_NOT_FOUND)
+    if request.method not in adapter.methods:
+        return Response({"detail": "Method not allowed"}, status=status.HTTP_405_METHOD_NOT_ALLOWED)
+
+    try:
+        postback = adapter.parse(request)
+    except IgnoredPostback as e:
+        return Response({"ok": True, "message": str(e)})
+    except PostbackError as e:
+        return Response({"detail": e.detail}, status=e.status)
+
+    # Provider retry of an applied id: answer without the user lookup or insert.
+    # Reversals reuse the credited id, so they always go to the database.
+    if postback.action != "reverse" and is_known_duplicate(adapter, postback.external_id):
+        return Response(adapter.response(postback, False))
+
+    if postback.action == "credit":
+        # The request comes from the network's server: only the user's rate counts
+        record_completion(postback.user_ref)
+
+    # Inbox mode: acknowledge now, process_postbacks applies it later
+    if inbox_enabled():
+        enqueue_postback(adapter.name, postback)
+        return Response({"ok": True, "queued": True})
+
+    try:
+        user = User.objects.get(id=postback.user_ref)
+    except User.DoesNotExist:
+        return Response({"detail": "user not found"}, status=status.HTTP_404_NOT_FOUND)
+
+    applied = adapter.apply(postback, user)
+    return Response(adapter.response(postback, applied))
@@ -1,8 +1,10 @@
 from django.contrib.auth import get_user_model
+from django.db.models import Sum
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from .models import WalletTransaction
+from .models import DailyEarningRollup
+from .pagination import KeysetPagination
 
 User = get_user_model()
 
@@ -13,17 +15,17 @@ class ReferralAnalyticsView(APIView):
     def get(self, request):
         user = request.user
 
-        referred_users = (
-            User.objects.filter(referred_by=user)
-            .order_by("-date_joined")
-        )
+        referred_users = User.objects.filter(referred_by=user)
+
+        # Newest referrals first, paged on (date_joined, id)
+        paginator = KeysetPagination(field="date_joined")
+        page = paginator.paginate_queryset(referred_users, request)
 
         # Calculate total coins earned from referrals
-        referral_transactions = WalletTransaction.objects.filter(
+        total_referral_coins = DailyEarningRollup.objects.filter(
             user=user,
             type="referral"
-        )
-        total_referral_coins = sum(t.coins for t in referral_transactions)
+        ).aggregate(total=Sum("coins_sum"))["total"] or 0
 
         # Get coins earned per referred user (50 coins per referral)
         referral_coins_per_user = 50
@@ -38,7 +40,8 @@ class ReferralAnalyticsView(APIView):
                     "joined": u.date_joined,
                     "referral_coins_earned": referral_coins_per_user,  # Coins earned from this referral (50)
                 }
-                for u in referred_users
+                for u in page
             ],
+            "next_cursor": paginator.next_cursor,
         }
         return Response(data)
@@ -1,12 +1,14 @@
 """
 Login streak system for user retention.
 """
+from django.db.models import Q
 from django.utils import timezone
 from rest_framework import status, permissions
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from .models import WalletTransaction
+from .achievements import check_achievements
+from .wallet import ConditionNotMet, credit
 
 
 class LoginStreakView(APIView):
@@ -48,23 +50,35 @@ class LoginStreakView(APIView):
 
         if days_diff == 1:
             # Consecutive day - increase streak
-            user.login_streak += 1
-            user.last_login_date = today
-            user.longest_streak = max(user.longest_streak, user.login_streak)
-            
+            previous_longest = user.longest_streak
+            previous_login = user.last_login_date
+            login_streak = user.login_streak + 1
+            longest_streak = max(user.longest_streak, login_streak)
+
             # Streak bonus (increasing with streak length)
-            streak_bonus = min(user.login_streak * 2, 50)  # Max 50 coins
-            
-            user.coins_balance += streak_bonus
-            user.save(update_fields=["login_streak", "last_login_date", "longest_streak", "coins_balance"])
+            streak_bonus = min(login_streak * 2, 50)  # Max 50 coins
 
-            # Record transaction
-            WalletTransaction.objects.create(
-                user=user,
-                type="bonus",
-                coins=streak_bonus,
-                note=f"Login streak bonus ({user.login_streak} days)"
-            )
+            # Credit bonus and save streak fields in the same UPDATE, only if
+            # no parallel request has recorded today's login in the meantime
+            try:
+                credit(
+                    user,
+                    streak_bonus,
+                    "bonus",
+                    note=f"Login streak bonus ({login_streak} days)",
+                    only_if=Q(last_login_date=previous_login),
+                    login_streak=login_streak,
+                    last_login_date=today,
+                    longest_streak=longest_streak,
+                )
+            except ConditionNotMet:
+                user.refresh_from_db(fields=["login_streak", "last_login_date", "longest_streak"])
+                return Response({
+                    "streak": user.login_streak,
+                    "message": "Already logged in today",
+                    "bonus": 0
+                })
+            check_achievements(user, "longest_streak", previous_longest)
 
             return Response({
                 "streak": user.login_streak,
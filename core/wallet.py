@@ -0,0 +1,123 @@
+"""
+Wallet service.
+
+Every coin movement goes through credit()/debit() so the balance change and
+its WalletTransaction row are written in one DB transaction. The balance is
+changed with a single conditional UPDATE (coins_balance = coins_balance + n)
+instead of a read-modify-write on a possibly stale User instance, so credits
+for the same user can run in parallel without losing updates.
+
+The WalletTransaction always records the amount actually applied, so the
+ledger sums to the balance. One-per-day claims pass `only_if` so the claim
+check and the credit are the same UPDATE.
+"""
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import F, IntegerField
+from django.db.models.functions import Cast, Floor, Greatest, Sqrt
+
+from .achievements import check_achievements
+from .leaderboard import publish_earning
+from .models import WalletTransaction
+from .stats import EARNING_TYPES, record_coins
+
+User = get_user_model()
+
+
+class InsufficientBalance(Exception):
+    """Raised when a debit would take the balance below zero."""
+
+
+class ConditionNotMet(Exception):
+    """Raised when the user row no longer matches the `only_if` condition."""
+
+
+# -------------------------------------
+# CREDIT / DEBIT
+# -------------------------------------
+def credit(user, coins, tx_type, note="", amount_rs=0, only_if=None, **updates):
+    """
+    Add coins to the user's balance and record the WalletTransaction.
+
+    Extra keyword arguments are applied as column updates in the same
+    UPDATE statement (e.g. daily_bonus_claimed=today, or F() expressions).
+    `only_if` (a Q) must still hold on the user row for the UPDATE to match;
+    otherwise ConditionNotMet is raised and nothing is written.
+    """
+    if coins < 0:
+        raise ValueError("credit() expects a non-negative amount")
+    return _apply(user, coins, tx_type, note, amount_rs, updates, only_if=only_if)
+
+
+def debit(user, coins, tx_type, note="", amount_rs=0, clamp=False, **updates):
+    """
+    Remove coins from the user's balance and record the WalletTransaction.
+
+    Raises InsufficientBalance if the balance is too low. With clamp=True
+    only what the balance covers is taken (used for offerwall reversals);
+    the transaction records that amount.
+    """
+    if coins < 0:
+        raise ValueError("debit() expects a non-negative amount")
+    return _apply(user, -coins, tx_type, note, amount_rs, updates, clamp=clamp)
+
+
+def _apply(user, delta, tx_type, note, amount_rs, updates, clamp=False, only_if=None):
+    rows = User.objects.filter(pk=user.pk)
+    if only_if is not None:
+        rows = rows.filter(only_if)
+
+    with transaction.atomic():
+        if clamp and delta < 0:
+            # Lock the row and take at most the current balance
+            current = User.objects.select_for_update().filter(pk=user.pk).values_list("coins_balance", flat=True).get()
+            delta = -min(-delta, max(current, 0))
+
+        earning = tx_type in EARNING_TYPES
+        if earning:
+            updates = {**updates, "coins_earned_total": F("coins_earned_total") + delta}
+
+        if delta < 0:
+            # Conditional UPDATE: only matches while the balance covers the debit
+            rows = rows.filter(coins_balance__gte=-delta)
+
+        if not rows.update(coins_balance=F("coins_balance") + delta, **updates):
+            if only_if is not None and not User.objects.filter(pk=user.pk).filter(only_if).exists():
+                raise ConditionNotMet("Condition no longer holds")
+            raise InsufficientBalance("Insufficient balance")
+
+        tx = WalletTransaction.objects.create(
+            user=user,
+            type=tx_type,
+            coins=delta,
+            amount_rs=amount_rs,
+            note=note,
+        )
+        record_coins(user, tx_type, delta)
+
+        # Keep the in-memory instance in sync for responses / later saves
+        user.refresh_from_db(fields=["coins_balance", *updates])
+
+        if earning:
+            transaction.on_commit(lambda: publish_earning(user.pk, delta))
+            if delta > 0:
+                check_achievements(user, "coins_earned_total", user.coins_earned_total - delta)
+
+    return tx
+
+
+# -------------------------------------
+# EXPERIENCE
+# -------------------------------------
+def experience_updates(xp):
+    """
+    Column updates that add `xp` experience points and recompute the level
+    in the same UPDATE as the credit.
+    Level = floor(sqrt(total_experience / 100)) + 1, and never goes down.
+    """
+    new_xp = F("total_experience") + xp
+    level = Cast(Floor(Sqrt(new_xp / 100.0)), IntegerField()) + 1
+    return {
+        "total_experience": new_xp,
+        "user_level": Greatest(F("user_level"), level),
+    }
@@ -0,0 +1,102 @@
+"""
+Withdrawal review service shared by the Django admin actions and the admin API.
+
+approve_withdrawals() / reject_withdrawals() take a WithdrawRequest queryset
+and move all of its pending rows in a fixed number of statements, however
+many rows are selected:
+
+  - lock the pending rows (SELECT ... FOR UPDATE);
+  - rejections: refund coins with one UPDATE ... FROM VALUES on the users
+    (grouped per user), bulk_create the refund WalletTransactions and
+    upsert the daily counters in one statement each;
+  - approvals: bump withdrawals_completed_count the same way;
+  - one UPDATE for the status change.
+"""
+from collections import Counter, defaultdict
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils import timezone
+
+from .achievements import increment_many
+from .bulk import update_from_values
+from .models import Settings, WalletTransaction, WithdrawRequest
+from .stats import record_coins_many
+
+User = get_user_model()
+
+
+def refund_coins(withdraw, rate):
+    """Coins returned for a rejected request at COIN_TO_RS_RATE `rate`."""
+    return int(float(withdraw.amount_rs) / rate)
+
+
+def _claim_pending(queryset):
+    # No select_related: FOR UPDATE would lock the joined user rows too
+    return list(
+        queryset.select_for_update()
+        .filter(status=WithdrawRequest.STATUS_PENDING)
+        .order_by("pk")
+    )
+
+
+def _set_status(withdraws, new_status, admin_note):
+    now = timezone.now()
+    updates = {"status": new_status, "processed_at": now}
+    if admin_note is not None:
+        updates["admin_note"] = admin_note
+    WithdrawRequest.objects.filter(pk__in=[w.pk for w in withdraws]).update(**updates)
+    for withdraw in withdraws:
+        for field, value in updates.items():
+            setattr(withdraw, field, value)
+
+
+def approve_withdrawals(queryset, admin_note=None):
+    """Approve the pending requests in `queryset`. Returns the approved rows."""
+    with transaction.atomic():
+        withdraws = _claim_pending(queryset)
+        if withdraws:
+            _set_status(withdraws, WithdrawRequest.STATUS_APPROVED, admin_note)
+            increment_many("withdrawals_completed_count", Counter(w.user_id for w in withdraws))
+    return withdraws
+
+
+def reject_withdrawals(queryset, admin_note=None):
+    """
+    Reject the pending requests in `queryset` and refund their coins.
+    Returns (rejected rows, {withdraw id: coins refunded}).
+    """
+    rate = Settings.get_float("COIN_TO_RS_RATE", 0.025)
+    with transaction.atomic():
+        withdraws = _claim_pending(queryset)
+        if not withdraws:
+            return [], {}
+
+        refunds = {w.pk: refund_coins(w, rate) for w in withdraws}
+        totals = defaultdict(lambda: [0, 0])
+        for withdraw in withdraws:
+            totals[withdraw.user_id][0] += refunds[withdraw.pk]
+            totals[withdraw.user_id][1] += 1
+
+        update_from_values(
+            User,
+            ["coins_balance"],
+            [(user_id, coins) for user_id, (coins, _) in totals.items()],
+            add=["coins_balance"],
+        )
+        WalletTransaction.objects.bulk_create(
+            [
+                WalletTransaction(
+                    user_id=w.user_id,
+                    type="withdraw",
+                    coins=refunds[w.pk],
+                    amount_rs=-w.amount_rs,
+                    note=f"Refund for rejected withdrawal #{w.pk}",
+                )
+                for w in withdraws
+            ],
+            batch_size=1000,
+        )
+        record_coins_many("withdraw", {user_id: tuple(total) for user_id, total in totals.items()})
+        _set_status(withdraws, WithdrawRequest.STATUS_REJECTED, admin_note)
+    return withdraws, refunds
@@ -120,12 +120,20 @@ CORS_ALLOW_HEADERS = [
     "authorization",
     "content-type",
     "dnt",
+    "idempotency-key",
     "origin",
     "user-agent",
     "x-csrftoken",
     "x-requested-with",
 ]
 
+# Response headers readable by the frontend (task catalog ETag, list paging cursor)
+CORS_EXPOSE_HEADERS = [
+    "etag",
+    "idempotent-replayed",
+    "x-next-cursor",
+]
+
 # Explicitly allow preflight requests
 CORS_PREFLIGHT_MAX_AGE = 86400  # 24 hours
 
@@ -175,6 +183,7 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "core.middleware.IpIntelMiddleware",
 ]
 
 ROOT_URLCONF = "earning_backend.urls"
@@ -266,6 +275,40 @@ STATIC_ROOT = BASE_DIR / "staticfiles"
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
+# ---------------------------------------------------------------------
+# Cache
+#   - Set REDIS_URL (e.g. Railway Redis plugin) so all gunicorn workers
+#     share one cache; cross-worker invalidation relies on it.
+#   - Without it each worker gets its own in-memory cache.
+# ---------------------------------------------------------------------
+
+if os.environ.get("REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.environ["REDIS_URL"],
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
+# Whether the default cache is shared by every worker (true with Redis).
+# Process-level caches that need cross-worker invalidation (Settings
+# snapshot, task catalog) or cross-worker guards (task start tokens) check this.
+SHARED_CACHE = os.getenv("SHARED_CACHE", "1" if os.environ.get("REDIS_URL") else "0") == "1"
+
+# How often (seconds) each worker checks whether the Settings table changed
+# (with SHARED_CACHE), or simply reloads it (without)
+SETTINGS_CACHE_TTL = int(os.getenv("SETTINGS_CACHE_TTL", "5"))
+
+# Without SHARED_CACHE, seconds each worker reuses its own copy of the task
+# catalog (core/catalog.py) before re-reading the Task table
+TASK_CATALOG_LOCAL_TTL = int(os.getenv("TASK_CATALOG_LOCAL_TTL", "5"))
+
 # ---------------------------------------------------------------------
 # Auth / REST / JWT
 # ---------------------------------------------------------------------
@@ -332,6 +375,65 @@ LOGGING = {
     },
 }
 
+# Leaderboards (core/leaderboard.py): seconds a worker serves its in-process
+# board before replaying new entries from the shared log
+LEADERBOARD_SYNC_INTERVAL = float(os.getenv("LEADERBOARD_SYNC_INTERVAL", "2"))
+# Without SHARED_CACHE there is no shared log: seconds a worker serves its
+# board before rebuilding it from the database
+LEADERBOARD_LOCAL_TTL = float(os.getenv("LEADERBOARD_LOCAL_TTL", "30"))
+
+# Task start tokens: TaskStartView returns a signed token instead of
+# writing a pending UserTask row (see core/task_tokens.py). Needs
+# SHARED_CACHE for the single-use guard; ignored without it.
+TASK_START_TOKENS = os.getenv("TASK_START_TOKENS", "false").lower() == "true"
+TASK_START_TOKEN_MAX_AGE = int(os.getenv("TASK_START_TOKEN_MAX_AGE", str(6 * 60 * 60)))
+
+# Postback inbox: offerwall postbacks are queued and acknowledged at once,
+# then applied by `manage.py process_postbacks` (see core/postbacks.py)
+POSTBACK_INBOX = os.getenv("POSTBACK_INBOX", "false").lower() == "true"
+
+# Idempotency-Key replay window and how long a retry waits for the
+# in-flight original (see core/idempotency.py)
+IDEMPOTENCY_KEY_TTL = int(os.getenv("IDEMPOTENCY_KEY_TTL", str(24 * 60 * 60)))
+IDEMPOTENCY_WAIT = float(os.getenv("IDEMPOTENCY_WAIT", "5"))
+
+# Sliding-window fraud features (core/fraud_features.py): how long accounts
+# are remembered per device / IP, and the risk score that blocks task starts
+# and game completions (0 = measure only)
+FRAUD_ACCOUNT_WINDOW = int(os.getenv("FRAUD_ACCOUNT_WINDOW", str(24 * 60 * 60)))
+FRAUD_RISK_BLOCK_SCORE = float(os.getenv("FRAUD_RISK_BLOCK_SCORE", "0"))
+
+# Fraud event sink (core/fraud_sink.py): events kept per user per window,
+# and the buffer size / age that trigger a batched write
+FRAUD_EVENT_USER_CAP = int(os.getenv("FRAUD_EVENT_USER_CAP", "5"))
+FRAUD_EVENT_CAP_WINDOW = int(os.getenv("FRAUD_EVENT_CAP_WINDOW", "60"))
+FRAUD_EVENT_BUFFER_SIZE = int(os.getenv("FRAUD_EVENT_BUFFER_SIZE", "100"))
+FRAUD_EVENT_BUFFER_AGE = float(os.getenv("FRAUD_EVENT_BUFFER_AGE", "5"))
+
+# Fraud scores halve every this many days (core/fraud_score.py)
+FRAUD_SCORE_HALF_LIFE_DAYS = float(os.getenv("FRAUD_SCORE_HALF_LIFE_DAYS", "14"))
+
+# Reverse proxies in front of the app that append to X-Forwarded-For
+# (1 = the Railway edge proxy the Procfile deploy runs behind). The client IP
+# is taken that many entries from the right; 0 = ignore the header and use
+# REMOTE_ADDR (only when clients reach gunicorn directly).
+TRUSTED_PROXY_COUNT = int(os.getenv("TRUSTED_PROXY_COUNT", "1"))
+
+# IP intelligence (core/ip_intel.py): comma-separated local CSV range files
+# for datacenter/VPN networks and countries, and how often to check them
+IP_INTEL_NETWORK_FILES = [p.strip() for p in os.getenv("IP_INTEL_NETWORK_FILES", "").split(",") if p.strip()]
+IP_INTEL_COUNTRY_FILES = [p.strip() for p in os.getenv("IP_INTEL_COUNTRY_FILES", "").split(",") if p.strip()]
+IP_INTEL_CHECK_INTERVAL = int(os.getenv("IP_INTEL_CHECK_INTERVAL", "30"))
+# Risk points for a listed network, and task eligibility by network label /
+# country code (empty = no restriction)
+FRAUD_NETWORK_SCORE = float(os.getenv("FRAUD_NETWORK_SCORE", "20"))
+TASK_BLOCKED_NETWORKS = [n.strip() for n in os.getenv("TASK_BLOCKED_NETWORKS", "").split(",") if n.strip()]
+TASK_ALLOWED_COUNTRIES = [c.strip().upper() for c in os.getenv("TASK_ALLOWED_COUNTRIES", "").split(",") if c.strip()]
+
+# Recent postback ids kept for fast duplicate rejection (core/postback_filter.py)
+POSTBACK_DEDUP_DAYS = int(os.getenv("POSTBACK_DEDUP_DAYS", "7"))
+POSTBACK_DEDUP_CAPACITY = int(os.getenv("POSTBACK_DEDUP_CAPACITY", "1000000"))
+
 CPX_APP_ID = os.getenv("CPX_APP_ID", "")
 CPX_SECURITY_HASH = os.getenv("CPX_SECURITY_HASH", "cH0T7KHiYJBFKLFqc0k22HICZ1B33")
 CPX_CURRENCY_FACTOR = int(os.getenv("CPX_CURRENCY_FACTOR", "1000"))
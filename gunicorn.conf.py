@@ -0,0 +1,15 @@
+"""
+Gunicorn settings, read automatically from the working directory by the
+Procfile / nixpacks start command. Command-line flags take precedence.
+"""
+
+
+def post_worker_init(worker):
+    """Warm per-worker caches before the worker accepts requests."""
+    from core.postback_filter import warm_recent_ids
+
+    try:
+        warm_recent_ids()
+    except Exception:
+        # Never keep a worker from starting; the filter loads on first use then
+        worker.log.exception("Failed to warm the postback id filter")